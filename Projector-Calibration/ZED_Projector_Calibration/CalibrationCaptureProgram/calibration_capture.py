@@ -11,6 +11,21 @@ from datetime import datetime
 
 import cv2
 
+# 引入仓库根目录，以复用 src 中的采集质量检测
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from src.modules.projector_calibration.services.capture_quality import CaptureQualityGate
+from src.modules.projector_calibration.services.pattern_manifest import PatternManifest
+from src.modules.projector_calibration.services.phase_shift import coarse_frame_indices
+from src.modules.projector_calibration.services.photometric import DEFAULT_LEVELS, PhotometricCapture, flat_frame
+
+# 标定阈值（与调用 calibrate_optimized.py 的参数保持一致）
+BLACK_THR = 40
+WHITE_THR = 5
+# 单帧质量不合格时的最大重拍次数；超过后保留最后一帧并给出警告
+MAX_RECAPTURE = 3
+# 光度标定：每个灰度平均的帧数（降低传感器噪声）
+PHOTOMETRIC_AVERAGE = 4
+
 # 尝试导入ZED SDK
 try:
     import pyzed.sl as sl
@@ -242,11 +257,111 @@ class ZEDCameraManager:
         gray = cv2.cvtColor(img_rgba, cv2.COLOR_BGRA2GRAY)
         return gray
 
+    def capture_left_gray_mean(self, count):
+        """连续拍摄 count 帧取平均（光度标定用）"""
+        acc = None
+        for _ in range(count):
+            gray = self.capture_left_gray().astype("float32")
+            acc = gray if acc is None else acc + gray
+        return (acc / count + 0.5).astype("uint8")
+
+    def lock_exposure(self):
+        """固定当前曝光与增益（关闭自动曝光），光度标定期间相机响应须保持不变"""
+        try:
+            for setting in (sl.VIDEO_SETTINGS.EXPOSURE, sl.VIDEO_SETTINGS.GAIN):
+                err, value = self.zed.get_camera_settings(setting)
+                if err == sl.ERROR_CODE.SUCCESS:
+                    self.zed.set_camera_settings(setting, value)
+            print("[信息] 已锁定相机曝光与增益")
+        except Exception as e:
+            print(f"[警告] 无法锁定相机曝光，光度结果可能不准确: {e}")
+
+    def unlock_exposure(self):
+        try:
+            self.zed.set_camera_settings(sl.VIDEO_SETTINGS.AEC_AGC, 1)
+        except Exception:
+            pass
+
     def close(self):
         self.image_mat.free()
         self.zed.close()
 
 
+def capture_pattern_checked(win, img_path, zed_mgr, gate, idx):
+    """投影并拍摄单张图案，实时质量检测不通过时立即重新投影并重拍"""
+    for attempt in range(MAX_RECAPTURE + 1):
+        win.show_image(img_path)
+        # 显示后稍作等待，保证显示器刷新与相机曝光稳定
+        time.sleep(0.5)  # 增加等待时间确保拍摄稳定
+        gray = zed_mgr.capture_left_gray()
+        # 连续第二帧用于估计画面运动（标定板或相机是否晃动）
+        gray_next = zed_mgr.capture_left_gray()
+        quality = gate.check(idx, gray, gray_next)
+        if quality.ok:
+            return gray
+        print(f"  [质量] 第 {attempt+1} 次拍摄不合格: {'; '.join(quality.reasons)}")
+        if attempt < MAX_RECAPTURE:
+            print("  [质量] 重新投影并拍摄...")
+    print(f"  [警告] 已重拍 {MAX_RECAPTURE} 次仍不合格，保留最后一帧")
+    return gray
+
+
+def capture_photometric(proj_wins, selected_mons, zed_mgr, base_dir, pattern_files, manifest):
+    """
+    光度标定拍摄：对投影面（无标定板）依次投影格雷码（相机 -> 投影仪对应）与若干平场灰度，
+    保存到 ./photometric/（多投影仪时 ./photometric/projector_<k>/），供 photometric_calibration.py 拟合
+    """
+    multi_projector = len(proj_wins) > 1
+    for k, (win, mon) in enumerate(zip(proj_wins, selected_mons)):
+        cap_dir = base_dir / "photometric" / (f"projector_{k}" if multi_projector else "")
+        cap_dir.mkdir(parents=True, exist_ok=True)
+        for other in proj_wins:
+            if other is not win:
+                other.clear()
+        print(f"=== 光度标定拍摄（投影仪 {k}），保存到 {cap_dir} ===")
+        if manifest is not None:
+            manifest.save(cap_dir)
+        gate = create_quality_gate(len(pattern_files), manifest)
+        for idx in gate.capture_order():
+            gray = capture_pattern_checked(win, pattern_files[idx], zed_mgr, gate, idx)
+            cv2.imwrite(str(cap_dir / f"graycode_{idx:02d}.png"), gray)
+
+        # 平场图案按显示器分辨率生成（ProjectorWindow 只接受图片文件）
+        proj_shape = (mon["height"], mon["width"])
+        flat_dir = base_dir / "photometric_patterns" / f"{mon['width']}x{mon['height']}"
+        flat_dir.mkdir(parents=True, exist_ok=True)
+        capture = PhotometricCapture(list(DEFAULT_LEVELS), proj_shape[0], proj_shape[1])
+        flat_paths = []
+        for level in capture.levels:
+            path = flat_dir / f"level_{level:03d}.png"
+            cv2.imwrite(str(path), flat_frame(level, proj_shape))
+            flat_paths.append(path)
+        # 先投影全白让自动曝光收敛，再锁定曝光拍摄全部灰度
+        win.show_image(flat_paths[capture.levels.index(255)])
+        time.sleep(1.0)
+        zed_mgr.lock_exposure()
+        try:
+            for i, path in enumerate(flat_paths):
+                win.show_image(path)
+                time.sleep(0.5)
+                cv2.imwrite(str(cap_dir / capture.frame_name(i)), zed_mgr.capture_left_gray_mean(PHOTOMETRIC_AVERAGE))
+                print(f"  [{i+1}/{len(flat_paths)}] 灰度 {capture.levels[i]} -> {capture.frame_name(i)}")
+        finally:
+            zed_mgr.unlock_exposure()
+        capture.save(cap_dir)
+        win.clear()
+
+
+def create_quality_gate(pattern_count, manifest):
+    """按图案清单创建质量门控：相移图案集没有反相对，仅对粗格雷码帧检查条纹"""
+    if manifest is not None and manifest.mode == "phase_shift":
+        stripe_frames = coarse_frame_indices(manifest.proj_width, manifest.proj_height,
+                                             manifest.phase_period, manifest.phase_steps)
+        return CaptureQualityGate(pattern_count, black_thr=BLACK_THR, white_thr=WHITE_THR,
+                                  stripe_frames=stripe_frames, paired=False)
+    return CaptureQualityGate(pattern_count, black_thr=BLACK_THR, white_thr=WHITE_THR)
+
+
 def enumerate_monitors():
     global monitors
     monitors = []
@@ -270,6 +385,23 @@ def ask_user_monitor_choice(monitors_list):
             print("输入无效，请输入整数索引。")
 
 
+def ask_user_monitor_choices(monitors_list):
+    """选择一个或多个投影显示器（多投影仪标定时以逗号分隔索引，如 1,2）"""
+    print("可用显示器列表：")
+    for idx, m in enumerate(monitors_list):
+        print(f"[{idx}] left={m['left']}, top={m['top']}, width={m['width']}, height={m['height']}")
+    while True:
+        try:
+            raw = input("请选择用于投影的显示器索引（多台投影仪用逗号分隔）：").strip()
+            sels = [int(v) for v in raw.split(",") if v.strip()]
+            if sels and all(0 <= s < len(monitors_list) for s in sels) and len(set(sels)) == len(sels):
+                return [monitors_list[s] for s in sels]
+            else:
+                print("索引无效，请重新输入。")
+        except Exception:
+            print("输入无效，请输入整数索引。")
+
+
 def select_graycode_folder():
     """使用GUI选择格雷码图案文件夹"""
     root = tk.Tk()
@@ -306,21 +438,27 @@ def main():
         print("[错误] 未检测到显示器信息。")
         zed_mgr.close()
         return
-    mon = ask_user_monitor_choice(mons)
-    proj_win = ProjectorWindow(mon)
+    selected_mons = ask_user_monitor_choices(mons)
+    mon = selected_mons[0]
+    proj_wins = [ProjectorWindow(m) for m in selected_mons]
+    multi_projector = len(proj_wins) > 1
+    if multi_projector:
+        print(f"[信息] 多投影仪模式：共 {len(proj_wins)} 台投影仪，每轮依次投影并保存到 capture_*/projector_*/")
 
     # 用户选择格雷码图案文件夹
     gray_folder = select_graycode_folder()
     if not gray_folder:
         print("[错误] 未选择格雷码图案文件夹。")
-        proj_win.destroy()
+        for w in proj_wins:
+            w.destroy()
         zed_mgr.close()
         return
     
     gray_dir = Path(gray_folder)
     if not gray_dir.exists():
         print(f"[错误] 格雷码图案文件夹不存在: {gray_folder}")
-        proj_win.destroy()
+        for w in proj_wins:
+            w.destroy()
         zed_mgr.close()
         return
     
@@ -350,7 +488,8 @@ def main():
     
     if len(pattern_files) == 0:
         print("[错误] 未在指定文件夹中找到 pattern_XX.png 或 graycode_XX.png 格式的文件。")
-        proj_win.destroy()
+        for w in proj_wins:
+            w.destroy()
         zed_mgr.close()
         return
     
@@ -387,7 +526,8 @@ def main():
     sample_img = cv2.imread(pattern_files[0], cv2.IMREAD_GRAYSCALE)
     if sample_img is None:
         print("[错误] 无法读取样例图案。")
-        proj_win.destroy()
+        for w in proj_wins:
+            w.destroy()
         zed_mgr.close()
         return
     pattern_height, pattern_width = sample_img.shape[0], sample_img.shape[1]
@@ -398,48 +538,73 @@ def main():
         print(f"[警告] 格雷码图案分辨率({pattern_width}x{pattern_height})与投影分辨率({proj_width}x{proj_height})不匹配")
         print("[警告] 将使用指定的投影分辨率进行标定")
 
+    # 图案清单（gen_graycode_imgs.py 生成）：记录解码模式，随每次拍摄复制，供标定程序自动识别
+    manifest = PatternManifest.load(gray_dir)
+    if manifest is not None:
+        print(f"[信息] 图案清单: 模式={manifest.mode}, 图案数={manifest.pattern_count}")
+    else:
+        print("[信息] 未找到 pattern_manifest.json，按标准模式解码")
+
     # 轮次输入
     try:
         rounds = int(input("请输入要执行的拍摄轮次（整数）：").strip())
     except Exception:
         print("[错误] 轮次输入无效。")
-        proj_win.destroy()
+        for w in proj_wins:
+            w.destroy()
         zed_mgr.close()
         return
     if rounds <= 0:
         print("[错误] 轮次必须为正整数。")
-        proj_win.destroy()
+        for w in proj_wins:
+            w.destroy()
         zed_mgr.close()
         return
 
     # 拍摄轮次，保存到 ./capture_0, ./capture_1, ...（相对于 calibrate.py 所在目录）
+    # 多投影仪模式下每轮按投影仪依次拍摄，保存到 ./capture_<r>/projector_<k>/，其余投影仪保持全黑
     for r in range(rounds):
-        cap_dir = base_dir / f"capture_{r}"
-        cap_dir.mkdir(parents=True, exist_ok=True)
-        print(f"=== 开始第 {r+1} 轮拍摄，保存到 {cap_dir} ===")
-        for idx, img_path in enumerate(pattern_files):
-            # 获取原始图案文件名用于显示对应关系
-            pattern_name = Path(img_path).name
-            print(f"[调试] 准备投影第 {idx+1} 张图片:")
-            print(f"  完整路径: {img_path}")
-            print(f"  文件名: {pattern_name}")
-            print(f"  文件存在: {Path(img_path).exists()}")
-            
-            proj_win.show_image(img_path)
-            # 显示后稍作等待，保证显示器刷新与相机曝光稳定
-            time.sleep(0.5)  # 增加等待时间确保拍摄稳定
-            gray = zed_mgr.capture_left_gray()
-            # 转换文件名为标定程序期望的格式 graycode_XX.png
-            save_name = f"graycode_{idx:02d}.png"
-            save_path = cap_dir / save_name
-            cv2.imwrite(str(save_path), gray)
-            print(f"  [{idx+1}/{len(pattern_files)}] 投影 {pattern_name} -> 拍摄 {save_name}")
+        round_dir = base_dir / f"capture_{r}"
+        for k, win in enumerate(proj_wins):
+            cap_dir = round_dir / f"projector_{k}" if multi_projector else round_dir
+            cap_dir.mkdir(parents=True, exist_ok=True)
+            if manifest is not None:
+                manifest.save(cap_dir)
+            print(f"=== 开始第 {r+1} 轮拍摄，保存到 {cap_dir} ===")
+            for other in proj_wins:
+                if other is not win:
+                    other.clear()
+            # 先拍摄白/黑参考帧（图案序列的最后两张），以便后续条纹帧实时判定对比度
+            gate = create_quality_gate(len(pattern_files), manifest)
+            for n, idx in enumerate(gate.capture_order()):
+                img_path = pattern_files[idx]
+                # 获取原始图案文件名用于显示对应关系
+                pattern_name = Path(img_path).name
+                print(f"[调试] 准备投影第 {idx+1} 张图片:")
+                print(f"  完整路径: {img_path}")
+                print(f"  文件名: {pattern_name}")
+                print(f"  文件存在: {Path(img_path).exists()}")
+
+                gray = capture_pattern_checked(win, img_path, zed_mgr, gate, idx)
+                # 转换文件名为标定程序期望的格式 graycode_XX.png
+                save_name = f"graycode_{idx:02d}.png"
+                save_path = cap_dir / save_name
+                cv2.imwrite(str(save_path), gray)
+                print(f"  [{n+1}/{len(pattern_files)}] 投影 {pattern_name} -> 拍摄 {save_name}")
+            if multi_projector:
+                win.clear()
         if r < rounds - 1:  # 修改条件以适应从0开始的索引
             input("请改变标定图案姿态后，按回车开始下一轮...")
 
+    # 可选：光度标定拍摄（移走标定板，只拍投影面）
+    if input("是否拍摄光度标定（移走标定板后进行）？[y/N]：").strip().lower() == "y":
+        capture_photometric(proj_wins, selected_mons, zed_mgr, base_dir, pattern_files, manifest)
+        print("[信息] 光度标定拍摄完成，可运行: python photometric_calibration.py fit photometric")
+
     # 清屏并关闭窗口
-    proj_win.clear()
-    proj_win.destroy()
+    for w in proj_wins:
+        w.clear()
+        w.destroy()
 
     # 运行标定程序
     print("=== 开始运行标定程序 ===")
@@ -448,8 +613,8 @@ def main():
     chess_hori = 11  # 横向内角点数（12格-1）
     chess_block_size = 15  # 每个棋盘格大小为15mm
     graycode_step = 1
-    black_thr = 40
-    white_thr = 5
+    black_thr = BLACK_THR
+    white_thr = WHITE_THR
     cmd = [
         sys.executable, str(calibrate_py),
         str(proj_height), str(proj_width),
@@ -459,6 +624,9 @@ def main():
         "-white_thr", str(white_thr),
         "-camera", str(camera_json)
     ]
+    if multi_projector:
+        # 各投影仪分辨率取自所选显示器
+        cmd += ["-projector_shapes", ",".join(f"{m['height']}x{m['width']}" for m in selected_mons)]
     print("调用命令:")
     print(" ", " ".join(cmd))
     try:
@@ -2,14 +2,38 @@
 
 import os
 import os.path
+import sys
 import glob
 import argparse
 import cv2
 import numpy as np
 import json
 import logging
+from concurrent.futures import ProcessPoolExecutor
 from typing import Tuple, List, Optional, Union
+import time
 import warnings
+from pathlib import Path
+from datetime import datetime
+
+# 引入仓库根目录，以复用 src 中的分块解码器
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from src.modules.projector_calibration.services.calibration_bundle import (
+    BUNDLE_SUFFIX, CalibrationBundle, ProjectorCalibration, bundle_path_for, sha256_files)
+from src.modules.projector_calibration.services.calibration_history import HISTORY_NAME, CalibrationHistory
+from src.modules.projector_calibration.services.distortion_models import (
+    MODEL_NAMES, cv_score, get_model, kfold_splits, select_model, trim_coefficients)
+from src.modules.projector_calibration.services.extrinsics import mean_pose, relative_pose, rotation_angle_deg
+from src.modules.projector_calibration.services.graycode_decoder import TiledGrayCodeDecoder
+from src.modules.projector_calibration.services.pattern_manifest import DECODE_MODES, PatternManifest
+from src.modules.projector_calibration.services.phase_shift import PhaseShiftDecoder
+
+# 相移模式默认参数 (period, steps)，与 gen_graycode_imgs.py 默认值一致
+DEFAULT_PHASE_PARAMS = (32, 4)
+# 畸变模型选择默认参数 (model, folds, tolerance)：auto 为按视图 k 折交叉验证选择
+DEFAULT_MODEL_SELECTION = ('auto', 5, 0.05)
+# 交叉验证所需的最少视图数，不足时直接使用完整模型
+MIN_CV_VIEWS = 3
 
 # 设置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -103,60 +127,6 @@ class OptimizedChessboardDetector:
             logger.warning("所有策略都失败了")
         return False, None
 
-class OptimizedGrayCodeDecoder:
-    """优化的格雷码解码器，提高鲁棒性"""
-    
-    def __init__(self, graycode_pattern, black_thr: int = 40, white_thr: int = 5):
-        self.graycode = graycode_pattern
-        self.black_thr = black_thr
-        self.white_thr = white_thr
-        
-    def decode_with_validation(self, imgs: List[np.ndarray], x: int, y: int, 
-                             white_img: np.ndarray, black_img: np.ndarray) -> Tuple[bool, Optional[Tuple[int, int]]]:
-        """
-        带验证的格雷码解码
-        
-        Args:
-            imgs: 格雷码图像序列
-            x, y: 像素坐标
-            white_img: 白色参考图像
-            black_img: 黑色参考图像
-            
-        Returns:
-            (success, proj_pixel): 解码结果和投影仪像素坐标
-        """
-        # 检查像素是否在投影区域内
-        if int(white_img[y, x]) - int(black_img[y, x]) <= self.black_thr:
-            return False, None
-        
-        # 基本解码
-        err, proj_pix = self.graycode.getProjPixel(imgs, x, y)
-        if err:
-            return False, None
-        
-        # 验证解码结果的一致性
-        if not self._validate_decoded_pixel(imgs, x, y, proj_pix, white_img, black_img):
-            return False, None
-        
-        return True, proj_pix
-    
-    def _validate_decoded_pixel(self, imgs: List[np.ndarray], x: int, y: int, 
-                               proj_pix: Tuple[int, int], white_img: np.ndarray, 
-                               black_img: np.ndarray) -> bool:
-        """验证解码像素的一致性"""
-        # 检查邻域像素的一致性
-        for dx in [-1, 0, 1]:
-            for dy in [-1, 0, 1]:
-                nx, ny = x + dx, y + dy
-                if (0 <= nx < white_img.shape[1] and 0 <= ny < white_img.shape[0]):
-                    if int(white_img[ny, nx]) - int(black_img[ny, nx]) > self.black_thr:
-                        err, neighbor_pix = self.graycode.getProjPixel(imgs, nx, ny)
-                        if not err:
-                            # 检查邻域像素解码结果的合理性
-                            if abs(neighbor_pix[0] - proj_pix[0]) > 2 or abs(neighbor_pix[1] - proj_pix[1]) > 2:
-                                return False
-        return True
-
 class OptimizedCalibrator:
     """优化的标定器，使用现代标定技术"""
     
@@ -168,7 +138,8 @@ class OptimizedCalibrator:
                                corners_list: List[np.ndarray], 
                                image_shape: Tuple[int, int],
                                camera_matrix: Optional[np.ndarray] = None,
-                               dist_coeffs: Optional[np.ndarray] = None) -> Tuple[float, np.ndarray, np.ndarray, List[np.ndarray], List[np.ndarray]]:
+                               dist_coeffs: Optional[np.ndarray] = None,
+                               flags: Optional[int] = None) -> Tuple[float, np.ndarray, np.ndarray, List[np.ndarray], List[np.ndarray]]:
         """
         使用现代技术进行相机标定
         
@@ -178,14 +149,14 @@ class OptimizedCalibrator:
             image_shape: 图像尺寸
             camera_matrix: 预设相机内参
             dist_coeffs: 预设畸变系数
+            flags: 畸变模型标志（默认为完整模型，见 model_flags）
             
         Returns:
             (rms, camera_matrix, dist_coeffs, rvecs, tvecs): 标定结果
         """
-        # 设置标定标志，使用更现代的方法
-        flags = (cv2.CALIB_RATIONAL_MODEL +  # 使用有理畸变模型
-                cv2.CALIB_THIN_PRISM_MODEL +  # 使用薄棱镜模型
-                cv2.CALIB_TILTED_MODEL)       # 使用倾斜模型
+        # 设置标定标志，默认使用有理 + 薄棱镜 + 倾斜的完整模型
+        if flags is None:
+            flags = model_flags('full')
         
         # 如果提供了初始参数，使用它们
         if camera_matrix is not None and dist_coeffs is not None:
@@ -243,6 +214,92 @@ class OptimizedCalibrator:
                 cam_matrix, cam_dist, proj_matrix, proj_dist, image_shape)
             return ret, cam_matrix, cam_dist, proj_matrix, proj_dist, R, T, E, F
 
+    def select_distortion_model(self, objps_list: List[np.ndarray],
+                                corners_list: List[np.ndarray],
+                                image_shape: Tuple[int, int],
+                                folds: int = 5, tolerance: float = 0.05,
+                                map_fn=map):
+        """
+        按视图做 k 折交叉验证，为内参标定选择畸变模型
+
+        每个 (模型, 折) 在训练视图上标定，再以所得内参对留出视图做 PnP 并计算重投影误差；
+        选择留出误差不超过最优值 (1 + tolerance) 倍的最简单模型。map_fn 用于并行执行
+        （例如进程池的 map），默认在当前进程内顺序执行。
+
+        Returns:
+            ModelSelection；视图数不足 MIN_CV_VIEWS 时返回 None
+        """
+        if len(objps_list) < MIN_CV_VIEWS:
+            return None
+        splits = kfold_splits(len(objps_list), folds)
+        tasks = [(name, objps_list, corners_list, image_shape, train, test)
+                 for name in MODEL_NAMES for train, test in splits]
+        fold_errors = list(map_fn(_cv_fold_task, tasks))
+        scores = {name: cv_score(fold_errors[i * len(splits):(i + 1) * len(splits)])
+                  for i, name in enumerate(MODEL_NAMES)}
+        try:
+            selection = select_model(scores, tolerance, len(splits))
+        except ValueError:
+            return None
+        logger.info('  Distortion model cross-validation (held-out RMS) :')
+        for name in MODEL_NAMES:
+            score = scores[name]
+            mark = ' <' if name == selection.chosen else ''
+            logger.info(f'    {name:<20} {"failed" if score is None else f"{score:.6f}"}{mark}')
+        return selection
+
+def model_flags(name):
+    """畸变模型名 -> cv2.calibrateCamera 标志"""
+    flags = 0
+    for flag in get_model(name).flags:
+        flags |= getattr(cv2, flag)
+    return flags
+
+def _cv_fold_task(args):
+    """进程池任务：在训练视图上以指定模型标定，返回留出视图的 (误差平方和, 点数)"""
+    name, objps_list, corners_list, image_shape, train, test = args
+    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 100, 1e-6)
+    try:
+        _, int_mat, dist, _, _ = cv2.calibrateCamera(
+            [objps_list[i] for i in train], [corners_list[i] for i in train], image_shape,
+            None, None, flags=model_flags(name), criteria=criteria)
+    except cv2.error:
+        return None
+    total = 0.0
+    count = 0
+    for i in test:
+        ok, rvec, tvec = cv2.solvePnP(objps_list[i], corners_list[i], int_mat, dist)
+        if not ok:
+            return None
+        projected, _ = cv2.projectPoints(objps_list[i], rvec, tvec, int_mat, dist)
+        diff = projected.reshape(-1, 2) - corners_list[i].reshape(-1, 2)
+        total += float(np.sum(diff * diff))
+        count += len(diff)
+    return total, count
+
+def fit_intrinsics(calibrator, objps_list, corners_list, image_shape, model_selection=DEFAULT_MODEL_SELECTION,
+                   map_fn=map):
+    """
+    按 model_selection = (model, folds, tolerance) 标定内参：model 为 auto 时先交叉验证选择模型
+
+    Returns:
+        (rms, int_mat, dist, rvecs, tvecs, model_name, selection)；selection 为交叉验证记录（未进行时为 None）
+    """
+    name, folds, tolerance = model_selection
+    selection = None
+    if name == 'auto':
+        selection = calibrator.select_distortion_model(objps_list, corners_list, image_shape, folds, tolerance, map_fn)
+        if selection is None:
+            logger.warning('  Too few views for distortion model selection, using the full model')
+        name = selection.chosen if selection is not None else 'full'
+    ret, int_mat, dist, rvecs, tvecs = calibrator.calibrate_camera_modern(
+        objps_list, corners_list, image_shape, flags=model_flags(name))
+    if np.asarray(dist).size < get_model(name).coeffs:
+        # 所选模型求解失败时 calibrate_camera_modern 已回退到默认模型
+        name = 'standard'
+    logger.info(f'  Distortion model : {name}')
+    return ret, int_mat, dist, rvecs, tvecs, name, selection
+
 def main():
     parser = argparse.ArgumentParser(
         description='Optimized Calibrate pro-cam system using chessboard and structured light projection\n'
@@ -255,6 +312,10 @@ def main():
         '        |- capture_2/ --- graycode_00.png\n'
         '        |              |- graycode_01.png\n'
         '        |      .       |        .\n'
+        '        |      .       |        .\n'
+        '  For multi-projector sessions, place each projector\'s images of a round as \n'
+        '    ./ --- capture_1/ --- projector_0/ --- graycode_??.png\n'
+        '        |              |- projector_1/ --- graycode_??.png\n'
         '        |      .       |        .\n',
         formatter_class=argparse.RawTextHelpFormatter
     )
@@ -277,6 +338,32 @@ def main():
     parser.add_argument('-debug', action='store_true', help='enable debug mode')
     parser.add_argument('-output', type=str, default='calibration_result_optimized.xml', 
                         help='output calibration file name')
+    parser.add_argument('-projector_shapes', type=str, default=str(),
+                        help='per-projector pixel size for multi-projector sessions, e.g. "1080x1920,768x1024" '
+                             '(default: proj_height x proj_width for every projector)')
+    parser.add_argument('-workers', type=int, default=None,
+                        help='number of worker processes for multi-projector calibration (default: CPU count)')
+    parser.add_argument('-memory_budget', type=float, default=256.0,
+                        help='memory budget in MB for the tiled graycode decode of one capture (default : 256)')
+    parser.add_argument('-history', type=str, default=HISTORY_NAME,
+                        help='calibration history database every run is appended to (empty to disable)')
+    parser.add_argument('-extrinsics_only', type=str, default=str(),
+                        help='previous result (.calib or .xml): keep its intrinsics and distortion and\n'
+                             're-estimate only the camera-to-projector extrinsics from the captures found')
+    parser.add_argument('-distortion_model', type=str, choices=('auto',) + MODEL_NAMES,
+                        default=DEFAULT_MODEL_SELECTION[0],
+                        help='lens distortion model of the intrinsic fits (default : auto = k-fold cross-validation\n'
+                             'over views, choosing the simplest model whose held-out error is within -model_tolerance\n'
+                             'of the best; full = rational + thin prism + tilted)')
+    parser.add_argument('-cv_folds', type=int, default=DEFAULT_MODEL_SELECTION[1],
+                        help='number of cross-validation folds for -distortion_model auto (default : 5)')
+    parser.add_argument('-model_tolerance', type=float, default=DEFAULT_MODEL_SELECTION[2],
+                        help='relative held-out error tolerance for choosing a simpler model (default : 0.05)')
+    parser.add_argument('-decode_mode', type=str, choices=('auto',) + DECODE_MODES, default='auto',
+                        help='graycode decode mode (default : auto = read pattern_manifest.json in the capture\n'
+                             'directories, standard if absent). complementary decides each bit by a per-pixel\n'
+                             'comparison of the bit-plane and its inverse relative to the pixel\'s own contrast;\n'
+                             'phase_shift decodes the hybrid graycode + phase-shift set to continuous coordinates')
 
     args = parser.parse_args()
 
@@ -290,6 +377,42 @@ def main():
     output_file = args.output
 
     camera_param_file = args.camera
+    model_selection = (args.distortion_model, args.cv_folds, args.model_tolerance)
+
+    camP = None
+    cam_dist = None
+    if camera_param_file:
+        path, ext = os.path.splitext(camera_param_file)
+        if ext == ".json":
+            camP, cam_dist = loadCameraParam(camera_param_file)
+            logger.info('Loaded camera parameters')
+            if debug_mode:
+                logger.info(f'Camera matrix:\n{camP}')
+                logger.info(f'Distortion coefficients:\n{cam_dist}')
+
+    # 多投影仪模式：./capture_*/projector_*/graycode_*
+    projector_captures = find_multi_projector_captures('.')
+    if projector_captures:
+        logger.info(f'Found multi-projector captures for projectors {list(projector_captures.keys())}')
+        proj_shapes = {pid: proj_shape for pid in projector_captures}
+        if args.projector_shapes:
+            shapes = [tuple(int(v) for v in item.lower().split('x')) for item in args.projector_shapes.split(',')]
+            if len(shapes) != len(projector_captures):
+                logger.error(f'-projector_shapes lists {len(shapes)} shapes but {len(projector_captures)} projectors were found')
+                return
+            proj_shapes = dict(zip(projector_captures.keys(), shapes))
+        capture_dirs = [os.path.dirname(fnames[0]) for caps in projector_captures.values() for _, fnames in caps]
+        decode_mode, phase_params = resolve_decode_mode(args.decode_mode, capture_dirs)
+        if args.extrinsics_only:
+            recalibrate_extrinsics(projector_captures, args.extrinsics_only, proj_shapes, chess_shape,
+                                   chess_block_size, gc_step, black_thr, white_thr, debug_mode, output_file,
+                                   args.memory_budget, decode_mode, phase_params, args.history, True)
+            return
+        calibrate_multi_projector(projector_captures, proj_shapes, chess_shape, chess_block_size,
+                                  gc_step, black_thr, white_thr, camP, cam_dist, debug_mode,
+                                  output_file, args.workers, args.memory_budget, decode_mode,
+                                  phase_params, args.history, model_selection)
+        return
 
     dirnames = sorted(glob.glob('./capture_*'))
     if len(dirnames) == 0:
@@ -307,20 +430,19 @@ def main():
         gc_fname_lists.append(gc_fnames)
         logger.info(f' \'{dname}\' was found')
 
-    camP = None
-    cam_dist = None
-    if camera_param_file:
-        path, ext = os.path.splitext(camera_param_file)
-        if ext == ".json":
-            camP, cam_dist = loadCameraParam(camera_param_file)
-            logger.info('Loaded camera parameters')
-            if debug_mode:
-                logger.info(f'Camera matrix:\n{camP}')
-                logger.info(f'Distortion coefficients:\n{cam_dist}')
-
+    decode_mode, phase_params = resolve_decode_mode(args.decode_mode, used_dirnames)
+    if args.extrinsics_only:
+        # 单投影仪目录结构：对应基准结果中的唯一投影仪
+        captures = {None: list(zip(used_dirnames, gc_fname_lists))}
+        recalibrate_extrinsics(captures, args.extrinsics_only, {None: proj_shape}, chess_shape,
+                               chess_block_size, gc_step, black_thr, white_thr, debug_mode, output_file,
+                               args.memory_budget, decode_mode, phase_params, args.history, False)
+        return
     calibrate_optimized(used_dirnames, gc_fname_lists,
                        proj_shape, chess_shape, chess_block_size, gc_step, 
-                       black_thr, white_thr, camP, cam_dist, debug_mode, output_file)
+                       black_thr, white_thr, camP, cam_dist, debug_mode, output_file,
+                       args.memory_budget, decode_mode, phase_params, args.history, model_selection,
+                       args.workers)
 
 def printNumpyWithIndent(tar, indentchar):
     print(indentchar + str(tar).replace('\n', '\n' + indentchar))
@@ -336,33 +458,190 @@ def loadCameraParam(json_file):
         logger.error(f"Failed to load camera parameters: {e}")
         return None, None
 
+def make_object_points(chess_shape, chess_block_size):
+    """创建棋盘格物体点"""
+    objps = np.zeros((chess_shape[0] * chess_shape[1], 3), np.float32)
+    objps[:, :2] = chess_block_size * \
+        np.mgrid[0:chess_shape[0], 0:chess_shape[1]].T.reshape(-1, 2)
+    return objps
+
+def create_graycode_decoder(proj_shape, gc_step, black_thr, white_thr, memory_budget_mb=256.0,
+                            decode_mode='standard', phase_params=DEFAULT_PHASE_PARAMS):
+    """按投影仪分辨率与步长创建分块解码器（相移模式忽略步长，输出连续坐标）"""
+    if decode_mode == 'phase_shift':
+        period, steps = phase_params
+        return PhaseShiftDecoder(proj_shape[1], proj_shape[0], period, steps, black_thr,
+                                 memory_budget_mb=memory_budget_mb)
+    gc_height = int((proj_shape[0] - 1) / gc_step) + 1
+    gc_width = int((proj_shape[1] - 1) / gc_step) + 1
+    return TiledGrayCodeDecoder(gc_width, gc_height, black_thr, white_thr,
+                                memory_budget_mb=memory_budget_mb, mode=decode_mode)
+
+def resolve_decode_mode(requested, dirnames):
+    """
+    解析解码模式：auto 时读取拍摄目录中的 pattern_manifest.json，未找到则使用标准模式
+
+    Returns:
+        (decode_mode, phase_params)
+    """
+    manifest = None
+    for dname in dirnames:
+        manifest = PatternManifest.load(dname)
+        if manifest is not None:
+            break
+    mode = requested
+    if requested == 'auto':
+        mode = manifest.mode if manifest is not None else 'standard'
+    phase_params = DEFAULT_PHASE_PARAMS
+    if manifest is not None and manifest.phase_period > 0:
+        phase_params = (manifest.phase_period, manifest.phase_steps)
+    return mode, phase_params
+
+def corner_fit_settings(cam_shape, decode_mode, gc_step):
+    """
+    角点局部单应性的拟合参数
+
+    相移模式得到连续亚像素坐标，小patch + 最小二乘即可；格雷码模式为整数坐标，需大patch + RANSAC。
+
+    Returns:
+        (patch_size_half, coord_scale, fit_method)
+    """
+    if decode_mode == 'phase_shift':
+        return max(2, int(np.ceil(cam_shape[1] / 720))), 1, 0
+    return max(3, int(np.ceil(cam_shape[1] / 180))), gc_step, cv2.RANSAC  # 最小patch大小为3
+
+def select_capture_files(dname, gc_filenames, expected_images):
+    """
+    检查一次拍摄的格雷码图像数量
+
+    Returns:
+        按解码顺序排列的文件名列表，数量不足时返回 None
+    """
+    actual_images = len(gc_filenames)
+    if actual_images < expected_images:
+        logger.error(f'Insufficient number of images in \'{dname}\' (expected at least {expected_images}, got {actual_images})')
+        return None
+    elif actual_images > expected_images:
+        logger.warning(f'More images than expected in \'{dname}\' (expected {expected_images}, got {actual_images}). Using first {expected_images} images.')
+        gc_filenames = gc_filenames[:expected_images]
+    return gc_filenames
+
+def corners_roi(cam_corners, patch_size_half, cam_shape):
+    """包含全部角点patch（外加1像素邻域检查边界）的相机ROI (x0, y0, x1, y1)"""
+    pts = np.round(cam_corners.reshape(-1, 2)).astype(int)
+    margin = patch_size_half + 1
+    x0, y0 = np.maximum(pts.min(axis=0) - margin, 0)
+    x1 = min(cam_shape[1], pts[:, 0].max() + margin + 1)
+    y1 = min(cam_shape[0], pts[:, 1].max() + margin + 1)
+    return int(x0), int(y0), int(x1), int(y1)
+
+def decode_capture(decoder, dname, gc_filenames, cam_corners, cam_shape, patch_size_half):
+    """分块解码一次拍摄中角点所在ROI，失败时返回 None"""
+    try:
+        return decoder.decode(gc_filenames, roi=corners_roi(cam_corners, patch_size_half, cam_shape))
+    except Exception as e:
+        logger.error(f"Error decoding images from '{dname}': {e}")
+        return None
+
+def decode_projector_corners(maps, cam_corners, objps, proj_shape, gc_step,
+                             patch_size_half, debug_mode=False, fit_method=cv2.RANSAC):
+    """
+    在每个相机角点周围的patch内查询稠密解码结果，并通过局部单应性求投影仪亚像素角点
+
+    Returns:
+        (proj_objps, proj_corners, cam_corners2): 成功对应的物体点、投影仪角点与相机角点
+    """
+    ox, oy = maps.origin
+    map_h, map_w = maps.valid.shape
+    proj_objps = []
+    proj_corners = []
+    cam_corners2 = []
+
+    for corner, objp in zip(cam_corners, objps):
+        c_x = int(round(corner[0][0]))
+        c_y = int(round(corner[0][1]))
+
+        # patch 与解码ROI求交（越界部分直接跳过）
+        x0, x1 = max(c_x - patch_size_half, ox), min(c_x + patch_size_half + 1, ox + map_w)
+        y0, y1 = max(c_y - patch_size_half, oy), min(c_y + patch_size_half + 1, oy + map_h)
+        win = (slice(y0 - oy, y1 - oy), slice(x0 - ox, x1 - ox))
+        # 转置为 x 优先顺序，与逐像素扫描（dx 外层、dy 内层）的点序一致
+        valid = maps.valid[win].T
+        xs, ys = np.meshgrid(np.arange(x0, x1), np.arange(y0, y1), indexing='ij')
+        src_points = np.stack([xs[valid], ys[valid]], axis=1)
+        dst_points = np.stack([maps.x[win].T[valid], maps.y[win].T[valid]], axis=1)
+        # 格雷码为整数坐标（乘步长），相移模式为连续坐标
+        dst_points = gc_step * (dst_points.astype(np.int64) if dst_points.dtype.kind in 'iu' else dst_points)
+
+        # 检查是否有足够的点进行单应性计算
+        min_points = max(4, patch_size_half)  # 至少需要4个点
+        if len(src_points) < min_points:
+            if debug_mode:
+                logger.warning(f'    Corner ({c_x}, {c_y}) skipped: insufficient decoded pixels ({len(src_points)} < {min_points})')
+            continue
+
+        try:
+            # 使用RANSAC计算单应性矩阵，提高鲁棒性（相移模式使用最小二乘）
+            h_mat, inliers = cv2.findHomography(
+                src_points, dst_points,
+                fit_method, 1.0)  # RANSAC阈值
+
+            if h_mat is None:
+                if debug_mode:
+                    logger.warning(f'    Corner ({c_x}, {c_y}) skipped: homography calculation failed')
+                continue
+
+            # 计算投影仪坐标
+            point = h_mat @ np.array([corner[0][0], corner[0][1], 1]).transpose()
+            if abs(point[2]) < 1e-8:  # 避免除零
+                if debug_mode:
+                    logger.warning(f'    Corner ({c_x}, {c_y}) skipped: invalid homogeneous coordinate')
+                continue
+
+            point_pix = point[0:2] / point[2]
+
+            # 验证投影仪坐标的合理性
+            if (0 <= point_pix[0] < proj_shape[1] and 0 <= point_pix[1] < proj_shape[0]):
+                proj_objps.append(objp)
+                proj_corners.append([point_pix])
+                cam_corners2.append(corner)
+            elif debug_mode:
+                logger.warning(f'    Corner ({c_x}, {c_y}) skipped: projected point out of bounds ({point_pix[0]:.1f}, {point_pix[1]:.1f})')
+
+        except Exception as e:
+            if debug_mode:
+                logger.warning(f'    Corner ({c_x}, {c_y}) skipped: {e}')
+            continue
+
+    return proj_objps, proj_corners, cam_corners2
+
 def calibrate_optimized(dirnames, gc_fname_lists, proj_shape, chess_shape, chess_block_size, 
                        gc_step, black_thr, white_thr, camP, camD, debug_mode=False, 
-                       output_file='calibration_result_optimized.xml'):
-    """优化的标定函数"""
+                       output_file='calibration_result_optimized.xml', memory_budget_mb=256.0,
+                       decode_mode='standard', phase_params=DEFAULT_PHASE_PARAMS, history_file=None,
+                       model_selection=DEFAULT_MODEL_SELECTION, workers=None):
+    """优化的标定函数（memory_budget_mb 为单次拍摄分块解码的中间内存预算，decode_mode 见 DECODE_MODES；
+    history_file 非空时将本次结果追加到标定历史库；model_selection 为畸变模型选择参数，
+    交叉验证在 workers 个进程中并行执行）"""
+    started = time.perf_counter()
     
     # 创建物体点
-    objps = np.zeros((chess_shape[0] * chess_shape[1], 3), np.float32)
-    objps[:, :2] = chess_block_size * \
-        np.mgrid[0:chess_shape[0], 0:chess_shape[1]].T.reshape(-1, 2)
+    objps = make_object_points(chess_shape, chess_block_size)
 
     logger.info('开始优化标定流程...')
     
-    # 创建格雷码模式
-    gc_height = int((proj_shape[0] - 1) / gc_step) + 1
-    gc_width = int((proj_shape[1] - 1) / gc_step) + 1
-    graycode = cv2.structured_light_GrayCodePattern.create(gc_width, gc_height)
-    graycode.setBlackThreshold(black_thr)
-    graycode.setWhiteThreshold(white_thr)
+    # 创建分块格雷码解码器
+    decoder = create_graycode_decoder(proj_shape, gc_step, black_thr, white_thr, memory_budget_mb,
+                                      decode_mode, phase_params)
+    logger.info(f'  decode mode : {decode_mode}')
 
     # 获取图像尺寸
     cam_shape = cv2.imread(gc_fname_lists[0][0], cv2.IMREAD_GRAYSCALE).shape
-    patch_size_half = max(3, int(np.ceil(cam_shape[1] / 180)))  # 最小patch大小为3
+    patch_size_half, coord_scale, fit_method = corner_fit_settings(cam_shape, decode_mode, gc_step)
     logger.info(f'  patch size : {patch_size_half * 2 + 1}')
 
-    # 创建优化的检测器和解码器
+    # 创建优化的检测器和标定器
     detector = OptimizedChessboardDetector(chess_shape)
-    decoder = OptimizedGrayCodeDecoder(graycode, black_thr, white_thr)
     calibrator = OptimizedCalibrator()
 
     cam_corners_list = []
@@ -372,114 +651,35 @@ def calibrate_optimized(dirnames, gc_fname_lists, proj_shape, chess_shape, chess
     proj_corners_list = []
     
     successful_captures = 0
+    expected_images = decoder.pattern_count
     
     for dname, gc_filenames in zip(dirnames, gc_fname_lists):
         logger.info(f'  processing \'{dname}\'')
-        
-        expected_images = graycode.getNumberOfPatternImages() + 2
-        actual_images = len(gc_filenames)
-        
-        if actual_images < expected_images:
-            logger.error(f'Insufficient number of images in \'{dname}\' (expected at least {expected_images}, got {actual_images})')
-            continue
-        elif actual_images > expected_images:
-            logger.warning(f'More images than expected in \'{dname}\' (expected {expected_images}, got {actual_images}). Using first {expected_images} images.')
-            gc_filenames = gc_filenames[:expected_images]
 
-        # 加载图像
-        imgs = []
-        try:
-            for fname in gc_filenames:
-                img = cv2.imread(fname, cv2.IMREAD_GRAYSCALE)
-                if img is None:
-                    raise ValueError(f"Cannot read image: {fname}")
-                if cam_shape != img.shape:
-                    raise ValueError(f"Image size mismatch in '{fname}'")
-                imgs.append(img)
-        except Exception as e:
-            logger.error(f"Error loading images from '{dname}': {e}")
+        # 只加载白图用于角点检测；格雷码序列在解码阶段按帧流式读取
+        gc_filenames = select_capture_files(dname, gc_filenames, expected_images)
+        if gc_filenames is None:
+            continue
+        white_img = cv2.imread(gc_filenames[expected_images - 2], cv2.IMREAD_GRAYSCALE)
+        if white_img is None or white_img.shape != cam_shape:
+            logger.error(f'Error loading images from \'{dname}\': cannot read white image or size mismatch')
             continue
-            
-        black_img = imgs.pop()
-        white_img = imgs.pop()
 
         # 使用优化的棋盘格检测
         res, cam_corners = detector.detect_corners(white_img, debug=debug_mode)
         if not res:
-            logger.warning(f'Chessboard was not found in \'{gc_filenames[-2]}\', skipping this capture')
+            logger.warning(f'Chessboard was not found in \'{gc_filenames[expected_images - 2]}\', skipping this capture')
             continue
             
         cam_objps_list.append(objps)
         cam_corners_list.append(cam_corners)
 
-        # 处理投影仪角点
-        proj_objps = []
-        proj_corners = []
-        cam_corners2 = []
-        successful_corners = 0
-        
-        for corner, objp in zip(cam_corners, objps):
-            c_x = int(round(corner[0][0]))
-            c_y = int(round(corner[0][1]))
-            src_points = []
-            dst_points = []
-            
-            # 在patch内搜索有效像素
-            for dx in range(-patch_size_half, patch_size_half + 1):
-                for dy in range(-patch_size_half, patch_size_half + 1):
-                    x = c_x + dx
-                    y = c_y + dy
-                    
-                    # 边界检查
-                    if x < 0 or x >= cam_shape[1] or y < 0 or y >= cam_shape[0]:
-                        continue
-                    
-                    # 使用优化的解码器
-                    success, proj_pix = decoder.decode_with_validation(imgs, x, y, white_img, black_img)
-                    if success:
-                        src_points.append((x, y))
-                        dst_points.append(gc_step * np.array(proj_pix))
-            
-            # 检查是否有足够的点进行单应性计算
-            min_points = max(4, patch_size_half)  # 至少需要4个点
-            if len(src_points) < min_points:
-                if debug_mode:
-                    logger.warning(f'    Corner ({c_x}, {c_y}) skipped: insufficient decoded pixels ({len(src_points)} < {min_points})')
-                continue
-            
-            try:
-                # 使用RANSAC计算单应性矩阵，提高鲁棒性
-                h_mat, inliers = cv2.findHomography(
-                    np.array(src_points), np.array(dst_points),
-                    cv2.RANSAC, 1.0)  # RANSAC阈值
-                
-                if h_mat is None:
-                    if debug_mode:
-                        logger.warning(f'    Corner ({c_x}, {c_y}) skipped: homography calculation failed')
-                    continue
-                
-                # 计算投影仪坐标
-                point = h_mat @ np.array([corner[0][0], corner[0][1], 1]).transpose()
-                if abs(point[2]) < 1e-8:  # 避免除零
-                    if debug_mode:
-                        logger.warning(f'    Corner ({c_x}, {c_y}) skipped: invalid homogeneous coordinate')
-                    continue
-                    
-                point_pix = point[0:2] / point[2]
-                
-                # 验证投影仪坐标的合理性
-                if (0 <= point_pix[0] < proj_shape[1] and 0 <= point_pix[1] < proj_shape[0]):
-                    proj_objps.append(objp)
-                    proj_corners.append([point_pix])
-                    cam_corners2.append(corner)
-                    successful_corners += 1
-                elif debug_mode:
-                    logger.warning(f'    Corner ({c_x}, {c_y}) skipped: projected point out of bounds ({point_pix[0]:.1f}, {point_pix[1]:.1f})')
-                    
-            except Exception as e:
-                if debug_mode:
-                    logger.warning(f'    Corner ({c_x}, {c_y}) skipped: {e}')
-                continue
+        # 分块解码角点ROI，再处理投影仪角点
+        maps = decode_capture(decoder, dname, gc_filenames, cam_corners, cam_shape, patch_size_half)
+        if maps is None:
+            continue
+        proj_objps, proj_corners, cam_corners2 = decode_projector_corners(
+            maps, cam_corners, objps, proj_shape, coord_scale, patch_size_half, debug_mode, fit_method)
         
         # 检查是否有足够的角点
         if len(proj_corners) < 6:  # 增加最小角点要求
@@ -491,7 +691,7 @@ def calibrate_optimized(dirnames, gc_fname_lists, proj_shape, chess_shape, chess
         cam_corners_list2.append(np.float32(cam_corners2))
         successful_captures += 1
         
-        logger.info(f'    Successfully processed {successful_corners}/{len(cam_corners)} corners')
+        logger.info(f'    Successfully processed {len(proj_corners)}/{len(cam_corners)} corners')
 
     if successful_captures == 0:
         logger.error('No valid captures found for calibration')
@@ -499,34 +699,16 @@ def calibrate_optimized(dirnames, gc_fname_lists, proj_shape, chess_shape, chess
         
     logger.info(f'Successfully processed {successful_captures} captures')
 
-    # 相机标定
-    logger.info('Calibrating camera with modern methods...')
-    cam_rvecs = []
-    cam_tvecs = []
-    
-    if camP is None:
-        ret, cam_int, cam_dist, cam_rvecs, cam_tvecs = calibrator.calibrate_camera_modern(
-            cam_objps_list, cam_corners_list, cam_shape)
-        logger.info(f'  Camera calibration RMS : {ret:.6f}')
-    else:
-        # 使用预设参数进行PnP求解
-        for objp, corners in zip(cam_objps_list, cam_corners_list):
-            ret, cam_rvec, cam_tvec = cv2.solvePnP(objp, corners, camP, camD)
-            cam_rvecs.append(cam_rvec)
-            cam_tvecs.append(cam_tvec)
-        cam_int = camP
-        cam_dist = camD
-        logger.info('  Using provided camera parameters')
-    
-    logger.info('  Camera intrinsic parameters :')
-    printNumpyWithIndent(cam_int, '    ')
-    logger.info('  Camera distortion parameters :')
-    printNumpyWithIndent(cam_dist, '    ')
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # 相机标定
+        logger.info('Calibrating camera with modern methods...')
+        cam_int, cam_dist, cam_rvecs, cam_tvecs, cam_model, cam_selection = solve_camera(
+            calibrator, cam_objps_list, cam_corners_list, cam_shape, camP, camD, model_selection, pool.map)
 
-    # 投影仪标定
-    logger.info('Calibrating projector with modern methods...')
-    ret, proj_int, proj_dist, proj_rvecs, proj_tvecs = calibrator.calibrate_camera_modern(
-        proj_objps_list, proj_corners_list, proj_shape)
+        # 投影仪标定
+        logger.info('Calibrating projector with modern methods...')
+        ret, proj_int, proj_dist, proj_rvecs, proj_tvecs, proj_model, proj_selection = fit_intrinsics(
+            calibrator, proj_objps_list, proj_corners_list, proj_shape, model_selection, pool.map)
     logger.info(f'  Projector calibration RMS : {ret:.6f}')
     logger.info('  Projector intrinsic parameters :')
     printNumpyWithIndent(proj_int, '    ')
@@ -538,6 +720,9 @@ def calibrate_optimized(dirnames, gc_fname_lists, proj_shape, chess_shape, chess
     ret, cam_int, cam_dist, proj_int, proj_dist, cam_proj_rmat, cam_proj_tvec, E, F = calibrator.stereo_calibrate_modern(
         proj_objps_list, cam_corners_list2, proj_corners_list, 
         cam_int, cam_dist, proj_int, proj_dist, cam_shape)
+    proj_dist = trim_coefficients(proj_dist, get_model(proj_model))
+    if cam_model is not None:
+        cam_dist = trim_coefficients(cam_dist, get_model(cam_model))
     
     logger.info('=== Final Results ===')
     logger.info(f'  Final RMS error : {ret:.6f}')
@@ -556,22 +741,503 @@ def calibrate_optimized(dirnames, gc_fname_lists, proj_shape, chess_shape, chess
 
     # 保存结果
     try:
-        fs = cv2.FileStorage(output_file, cv2.FILE_STORAGE_WRITE)
-        fs.write('img_shape', cam_shape)
-        fs.write('rms', ret)
-        fs.write('cam_int', cam_int)
-        fs.write('cam_dist', cam_dist)
-        fs.write('proj_int', proj_int)
-        fs.write('proj_dist', proj_dist)
-        fs.write('rotation', cam_proj_rmat)
-        fs.write('translation', cam_proj_tvec)
-        fs.write('successful_captures', successful_captures)
-        fs.release()
-        logger.info(f'Calibration results saved to {output_file}')
+        bundle = CalibrationBundle(
+            img_shape=cam_shape, rms=ret, cam_int=cam_int, cam_dist=cam_dist,
+            successful_captures=successful_captures,
+            projectors=[ProjectorCalibration(0, proj_shape, ret, proj_int, proj_dist, cam_proj_rmat,
+                                             cam_proj_tvec, successful_captures, proj_model)])
+        save_calibration_results(bundle, output_file, [f for fnames in gc_fname_lists for f in fnames],
+                                 decode_mode, False, history_file, time.perf_counter() - started,
+                                 provenance=model_provenance(cam_model, cam_selection, {0: proj_selection}))
     except Exception as e:
         logger.error(f'Failed to save calibration results: {e}')
 
     return ret
 
+def write_result_xml(bundle, output_file, multi_projector):
+    """
+    写出 OpenCV FileStorage 格式的 XML 结果
+
+    单投影仪：投影仪参数位于顶层；多投影仪：相机参数位于顶层，各投影仪为 projectors 序列中的一项
+    """
+    fs = cv2.FileStorage(output_file, cv2.FILE_STORAGE_WRITE)
+    fs.write('img_shape', tuple(bundle.img_shape))
+    fs.write('rms', bundle.rms)
+    fs.write('cam_int', np.asarray(bundle.cam_int))
+    fs.write('cam_dist', np.asarray(bundle.cam_dist))
+    if not multi_projector:
+        proj = bundle.projectors[0]
+        fs.write('proj_shape', tuple(proj.proj_shape))
+        if proj.distortion_model:
+            fs.write('distortion_model', proj.distortion_model)
+        fs.write('proj_int', np.asarray(proj.proj_int))
+        fs.write('proj_dist', np.asarray(proj.proj_dist))
+        fs.write('rotation', np.asarray(proj.rotation))
+        fs.write('translation', np.asarray(proj.translation))
+        fs.write('successful_captures', bundle.successful_captures)
+    else:
+        fs.write('successful_captures', bundle.successful_captures)
+        fs.write('projector_count', len(bundle.projectors))
+        fs.startWriteStruct('projectors', cv2.FileNode_SEQ)
+        for proj in bundle.projectors:
+            fs.startWriteStruct('', cv2.FileNode_MAP)
+            fs.write('id', proj.id)
+            fs.write('proj_shape', tuple(proj.proj_shape))
+            fs.write('rms', proj.rms)
+            if proj.distortion_model:
+                fs.write('distortion_model', proj.distortion_model)
+            fs.write('proj_int', np.asarray(proj.proj_int))
+            fs.write('proj_dist', np.asarray(proj.proj_dist))
+            fs.write('rotation', np.asarray(proj.rotation))
+            fs.write('translation', np.asarray(proj.translation))
+            fs.write('successful_captures', proj.successful_captures)
+            fs.endWriteStruct()
+        fs.endWriteStruct()
+    fs.release()
+    logger.info(f'Calibration results saved to {output_file}')
+
+def save_calibration_results(bundle, output_file, input_files, decode_mode, multi_projector=False,
+                             history_file=None, duration_s=None, mode='full', provenance=None):
+    """写出 XML 结果与同名二进制标定包（.calib，供服务端与工具快速加载），并追加到标定历史库"""
+    write_result_xml(bundle, output_file, multi_projector)
+    bundle.provenance = {
+        'source_xml_sha256': sha256_files([output_file]),
+        'inputs_sha256': sha256_files(input_files),
+        'input_count': len(input_files),
+        'decode_mode': decode_mode,
+        'mode': mode,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        **(provenance or {}),
+    }
+    path = bundle.save(bundle_path_for(output_file))
+    logger.info(f'Calibration bundle saved to {path}')
+    if history_file:
+        with CalibrationHistory(history_file) as history:
+            run_id = history.record(bundle, mode=mode, duration_s=duration_s, source=path)
+        logger.info(f'Recorded as run {run_id} in {history_file}')
+    return path
+
+def solve_camera(calibrator, cam_objps_list, cam_corners_list, cam_shape, camP, camD,
+                 model_selection=DEFAULT_MODEL_SELECTION, map_fn=map):
+    """
+    求解相机内参与各标定板位姿（提供内参时仅做PnP）
+
+    Returns:
+        (cam_int, cam_dist, rvecs, tvecs, model_name, selection)；使用预设内参时 model_name 与 selection 为 None
+    """
+    cam_rvecs = []
+    cam_tvecs = []
+    cam_model = None
+    selection = None
+    
+    if camP is None:
+        ret, cam_int, cam_dist, cam_rvecs, cam_tvecs, cam_model, selection = fit_intrinsics(
+            calibrator, cam_objps_list, cam_corners_list, cam_shape, model_selection, map_fn)
+        logger.info(f'  Camera calibration RMS : {ret:.6f}')
+    else:
+        # 使用预设参数进行PnP求解
+        for objp, corners in zip(cam_objps_list, cam_corners_list):
+            ret, cam_rvec, cam_tvec = cv2.solvePnP(objp, corners, camP, camD)
+            cam_rvecs.append(cam_rvec)
+            cam_tvecs.append(cam_tvec)
+        cam_int = camP
+        cam_dist = camD
+        logger.info('  Using provided camera parameters')
+    
+    logger.info('  Camera intrinsic parameters :')
+    printNumpyWithIndent(cam_int, '    ')
+    logger.info('  Camera distortion parameters :')
+    printNumpyWithIndent(cam_dist, '    ')
+    return cam_int, cam_dist, cam_rvecs, cam_tvecs, cam_model, selection
+
+def model_provenance(cam_model, cam_selection, proj_selections):
+    """畸变模型选择记录（写入标定包与历史库的 provenance）"""
+    return {'distortion_selection': {
+        'camera': {'model': cam_model, 'cv': cam_selection.to_dict() if cam_selection else None},
+        'projectors': {str(pid): sel.to_dict() if sel else None for pid, sel in proj_selections.items()},
+    }}
+
+def find_multi_projector_captures(root='.'):
+    """
+    查找多投影仪拍摄目录（./capture_*/projector_*/graycode_*）
+
+    Returns:
+        {projector_id: [(capture_dir, gc_fnames), ...]}，按投影仪编号排序；
+        若不存在多投影仪目录结构则返回空字典
+    """
+    captures = {}
+    for dname in sorted(glob.glob(os.path.join(root, 'capture_*'))):
+        for pdir in sorted(glob.glob(os.path.join(dname, 'projector_*'))):
+            gc_fnames = sorted(glob.glob(pdir + '/graycode_*'))
+            if len(gc_fnames) == 0:
+                continue
+            try:
+                proj_id = int(os.path.basename(pdir).split('_', 1)[1])
+            except ValueError:
+                logger.warning(f'Unrecognized projector directory \'{pdir}\', skipping')
+                continue
+            captures.setdefault(proj_id, []).append((dname, gc_fnames))
+    return dict(sorted(captures.items()))
+
+def _detect_round_corners_task(args):
+    """进程池任务：合成同一轮次各投影仪的白图并检测棋盘格角点"""
+    white_fnames, chess_shape, debug_mode = args
+    composite = None
+    for fname in white_fnames:
+        img = cv2.imread(fname, cv2.IMREAD_GRAYSCALE)
+        if img is None:
+            continue
+        # 各投影仪只照亮各自区域，取逐像素最大值得到完整照明的棋盘格
+        composite = img if composite is None else np.maximum(composite, img)
+    if composite is None:
+        return None
+    res, cam_corners = OptimizedChessboardDetector(chess_shape).detect_corners(composite, debug=debug_mode)
+    return cam_corners if res else None
+
+def _decode_projector_round_task(args):
+    """进程池任务：解码某投影仪在某轮次中的格雷码，返回投影仪角点对应关系"""
+    (dname, gc_filenames, cam_corners, cam_shape, proj_shape, objps,
+     gc_step, black_thr, white_thr, debug_mode, memory_budget_mb, decode_mode, phase_params) = args
+    decoder = create_graycode_decoder(proj_shape, gc_step, black_thr, white_thr, memory_budget_mb,
+                                      decode_mode, phase_params)
+    patch_size_half, coord_scale, fit_method = corner_fit_settings(cam_shape, decode_mode, gc_step)
+    gc_filenames = select_capture_files(dname, gc_filenames, decoder.pattern_count)
+    if gc_filenames is None:
+        return None
+    maps = decode_capture(decoder, dname, gc_filenames, cam_corners, cam_shape, patch_size_half)
+    if maps is None:
+        return None
+    proj_objps, proj_corners, cam_corners2 = decode_projector_corners(
+        maps, cam_corners, objps, proj_shape, coord_scale, patch_size_half, debug_mode, fit_method)
+    if len(proj_corners) < 6:
+        logger.warning(f'Too few corners found in \'{os.path.dirname(gc_filenames[0])}\' ({len(proj_corners)} < 6), skipping')
+        return None
+    return np.float32(proj_objps), np.float32(proj_corners), np.float32(cam_corners2)
+
+def _solve_projector_task(args):
+    """进程池任务：固定相机内参，求解单个投影仪的内参与相机->投影仪外参"""
+    (proj_id, proj_shape, proj_objps_list, proj_corners_list, cam_corners_list2,
+     cam_int, cam_dist, cam_shape, model_selection) = args
+    calibrator = OptimizedCalibrator()
+    # 已在进程池中并行各投影仪，交叉验证在本进程内顺序执行
+    proj_rms, proj_int, proj_dist, _, _, model, selection = fit_intrinsics(
+        calibrator, proj_objps_list, proj_corners_list, proj_shape, model_selection)
+    ret, _, _, proj_int, proj_dist, rmat, tvec, _, _ = calibrator.stereo_calibrate_modern(
+        proj_objps_list, cam_corners_list2, proj_corners_list,
+        cam_int, cam_dist, proj_int, proj_dist, cam_shape)
+    proj_dist = trim_coefficients(proj_dist, get_model(model))
+    return {
+        'id': proj_id,
+        'shape': proj_shape,
+        'proj_rms': proj_rms,
+        'rms': ret,
+        'proj_int': proj_int,
+        'proj_dist': proj_dist,
+        'rotation': rmat,
+        'translation': tvec,
+        'captures': len(proj_corners_list),
+        'distortion_model': model,
+        'selection': selection,
+    }
+
+def calibrate_multi_projector(projector_captures, proj_shapes, chess_shape, chess_block_size,
+                              gc_step, black_thr, white_thr, camP, camD, debug_mode=False,
+                              output_file='calibration_result_optimized.xml', workers=None,
+                              memory_budget_mb=256.0, decode_mode='standard',
+                              phase_params=DEFAULT_PHASE_PARAMS, history_file=None,
+                              model_selection=DEFAULT_MODEL_SELECTION):
+    """
+    多投影仪标定：相机内参与标定板位姿只求解一次，各投影仪的解码与立体标定并行执行
+
+    Args:
+        projector_captures: {projector_id: [(capture_dir, gc_fnames), ...]}
+        proj_shapes: {projector_id: (height, width)}
+        workers: 进程池大小（默认CPU核数）
+        memory_budget_mb: 每个解码任务的分块中间内存预算
+        decode_mode: 解码模式（standard / complementary / phase_shift）
+        phase_params: 相移模式的 (period, steps)
+        history_file: 标定历史库路径（为空则不记录）
+        model_selection: 畸变模型选择参数 (model, folds, tolerance)
+
+    Returns:
+        各投影仪立体标定RMS中的最大值，失败时返回 None
+    """
+    started = time.perf_counter()
+    objps = make_object_points(chess_shape, chess_block_size)
+    proj_ids = list(projector_captures.keys())
+    logger.info(f'开始多投影仪标定流程（{len(proj_ids)} 台投影仪）...')
+    logger.info(f'  decode mode : {decode_mode}')
+
+    # 按拍摄轮次（capture_*目录）组织：同一轮次内标定板静止，所有投影仪共享相机角点
+    rounds = sorted({dname for caps in projector_captures.values() for dname, _ in caps})
+    by_round = {pid: dict(caps) for pid, caps in projector_captures.items()}
+
+    first_fnames = projector_captures[proj_ids[0]][0][1]
+    cam_shape = cv2.imread(first_fnames[0], cv2.IMREAD_GRAYSCALE).shape
+    patch_size_half = corner_fit_settings(cam_shape, decode_mode, gc_step)[0]
+    logger.info(f'  patch size : {patch_size_half * 2 + 1}')
+
+    expected = {pid: create_graycode_decoder(proj_shapes[pid], gc_step, black_thr, white_thr,
+                                             decode_mode=decode_mode, phase_params=phase_params).pattern_count
+                for pid in proj_ids}
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # 1) 每轮次检测一次相机角点
+        detect_args = []
+        for dname in rounds:
+            white_fnames = [by_round[pid][dname][expected[pid] - 2] for pid in proj_ids
+                            if dname in by_round[pid] and len(by_round[pid][dname]) >= expected[pid]]
+            detect_args.append((white_fnames, chess_shape, debug_mode))
+        round_corners = {}
+        for dname, cam_corners in zip(rounds, pool.map(_detect_round_corners_task, detect_args)):
+            if cam_corners is None:
+                logger.warning(f'Chessboard was not found in \'{dname}\', skipping this round')
+                continue
+            round_corners[dname] = cam_corners
+        if not round_corners:
+            logger.error('No valid captures found for calibration')
+            return None
+        logger.info(f'Chessboard detected in {len(round_corners)}/{len(rounds)} rounds')
+
+        # 2) 相机内参与标定板位姿只求解一次
+        calibrator = OptimizedCalibrator()
+        logger.info('Calibrating camera with modern methods...')
+        cam_rounds = list(round_corners.keys())
+        cam_int, cam_dist, cam_rvecs, cam_tvecs, cam_model, cam_selection = solve_camera(
+            calibrator, [objps] * len(cam_rounds), [round_corners[d] for d in cam_rounds],
+            cam_shape, camP, camD, model_selection, pool.map)
+
+        # 3) 所有 (投影仪, 轮次) 的格雷码解码并行执行
+        decode_keys = []
+        decode_args = []
+        for pid in proj_ids:
+            for dname, cam_corners in round_corners.items():
+                if dname not in by_round[pid]:
+                    continue
+                decode_keys.append(pid)
+                decode_args.append((dname, by_round[pid][dname], cam_corners, cam_shape,
+                                    proj_shapes[pid], objps, gc_step, black_thr, white_thr,
+                                    debug_mode, memory_budget_mb, decode_mode, phase_params))
+        correspondences = {pid: [] for pid in proj_ids}
+        for pid, res in zip(decode_keys, pool.map(_decode_projector_round_task, decode_args)):
+            if res is not None:
+                correspondences[pid].append(res)
+
+        # 4) 各投影仪的内参与立体标定并行执行（相机内参固定，外参统一在相机坐标系下）
+        solve_args = []
+        for pid in proj_ids:
+            corr = correspondences[pid]
+            if not corr:
+                logger.warning(f'No valid captures for projector {pid}, skipping')
+                continue
+            logger.info(f'  projector {pid}: {len(corr)} valid captures')
+            solve_args.append((pid, proj_shapes[pid], [c[0] for c in corr], [c[1] for c in corr],
+                               [c[2] for c in corr], cam_int, cam_dist, cam_shape, model_selection))
+        if not solve_args:
+            logger.error('No valid captures found for calibration')
+            return None
+        results = list(pool.map(_solve_projector_task, solve_args))
+
+    logger.info('=== Final Results ===')
+    for res in results:
+        logger.info(f'  Projector {res["id"]} : stereo RMS {res["rms"]:.6f} ({res["captures"]} captures)')
+        logger.info('  Projector intrinsic parameters :')
+        printNumpyWithIndent(res['proj_int'], '    ')
+        logger.info('  Rotation matrix / translation vector from camera to projector :')
+        printNumpyWithIndent(res['rotation'], '    ')
+        printNumpyWithIndent(res['translation'], '    ')
+
+    max_rms = max(res['rms'] for res in results)
+
+    # 保存结果：一个文件包含相机参数与全部投影仪的外参（统一以相机坐标系为公共参考系）
+    try:
+        bundle = CalibrationBundle(
+            img_shape=cam_shape, rms=max_rms, cam_int=cam_int, cam_dist=cam_dist,
+            successful_captures=len(cam_rounds),
+            projectors=[ProjectorCalibration(res['id'], res['shape'], res['rms'], res['proj_int'],
+                                             res['proj_dist'], res['rotation'], res['translation'],
+                                             res['captures'], res['distortion_model']) for res in results])
+        input_files = [f for caps in projector_captures.values() for _, fnames in caps for f in fnames]
+        save_calibration_results(bundle, output_file, input_files, decode_mode, True, history_file,
+                                 time.perf_counter() - started,
+                                 provenance=model_provenance(cam_model, cam_selection,
+                                                             {res['id']: res['selection'] for res in results}))
+    except Exception as e:
+        logger.error(f'Failed to save calibration results: {e}')
+
+    return max_rms
+
+def load_base_result(path):
+    """加载基准标定结果：优先二进制标定包，XML 时按需转换"""
+    path = Path(path)
+    if path.suffix != BUNDLE_SUFFIX and bundle_path_for(path).exists():
+        path = bundle_path_for(path)
+    if path.suffix == BUNDLE_SUFFIX:
+        return CalibrationBundle.load(path), path
+    return CalibrationBundle.from_opencv_xml(path), path
+
+def estimate_board_pose(objps, corners, int_mat, dist):
+    """固定内参求标定板位姿：solvePnP 初值 + LM 细化，返回 (R, t, 重投影RMS)；失败时返回 None"""
+    ok, rvec, tvec = cv2.solvePnP(objps, corners, int_mat, dist, flags=cv2.SOLVEPNP_ITERATIVE)
+    if not ok:
+        return None
+    rvec, tvec = cv2.solvePnPRefineLM(objps, corners, int_mat, dist, rvec, tvec)
+    reproj, _ = cv2.projectPoints(objps, rvec, tvec, int_mat, dist)
+    err = float(np.sqrt(np.mean(np.sum((reproj.reshape(-1, 2) - corners.reshape(-1, 2)) ** 2, axis=1))))
+    return cv2.Rodrigues(rvec)[0], tvec, err
+
+def refine_extrinsics(base_proj, cam_int, cam_dist, proj_objps_list, cam_corners_list2, proj_corners_list,
+                      cam_shape):
+    """
+    固定相机与投影仪内参，仅估计相机->投影仪外参
+
+    每轮分别对相机与投影仪做 PnP，组合得到相对位姿并按角点数加权平均作为初值，
+    再以 CALIB_FIX_INTRINSIC 的立体标定对全部轮次做一次小规模联合细化。
+
+    Returns:
+        (rms, rotation, translation)，无法求解时返回 None
+    """
+    proj_int = np.array(base_proj.proj_int, dtype=np.float64)
+    proj_dist = np.array(base_proj.proj_dist, dtype=np.float64)
+    rotations, translations, weights, errors = [], [], [], []
+    for objps, cam_corners, proj_corners in zip(proj_objps_list, cam_corners_list2, proj_corners_list):
+        cam_pose = estimate_board_pose(objps, cam_corners, cam_int, cam_dist)
+        proj_pose = estimate_board_pose(objps, proj_corners, proj_int, proj_dist)
+        if cam_pose is None or proj_pose is None:
+            continue
+        rmat, tvec = relative_pose(cam_pose[0], cam_pose[1], proj_pose[0], proj_pose[1])
+        logger.info(f'    PnP reprojection RMS camera {cam_pose[2]:.4f} / projector {proj_pose[2]:.4f}')
+        rotations.append(rmat)
+        translations.append(tvec)
+        weights.append(len(objps))
+        errors.append((cam_pose[2] ** 2 + proj_pose[2] ** 2) / 2)
+    if not rotations:
+        return None
+    rmat, tvec = mean_pose(rotations, translations, weights)
+
+    # stereoCalibrate 不接受外参初值（CALIB_USE_EXTRINSIC_GUESS），固定内参后由其自行初始化并联合细化；
+    # 结果与 PnP 平均位姿偏差过大时视为细化失败
+    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 1e-7)
+    try:
+        ret, _, _, _, _, rmat2, tvec2, _, _ = cv2.stereoCalibrate(
+            proj_objps_list, cam_corners_list2, proj_corners_list,
+            cam_int.copy(), cam_dist.copy(), proj_int, proj_dist, cam_shape[::-1],
+            flags=cv2.CALIB_FIX_INTRINSIC, criteria=criteria)
+        if rotation_angle_deg(rmat, rmat2) < 5.0:
+            return ret, rmat2, tvec2
+        logger.warning('Extrinsic refinement diverged from the PnP pose, using the averaged PnP pose')
+    except cv2.error as e:
+        logger.warning(f'Extrinsic refinement failed, using the averaged PnP pose: {e}')
+    return float(np.sqrt(np.average(errors, weights=weights))), rmat, tvec
+
+def recalibrate_extrinsics(projector_captures, base_result, proj_shapes, chess_shape, chess_block_size,
+                           gc_step, black_thr, white_thr, debug_mode=False,
+                           output_file='calibration_result_optimized.xml', memory_budget_mb=256.0,
+                           decode_mode='standard', phase_params=DEFAULT_PHASE_PARAMS, history_file=None,
+                           multi_projector=False):
+    """
+    仅外参快速重标定（投影仪被碰动后使用）：沿用基准结果的相机/投影仪内参与畸变，
+    用 1~2 轮新拍摄只解码标定板附近区域，重新估计相机->投影仪外参并写出为新版本结果
+
+    Args:
+        projector_captures: {projector_id: [(capture_dir, gc_fnames), ...]}；单投影仪目录结构时 id 为 None
+        base_result: 基准结果路径（.calib 或 .xml）
+        proj_shapes: {projector_id: (height, width)}，基准结果未记录投影仪分辨率时使用
+
+    Returns:
+        新结果的 RMS（各投影仪最大值），失败时返回 None
+    """
+    started = time.perf_counter()
+    base_bundle, base_path = load_base_result(base_result)
+    base_digest = sha256_files([base_path])
+    logger.info(f'开始仅外参重标定（基准结果: {base_path}）...')
+    if None in projector_captures:
+        if len(base_bundle.projectors) != 1:
+            logger.error('Single-projector captures need a single-projector base result; '
+                         'use the capture_*/projector_*/ layout for multi-projector rigs')
+            return None
+        pid = base_bundle.projectors[0].id
+        projector_captures = {pid: projector_captures[None]}
+        proj_shapes = {pid: proj_shapes[None]}
+    base_projectors = {p.id: p for p in base_bundle.projectors}
+    cam_int = np.array(base_bundle.cam_int, dtype=np.float64)
+    cam_dist = np.array(base_bundle.cam_dist, dtype=np.float64)
+    objps = make_object_points(chess_shape, chess_block_size)
+
+    first_fnames = next(iter(projector_captures.values()))[0][1]
+    cam_shape = cv2.imread(first_fnames[0], cv2.IMREAD_GRAYSCALE).shape
+    if tuple(cam_shape) != tuple(base_bundle.img_shape):
+        logger.error(f'Camera resolution {cam_shape} differs from the base result {tuple(base_bundle.img_shape)}')
+        return None
+
+    pids = [pid for pid in projector_captures if pid in base_projectors]
+    for pid in projector_captures:
+        if pid not in base_projectors:
+            logger.warning(f'Projector {pid} is not in the base result, skipping')
+    shapes = {pid: tuple(base_projectors[pid].proj_shape) if base_projectors[pid].proj_shape[0] > 0
+              else tuple(proj_shapes[pid]) for pid in pids}
+    expected = {pid: create_graycode_decoder(shapes[pid], gc_step, black_thr, white_thr,
+                                             decode_mode=decode_mode, phase_params=phase_params).pattern_count
+                for pid in pids}
+    by_round = {pid: dict(projector_captures[pid]) for pid in pids}
+    rounds = sorted({dname for pid in pids for dname in by_round[pid]})
+    logger.info(f'  decode mode : {decode_mode}, rounds : {len(rounds)}')
+
+    # 每轮检测一次相机角点（多投影仪时合成各投影仪白图）
+    round_corners = {}
+    for dname in rounds:
+        white_fnames = [by_round[pid][dname][expected[pid] - 2] for pid in pids
+                        if dname in by_round[pid] and len(by_round[pid][dname]) >= expected[pid]]
+        cam_corners = _detect_round_corners_task((white_fnames, chess_shape, debug_mode))
+        if cam_corners is None:
+            logger.warning(f'Chessboard was not found in \'{dname}\', skipping this round')
+            continue
+        round_corners[dname] = cam_corners
+
+    updated = {}
+    for pid in pids:
+        corr = []
+        for dname, cam_corners in round_corners.items():
+            if dname not in by_round[pid]:
+                continue
+            res = _decode_projector_round_task((dname, by_round[pid][dname], cam_corners, cam_shape, shapes[pid],
+                                                objps, gc_step, black_thr, white_thr, debug_mode,
+                                                memory_budget_mb, decode_mode, phase_params))
+            if res is not None:
+                corr.append(res)
+        if not corr:
+            logger.warning(f'No valid captures for projector {pid}, keeping its previous extrinsics')
+            continue
+        base_proj = base_projectors[pid]
+        solved = refine_extrinsics(base_proj, cam_int, cam_dist, [c[0] for c in corr], [c[2] for c in corr],
+                                   [c[1] for c in corr], cam_shape)
+        if solved is None:
+            logger.warning(f'Pose estimation failed for projector {pid}, keeping its previous extrinsics')
+            continue
+        ret, rmat, tvec = solved
+        moved = float(np.linalg.norm(np.asarray(tvec).ravel() - np.asarray(base_proj.translation).ravel()))
+        logger.info(f'  Projector {pid} : RMS {ret:.6f} ({len(corr)} captures), moved {moved:.2f} mm / '
+                    f'{rotation_angle_deg(base_proj.rotation, rmat):.3f} deg')
+        updated[pid] = ProjectorCalibration(pid, shapes[pid], ret, np.array(base_proj.proj_int),
+                                            np.array(base_proj.proj_dist), rmat, tvec, len(corr),
+                                            base_proj.distortion_model)
+    if not updated:
+        logger.error('No projector could be re-posed')
+        return None
+
+    projectors = [updated.get(p.id, p) for p in base_bundle.projectors]
+    bundle = CalibrationBundle(
+        img_shape=tuple(cam_shape), rms=max(p.rms for p in projectors), cam_int=cam_int, cam_dist=cam_dist,
+        successful_captures=len(round_corners), projectors=projectors)
+    input_files = [f for pid in pids for _, fnames in projector_captures[pid] for f in fnames]
+    try:
+        save_calibration_results(bundle, output_file, input_files, decode_mode, multi_projector, history_file,
+                                 time.perf_counter() - started, mode='extrinsics',
+                                 provenance={'base_bundle_sha256': base_digest})
+    except Exception as e:
+        logger.error(f'Failed to save calibration results: {e}')
+    logger.info(f'Extrinsics-only recalibration finished in {time.perf_counter() - started:.1f} s')
+    return bundle.rms
+
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+标定历史工具
+查看历次标定记录、比较两次标定的参数差，并按阈值标记漂移
+
+用法:
+    python calibration_history.py list [-limit N]
+    python calibration_history.py add calibration_result_optimized.calib [-mode full] [-duration 120]
+    python calibration_history.py diff [BASE_RUN RUN]
+    python calibration_history.py drift [-baseline RUN] [-translation_mm 2.0] [-rotation_deg 0.2] ...
+    python calibration_history.py series PROJECTOR_ID
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# 引入仓库根目录，以复用 src 中的标定包与历史库
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from src.modules.projector_calibration.services.calibration_bundle import (
+    BUNDLE_SUFFIX, CalibrationBundle, load_bundle)
+from src.modules.projector_calibration.services.calibration_history import (
+    HISTORY_NAME, CalibrationHistory, DriftThresholds)
+
+
+def print_runs(history, limit):
+    """打印历次运行（最新在前）"""
+    rows = history.runs(limit)
+    if not rows:
+        print('No calibration runs recorded yet.')
+        return
+    print(f"{'run':>5}  {'created_at':<19}  {'mode':<11}  {'rms':>8}  {'captures':>8}  {'duration':>9}  decode")
+    for row in rows:
+        duration = f"{row['duration_s']:.1f}s" if row['duration_s'] is not None else '-'
+        print(f"{row['run_id']:>5}  {row['created_at']:<19}  {row['mode']:<11}  {row['rms']:8.4f}  "
+              f"{row['successful_captures']:>8}  {duration:>9}  {row['decode_mode'] or '-'}")
+
+
+def print_deltas(deltas):
+    """打印参数差（相对基准运行），超出阈值的项以 ! 标记"""
+    if not deltas:
+        print('Nothing to compare.')
+        return 0
+    print(f"{'run':>5}  {'proj':>4}  {'dRMS':>7}  {'dfx%':>7}  {'dfy%':>7}  {'dcx':>7}  {'dcy':>7}  "
+          f"{'dT mm':>7}  {'dR deg':>7}  flags")
+    drifted = 0
+    for d in deltas:
+        flags = ','.join(d.flags)
+        mark = '!' if d.drifted else ' '
+        print(f"{d.run_id:>5}{mark} {d.projector_id:>4}  {d.rms:7.3f}  {d.fx_pct:7.3f}  {d.fy_pct:7.3f}  "
+              f"{d.cx:7.2f}  {d.cy:7.2f}  {d.translation_mm:7.2f}  {d.rotation_deg:7.3f}  {flags}")
+        drifted += d.drifted
+    if drifted:
+        print(f'\n{drifted} projector result(s) drifted beyond thresholds.')
+    return drifted
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Calibration history: list runs, compare runs and flag drift.')
+    parser.add_argument('-db', type=str, default=HISTORY_NAME, help=f'history database (default: {HISTORY_NAME})')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_list = sub.add_parser('list', help='list recorded runs (newest first)')
+    p_list.add_argument('-limit', type=int, default=20)
+
+    p_add = sub.add_parser('add', help='record an existing result (.calib bundle or OpenCV .xml)')
+    p_add.add_argument('result', type=str)
+    p_add.add_argument('-mode', type=str, default='full')
+    p_add.add_argument('-duration', type=float, default=None, help='run time in seconds')
+
+    p_diff = sub.add_parser('diff', help='compare two runs (default: the latest two)')
+    p_diff.add_argument('runs', type=int, nargs='*')
+
+    p_drift = sub.add_parser('drift', help='deltas of all runs against a baseline run, flagged by thresholds')
+    p_drift.add_argument('-baseline', type=int, default=None, help='baseline run (default: first run)')
+    p_drift.add_argument('-since', type=int, default=None, help='only report runs >= this run id')
+    defaults = DriftThresholds()
+    for name in ('focal_pct', 'principal_px', 'translation_mm', 'rotation_deg', 'rms_increase'):
+        p_drift.add_argument(f'-{name}', type=float, default=getattr(defaults, name))
+
+    p_series = sub.add_parser('series', help='all stored parameters of one projector')
+    p_series.add_argument('projector_id', type=int)
+
+    args = parser.parse_args()
+    with CalibrationHistory(args.db) as history:
+        if args.command == 'list':
+            print_runs(history, args.limit)
+        elif args.command == 'add':
+            path = Path(args.result)
+            if path.suffix == BUNDLE_SUFFIX:
+                bundle = load_bundle(path)
+            else:
+                bundle = CalibrationBundle.from_opencv_xml(path)
+            run_id = history.record(bundle, mode=args.mode, duration_s=args.duration, source=path)
+            print(f'Recorded {path} as run {run_id}.')
+        elif args.command == 'diff':
+            if len(args.runs) == 2:
+                base, run = args.runs
+            elif not args.runs:
+                ids = [row['run_id'] for row in history.runs(2)]
+                if len(ids) < 2:
+                    print('Need at least two runs to compare.')
+                    return 0
+                run, base = ids
+            else:
+                parser.error('diff takes no run ids or exactly two (BASE_RUN RUN)')
+            print(f'Run {run} relative to run {base}:')
+            print_deltas(history.compare(base, run))
+        elif args.command == 'drift':
+            thresholds = DriftThresholds(args.focal_pct, args.principal_px, args.translation_mm,
+                                         args.rotation_deg, args.rms_increase)
+            drifted = print_deltas(history.drift(args.baseline, thresholds, args.since))
+            # 存在漂移时返回非零退出码，便于脚本/定时任务判断
+            return 1 if drifted else 0
+        elif args.command == 'series':
+            rows = history.projector_series(args.projector_id)
+            print(f"{'run':>5}  {'created_at':<19}  {'rms':>8}  {'fx':>9}  {'fy':>9}  {'cx':>8}  {'cy':>8}  "
+                  f"{'tx':>8}  {'ty':>8}  {'tz':>8}")
+            for row in rows:
+                print(f"{row['run_id']:>5}  {row['created_at']:<19}  {row['rms']:8.4f}  {row['fx']:9.2f}  "
+                      f"{row['fy']:9.2f}  {row['cx']:8.2f}  {row['cy']:8.2f}  {row['tx']:8.2f}  "
+                      f"{row['ty']:8.2f}  {row['tz']:8.2f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
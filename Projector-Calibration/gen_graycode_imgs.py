@@ -2,10 +2,18 @@
 
 import os
 import os.path
+import sys
+import glob
 import argparse
+from pathlib import Path
+
 import cv2
 import numpy as np
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from src.modules.projector_calibration.services.pattern_manifest import DECODE_MODES, PatternManifest
+from src.modules.projector_calibration.services.phase_shift import generate_phase_shift_patterns
+
 TARGETDIR = './graycode_pattern'
 CAPTUREDDIR = './capture_*'
 
@@ -17,6 +25,16 @@ def main():
     parser.add_argument('proj_width', type=int, help='projector pixel width')
     parser.add_argument('-graycode_step', type=int,
                         default=1, help='step size of graycode [default:1](increase if moire appears)')
+    parser.add_argument('-mode', type=str, choices=DECODE_MODES, default='standard',
+                        help='decode mode recorded in pattern_manifest.json [default:standard]\n'
+                             '  complementary: decide each bit by a per-pixel comparison of the bit-plane\n'
+                             '  and its inverse, relative to the pixel\'s own contrast\n'
+                             '  phase_shift: coarse graycode plus sinusoidal phase-shift frames, decoded to\n'
+                             '  continuous projector coordinates (fewer frames, graycode_step is ignored)')
+    parser.add_argument('-phase_period', type=int, default=32,
+                        help='sinusoid period in projector pixels for -mode phase_shift [default:32]')
+    parser.add_argument('-phase_steps', type=int, default=4,
+                        help='number of phase-shift frames per axis for -mode phase_shift [default:4]')
 
     args = parser.parse_args()
 
@@ -26,30 +44,42 @@ def main():
     gc_height = int((height-1)/step)+1
     gc_width = int((width-1)/step)+1
 
-    graycode = cv2.structured_light_GrayCodePattern.create(gc_width, gc_height)
-    patterns = graycode.generate()[1]
+    if args.mode == 'phase_shift':
+        # coarse graycode + phase-shift frames at full projector resolution (white/black included)
+        step, gc_height, gc_width = 1, height, width
+        exp_patterns = generate_phase_shift_patterns(width, height, args.phase_period, args.phase_steps)
+    else:
+        graycode = cv2.structured_light_GrayCodePattern.create(gc_width, gc_height)
+        patterns = graycode.generate()[1]
 
-    # expand image size
-    exp_patterns = []
-    for pat in patterns:
-        img = np.zeros((height, width), np.uint8)
-        for y in range(height):
-            for x in range(width):
-                img[y, x] = pat[int(y/step), int(x/step)]
-        exp_patterns.append(img)
+        # expand image size (each graycode cell covers step x step projector pixels)
+        rows = np.arange(height) // step
+        cols = np.arange(width) // step
+        exp_patterns = [pat[rows[:, None], cols[None, :]] for pat in patterns]
 
-    exp_patterns.append(255*np.ones((height, width), np.uint8))  # white
-    exp_patterns.append(np.zeros((height, width), np.uint8))     # black
+        exp_patterns.append(255*np.ones((height, width), np.uint8))  # white
+        exp_patterns.append(np.zeros((height, width), np.uint8))     # black
 
     if not os.path.exists(TARGETDIR):
         os.mkdir(TARGETDIR)
+    # remove patterns of a previous run so that a smaller set is not mixed with stale files
+    for old in glob.glob(TARGETDIR + '/pattern_*.png'):
+        os.remove(old)
 
     for i, pat in enumerate(exp_patterns):
         cv2.imwrite(TARGETDIR + '/pattern_' + str(i).zfill(2) + '.png', pat)
 
+    # the manifest tells the capture program and the decoder how the set is laid out
+    phase = args.mode == 'phase_shift'
+    PatternManifest(mode=args.mode, proj_height=height, proj_width=width, graycode_step=step,
+                    gc_width=gc_width, gc_height=gc_height, pattern_count=len(exp_patterns),
+                    phase_period=args.phase_period if phase else 0,
+                    phase_steps=args.phase_steps if phase else 0).save(TARGETDIR)
+
     print('=== Result ===')
     print('\'' + TARGETDIR + '/pattern_00.png ~ pattern_' +
           str(len(exp_patterns)-1) + '.png \' were generated')
+    print('\'' + TARGETDIR + '/pattern_manifest.json\' (mode: ' + args.mode + ') was generated')
     print()
     print('=== Next step ===')
     print('Project patterns and save captured images as \'' +
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+投影仪光度响应标定工具
+由平场灰度帧（photometric_XX.png）与同一目录的格雷码帧（相机像素 -> 投影仪像素）拟合
+每个投影仪单元的响应曲线，输出量化、可内存映射的补偿表（.photo）；播放时每帧只需一次
+向量化查表（lut）或查表+仿射（affine）运算
+
+用法:
+    python photometric_calibration.py fit photometric_0 [-mode affine|lut] [-cell 4]
+    python photometric_calibration.py apply -table photometric_p0.photo image_1.png image_2.png
+    python photometric_calibration.py bench [-sizes 1920x1080,3840x2160]
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# 引入仓库根目录，以复用 src 中的光度补偿服务
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from calibrate_optimized import corner_fit_settings, create_graycode_decoder, resolve_decode_mode, select_capture_files
+from reconstruct_surface import find_projector_captures
+from src.modules.projector_calibration.services.calibration_bundle import sha256_files
+from src.modules.projector_calibration.services.photometric import (
+    MODES, PHOTOMETRIC_SUFFIX, PhotometricCapture, PhotometricCompensation, accumulate_responses, build_affine,
+    build_lut, fit_affine_response, fit_gamma, target_range)
+
+logger = logging.getLogger(__name__)
+
+
+def parse_size(text):
+    """'1920x1080' -> (1920, 1080)"""
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+
+def fit_projector(dname, gc_fnames, args, decode_mode, phase_params):
+    """拟合一台投影仪的补偿表，返回 (PhotometricCompensation, 输入文件) 或 None"""
+    capture = PhotometricCapture.load(dname)
+    if capture is None:
+        logger.error(f'No photometric levels in \'{dname}\' (photometric_levels.json)')
+        return None
+    proj_shape = (capture.proj_height, capture.proj_width)
+    frame_names = [os.path.join(dname, capture.frame_name(i)) for i in range(len(capture.levels))]
+    frames = [cv2.imread(f, cv2.IMREAD_GRAYSCALE) for f in frame_names]
+    if any(f is None for f in frames):
+        logger.error(f'Missing photometric frames in \'{dname}\'')
+        return None
+
+    decoder = create_graycode_decoder(proj_shape, args.graycode_step, args.black_thr, args.white_thr,
+                                      args.memory_budget, decode_mode, phase_params)
+    gc_fnames = select_capture_files(dname, gc_fnames, decoder.pattern_count)
+    if gc_fnames is None:
+        return None
+    maps = decoder.decode(gc_fnames)
+    v, u = np.nonzero(maps.valid)
+    if len(u) == 0:
+        logger.error(f'No decodable pixels in \'{dname}\'')
+        return None
+    coord_scale = corner_fit_settings(maps.valid.shape, decode_mode, args.graycode_step)[1]
+    proj_pixels = np.stack([maps.x[v, u], maps.y[v, u]], axis=1).astype(np.float64) * coord_scale
+
+    responses, counts = accumulate_responses(frames, np.stack([u, v], axis=1), proj_pixels, proj_shape, args.cell)
+    gamma = args.gamma or fit_gamma(capture.levels, responses, counts)
+    floor, ceiling = target_range(capture.levels, responses, counts, args.percentile)
+    if args.mode == 'lut':
+        comp = build_lut(capture.levels, responses, counts, gamma, floor, ceiling, args.cell, proj_shape)
+    else:
+        a, b = fit_affine_response(capture.levels, responses, gamma)
+        comp = build_affine(a, b, counts, gamma, floor, ceiling, args.cell, proj_shape)
+    coverage = float(np.count_nonzero(counts) / counts.size)
+    logger.info(f'  {dname}: gamma {gamma:.3f}, target {floor:.1f}..{ceiling:.1f}, '
+                f'{coverage:.1%} of {counts.size} cells observed')
+    comp.meta.update({'levels': capture.levels, 'coverage': coverage, 'decode_mode': decode_mode})
+    return comp, frame_names + list(gc_fnames)
+
+
+def cmd_fit(args):
+    decode_mode, phase_params = resolve_decode_mode(args.decode_mode, [args.capture])
+    os.makedirs(args.output_dir, exist_ok=True)
+    written = 0
+    for pid, gc_fnames in find_projector_captures(args.capture):
+        dname = os.path.dirname(gc_fnames[0])
+        started = time.perf_counter()
+        result = fit_projector(dname, gc_fnames, args, decode_mode, phase_params)
+        if result is None:
+            continue
+        comp, inputs = result
+        comp.meta.update({'projector_id': 0 if pid is None else pid, 'inputs_sha256': sha256_files(inputs)})
+        target = Path(args.output_dir) / f'photometric_p{comp.meta["projector_id"]}{PHOTOMETRIC_SUFFIX}'
+        comp.save(target)
+        size = sum(a.nbytes for a in comp.arrays.values())
+        logger.info(f'  {args.mode} table ({size / 1e6:.2f} MB) saved to {target} '
+                    f'({time.perf_counter() - started:.2f} s)')
+        written += 1
+    if not written:
+        logger.error('No compensation table was written')
+        return 1
+    return 0
+
+
+def cmd_apply(args):
+    comp = PhotometricCompensation.load(args.table)
+    os.makedirs(args.output_dir, exist_ok=True)
+    for fname in args.images:
+        frame = cv2.imread(fname, cv2.IMREAD_COLOR)
+        if frame is None:
+            logger.warning(f'Cannot read {fname}, skipping')
+            continue
+        if frame.shape[:2] != comp.proj_shape:
+            frame = cv2.resize(frame, comp.proj_shape[::-1], interpolation=cv2.INTER_AREA)
+        target = os.path.join(args.output_dir, f'compensated_{Path(fname).name}')
+        cv2.imwrite(target, comp.apply(frame))
+        logger.info(f'{fname} -> {target}')
+    return 0
+
+
+def synthetic_compensation(mode, proj_shape, cell):
+    """基准测试用：渐晕 + 随机反照率的合成补偿表"""
+    gh, gw = -(-proj_shape[0] // cell), -(-proj_shape[1] // cell)
+    rng = np.random.default_rng(0)
+    yy, xx = np.mgrid[0:gh, 0:gw]
+    a = 150.0 * (0.6 + 0.4 * np.exp(-((xx - gw / 2) ** 2 + (yy - gh / 2) ** 2) / (0.2 * gw * gh)))
+    a *= rng.uniform(0.8, 1.0, a.shape)
+    b = rng.uniform(5.0, 10.0, a.shape)
+    counts = np.ones(a.shape, np.int64)
+    levels = [0, 64, 128, 192, 255]
+    if mode == 'lut':
+        responses = np.stack([a * (lv / 255.0) ** 2.2 + b for lv in levels]).astype(np.float32)
+        return build_lut(levels, responses, counts, 2.2, 10.0, 100.0, cell, proj_shape)
+    return build_affine(a, b, counts, 2.2, 10.0, 100.0, cell, proj_shape)
+
+
+def time_fps(fn, frames):
+    fn()  # 预热（展开补偿表与缓冲分配）
+    started = time.perf_counter()
+    for _ in range(frames):
+        fn()
+    return frames / (time.perf_counter() - started)
+
+
+def cmd_bench(args):
+    rows = []
+    for width, height in [parse_size(s) for s in args.sizes.split(',')]:
+        frame = np.random.default_rng(1).integers(0, 256, (height, width, 3), dtype=np.uint8)
+        out = np.empty_like(frame)
+        result = {'size': f'{width}x{height}'}
+        for mode in MODES:
+            comp = synthetic_compensation(mode, (height, width), args.cell)
+            result[mode] = time_fps(lambda: comp.apply(frame, out), args.frames)
+        # 对照：逐帧浮点幂运算的直接实现
+        comp = synthetic_compensation('affine', (height, width), args.cell)
+        gain = np.repeat(np.repeat(comp.gain(), args.cell, 0), args.cell, 1)[:height, :width, None]
+        offset = np.repeat(np.repeat(comp.offset(), args.cell, 0), args.cell, 1)[:height, :width, None]
+
+        def naive():
+            lin = (frame / 255.0) ** 2.2 * gain + offset
+            return (255.0 * np.clip(lin, 0, 1) ** (1 / 2.2)).astype(np.uint8)
+
+        result['naive_float'] = time_fps(naive, max(1, args.frames // 5))
+        rows.append(result)
+        logger.info('  '.join(f'{k}={v:.1f}' if isinstance(v, float) else f'{k}={v}' for k, v in result.items()))
+    print(json.dumps({'cell': args.cell, 'fps': rows}, indent=2))
+    return 0
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(
+        description='Projector photometric calibration: fit per-cell response curves from flat grey captures and\n'
+                    'write a quantized, memory-mappable compensation table.',
+        formatter_class=argparse.RawTextHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    fit = sub.add_parser('fit', help='fit compensation tables from a photometric capture directory')
+    fit.add_argument('capture', type=str,
+                     help='directory with graycode_* + photometric_* (or projector_*/ subdirectories)')
+    fit.add_argument('-mode', type=str, choices=MODES, default='affine',
+                     help='affine: gain/offset per cell in linear light (compact)\n'
+                          'lut: 256-entry table per cell from the measured curves (one gather per frame)')
+    fit.add_argument('-cell', type=int, default=4, help='projector pixels per table cell side (default : 4)')
+    fit.add_argument('-gamma', type=float, default=0.0, help='projector gamma (default : fitted)')
+    fit.add_argument('-percentile', type=float, default=2.0,
+                     help='outlier percentile for the common black/white target (default : 2)')
+    fit.add_argument('-graycode_step', type=int, default=1, help='step size of graycode (default : 1)')
+    fit.add_argument('-black_thr', type=int, default=40)
+    fit.add_argument('-white_thr', type=int, default=5)
+    fit.add_argument('-decode_mode', type=str, default='auto',
+                     help='decode mode (default : auto = pattern_manifest.json in the capture directory)')
+    fit.add_argument('-memory_budget', type=float, default=256.0, help='decode memory budget in MB (default : 256)')
+    fit.add_argument('-output_dir', type=str, default='.', help='where photometric_p<id>.photo is written')
+
+    apply = sub.add_parser('apply', help='compensate images with a saved table')
+    apply.add_argument('images', type=str, nargs='+')
+    apply.add_argument('-table', type=str, required=True, help='.photo file written by fit')
+    apply.add_argument('-output_dir', type=str, default='compensated')
+
+    bench = sub.add_parser('bench', help='frames per second of the affine and lut apply paths')
+    bench.add_argument('-sizes', type=str, default='1920x1080,3840x2160')
+    bench.add_argument('-cell', type=int, default=4)
+    bench.add_argument('-frames', type=int, default=20, help='frames timed per mode (default : 20)')
+
+    args = parser.parse_args()
+    return {'fit': cmd_fit, 'apply': cmd_apply, 'bench': cmd_bench}[args.command](args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+结构光稠密重建工具
+对拍摄目录中每个有效解码的相机像素，按标定结果的内外参与其投影仪坐标三角化，
+输出带置信度的点云（与 Pre-scanned point cloud 相同的 OBJ 格式 + 二进制附加文件）
+
+用法:
+    python reconstruct_surface.py capture_1 [-calib calibration_result_optimized.calib] [-units CENTIMETER]
+    python reconstruct_surface.py capture_1 capture_2 -frame projector -min_confidence 0.5
+"""
+
+import argparse
+import glob
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# 引入仓库根目录，以复用 src 中的重建与点云读写服务
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from calibrate_optimized import (
+    corner_fit_settings, create_graycode_decoder, load_base_result, resolve_decode_mode, select_capture_files)
+from src.modules.pre_scanned_point_cloud.services.point_cloud_io import save_point_cloud
+from src.modules.projector_calibration.services.calibration_bundle import sha256_files
+from src.modules.projector_calibration.services.reconstruction import (
+    UNIT_SCALE, ReconstructedCloud, grid_normals, pixel_rays, reconstruct, to_y_up)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OUTPUT_DIR = Path(__file__).resolve().parents[1] / 'Pre-scanned point cloud' / 'data'
+
+
+def find_projector_captures(dname):
+    """一个拍摄目录中的 (projector_id, gc_fnames)：单投影仪结构时编号为 None"""
+    gc_fnames = sorted(glob.glob(os.path.join(dname, 'graycode_*')))
+    if gc_fnames:
+        return [(None, gc_fnames)]
+    captures = []
+    for pdir in sorted(glob.glob(os.path.join(dname, 'projector_*'))):
+        fnames = sorted(glob.glob(os.path.join(pdir, 'graycode_*')))
+        try:
+            pid = int(os.path.basename(pdir).split('_', 1)[1])
+        except ValueError:
+            continue
+        if fnames:
+            captures.append((pid, fnames))
+    return captures
+
+
+class CameraRays:
+    """相机像素射线缓存：只与像素网格和相机内参有关，所有拍摄/投影仪共用"""
+
+    def __init__(self, cam_int, cam_dist):
+        self.cam_int = cam_int
+        self.cam_dist = cam_dist
+        self._grid = None
+
+    def lookup(self, shape, u, v):
+        if self._grid is None or self._grid.shape[:2] != shape:
+            vv, uu = np.mgrid[0:shape[0], 0:shape[1]]
+            pixels = np.stack([uu.ravel(), vv.ravel()], axis=1)
+            self._grid = pixel_rays(pixels, self.cam_int, self.cam_dist).reshape(shape[0], shape[1], 3)
+        return self._grid[v, u]
+
+
+def reconstruct_capture(fnames, proj, bundle, rays, args, decode_mode, phase_params):
+    """解码一次拍摄（单台投影仪）的完整画面并三角化，返回 ReconstructedCloud 或 None"""
+    proj_shape = tuple(proj.proj_shape)
+    decoder = create_graycode_decoder(proj_shape, args.graycode_step, args.black_thr, args.white_thr,
+                                      args.memory_budget, decode_mode, phase_params)
+    fnames = select_capture_files(os.path.dirname(fnames[0]), fnames, decoder.pattern_count)
+    if fnames is None:
+        return None
+    maps = decoder.decode(fnames)
+    v, u = np.nonzero(maps.valid)
+    if len(u) == 0:
+        return None
+    coord_scale = corner_fit_settings(maps.valid.shape, decode_mode, args.graycode_step)[1]
+    proj_pixels = np.stack([maps.x[v, u], maps.y[v, u]], axis=1).astype(np.float64) * coord_scale
+
+    white = cv2.imread(fnames[decoder.pattern_count - 2], cv2.IMREAD_GRAYSCALE)
+    black = cv2.imread(fnames[decoder.pattern_count - 1], cv2.IMREAD_GRAYSCALE)
+    contrast = white[v, u].astype(np.int16) - black[v, u]
+    cloud = reconstruct(
+        np.stack([u, v], axis=1), proj_pixels, bundle.cam_int, bundle.cam_dist,
+        proj.proj_int, proj.proj_dist, proj.rotation, proj.translation,
+        contrast=contrast, intensity=white[v, u], contrast_ref=args.contrast_ref,
+        gap_sigma_px=args.gap_sigma, cam_rays=rays.lookup(maps.valid.shape, u, v))
+    cloud = cloud.select(cloud.gap_px <= args.max_gap)
+    if not args.no_normals and len(cloud):
+        cloud.normals = grid_normals(cloud.points, cloud.pixels, maps.valid.shape, args.normal_step)
+    return cloud
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(
+        description='Dense structured-light reconstruction: triangulate every decoded camera pixel against its\n'
+                    'projector coordinate and write a point cloud with per-point confidence.',
+        formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('captures', type=str, nargs='+',
+                        help='capture directories (graycode_* or projector_*/graycode_* inside)')
+    parser.add_argument('-calib', type=str, default='calibration_result_optimized.calib',
+                        help='calibration result (.calib bundle, or .xml converted on the fly)')
+    parser.add_argument('-graycode_step', type=int, default=1, help='step size of graycode (default : 1)')
+    parser.add_argument('-black_thr', type=int, default=40)
+    parser.add_argument('-white_thr', type=int, default=5)
+    parser.add_argument('-decode_mode', type=str, default='auto',
+                        help='decode mode (default : auto = pattern_manifest.json in the capture directories)')
+    parser.add_argument('-memory_budget', type=float, default=256.0,
+                        help='memory budget in MB for the tiled decode of one capture (default : 256)')
+    parser.add_argument('-units', type=str, choices=tuple(UNIT_SCALE), default='CENTIMETER',
+                        help='output units (default : CENTIMETER, like the spatial-mapping exports)')
+    parser.add_argument('-frame', type=str, choices=('camera', 'projector'), default='camera',
+                        help='output frame: camera, or the frame of the first reconstructed projector\n'
+                             '(both converted to RIGHT_HANDED_Y_UP like the spatial-mapping exports)')
+    parser.add_argument('-min_confidence', type=float, default=0.0, help='drop points below this confidence')
+    parser.add_argument('-max_gap', type=float, default=3.0,
+                        help='drop points whose camera/projector rays miss by more than this (camera px)')
+    parser.add_argument('-gap_sigma', type=float, default=1.0, help='ray gap (camera px) at which confidence is 0.61')
+    parser.add_argument('-contrast_ref', type=float, default=128.0,
+                        help='white-black contrast at which the contrast term of the confidence saturates')
+    parser.add_argument('-normal_step', type=int, default=4,
+                        help='pixel spacing of the grid differences used for normals (default : 4)')
+    parser.add_argument('-no_normals', action='store_true', help='do not estimate normals (no vn lines)')
+    parser.add_argument('-output_dir', type=str, default=str(DEFAULT_OUTPUT_DIR),
+                        help='output directory (default : Pre-scanned point cloud/data)')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    bundle, calib_path = load_base_result(args.calib)
+    projectors = {p.id: p for p in bundle.projectors}
+    decode_mode, phase_params = resolve_decode_mode(args.decode_mode, args.captures)
+    rays = CameraRays(np.asarray(bundle.cam_int, np.float64), np.asarray(bundle.cam_dist, np.float64))
+
+    clouds = []
+    proj_ids = []
+    inputs = []
+    for dname in args.captures:
+        for pid, fnames in find_projector_captures(dname):
+            # 单投影仪目录结构对应标定结果中的第一台投影仪
+            proj = bundle.projectors[0] if pid is None else projectors.get(pid)
+            if proj is None:
+                logger.warning(f'Projector {pid} is not in {calib_path}, skipping \'{dname}\'')
+                continue
+            t0 = time.perf_counter()
+            cloud = reconstruct_capture(fnames, proj, bundle, rays, args, decode_mode, phase_params)
+            if cloud is None or not len(cloud):
+                logger.warning(f'No points reconstructed from \'{os.path.dirname(fnames[0])}\'')
+                continue
+            logger.info(f'  {os.path.dirname(fnames[0])}: {len(cloud)} points, median gap '
+                        f'{float(np.median(cloud.gap_px)):.3f} px ({time.perf_counter() - t0:.2f} s)')
+            clouds.append(cloud)
+            proj_ids.append(np.full(len(cloud), proj.id, np.int32))
+            inputs.extend(fnames)
+    if not clouds:
+        logger.error('Nothing was reconstructed')
+        return 1
+
+    cloud = ReconstructedCloud.concatenate(clouds)
+    proj_id = np.concatenate(proj_ids)
+    keep = cloud.confidence >= args.min_confidence
+    cloud, proj_id = cloud.select(keep), proj_id[keep]
+
+    points, normals = cloud.points, cloud.normals
+    if args.frame == 'projector':
+        # 相机坐标 -> 投影仪坐标：X_p = R X_c + t
+        ref = projectors.get(int(proj_id[0]), bundle.projectors[0])
+        rotation = np.asarray(ref.rotation, np.float32)
+        points = points @ rotation.T + np.asarray(ref.translation, np.float32).reshape(1, 3)
+        if normals is not None:
+            normals = normals @ rotation.T
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    obj_path = Path(args.output_dir) / f'pointcloud_{timestamp}.obj'
+    meta = {
+        'source': 'structured_light',
+        'calibration': str(calib_path),
+        'calibration_sha256': sha256_files([calib_path]),
+        'inputs_sha256': sha256_files(inputs),
+        'decode_mode': decode_mode,
+        'units': args.units,
+        'frame': args.frame,
+        'coordinate_system': 'RIGHT_HANDED_Y_UP',
+        'captures': [str(d) for d in args.captures],
+    }
+    obj_path, sidecar = save_point_cloud(
+        obj_path, to_y_up(points, args.units), cloud.intensity,
+        None if normals is None else to_y_up(normals, 'MILLIMETER'), cloud.confidence, meta,
+        pixels=cloud.pixels, gap_px=cloud.gap_px, projector_id=proj_id)
+    logger.info(f'{len(cloud)} points (mean confidence {float(cloud.confidence.mean()):.3f}) saved to {obj_path}')
+    logger.info(f'Confidence and per-point sources saved to {sidecar}')
+    logger.info(f'Reconstruction finished in {time.perf_counter() - started:.1f} s')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
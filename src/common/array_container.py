@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import json
+import math
+import mmap
+import os
+import struct
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Mapping
+
+import numpy as np
+
+# 文件布局：MAGIC(4) + 格式版本(uint16) + 保留(uint16) + 头长度(uint32) + JSON 头
+# + 填充，随后为按 ALIGNMENT 对齐的小端连续数组；偏移相对于数据区起点
+MAGIC = b"XPAC"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+_PREFIX = struct.Struct("<4sHHI")
+
+
+@dataclass
+class ArrayContainer:
+    """Arrays plus a JSON-serialisable ``meta`` dict read from one container file.
+
+    ``kind`` names the payload (e.g. ``"projector_calibration"``) so readers can
+    refuse files meant for a different consumer. Arrays returned by
+    :func:`read_container` are read-only views into the file buffer (or the
+    memory map), so loading does not copy array data.
+    """
+
+    kind: str
+    meta: dict[str, Any] = field(default_factory=dict)
+    arrays: dict[str, np.ndarray] = field(default_factory=dict)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.arrays[name]
+
+
+def _aligned(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def write_container(
+    path: str | Path,
+    kind: str,
+    arrays: Mapping[str, np.ndarray],
+    meta: Mapping[str, Any] | None = None,
+) -> Path:
+    """Write ``arrays`` and ``meta`` atomically (temp file + ``os.replace``)."""
+    path = Path(path)
+    entries = {}
+    blobs = []
+    offset = 0
+    for name, value in arrays.items():
+        # 统一为小端、C 连续，读取端可直接 frombuffer
+        arr = np.ascontiguousarray(value)
+        arr = arr.astype(arr.dtype.newbyteorder("<"), copy=False)
+        offset = _aligned(offset)
+        entries[name] = {
+            "dtype": arr.dtype.str,
+            "shape": list(arr.shape),
+            "offset": offset,
+        }
+        blobs.append((offset, arr))
+        offset += arr.nbytes
+    header = json.dumps(
+        {"kind": kind, "meta": dict(meta or {}), "arrays": entries},
+        separators=(",", ":"),
+    ).encode("utf-8")
+    data_start = _aligned(_PREFIX.size + len(header))
+
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, 0, len(header)))
+        f.write(header)
+        for blob_offset, arr in blobs:
+            f.seek(data_start + blob_offset)
+            f.write(arr.tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp, path)
+    return path
+
+
+def _parse(buffer, kind: str | None, source) -> ArrayContainer:
+    if len(buffer) < _PREFIX.size:
+        raise ValueError(f"not an array container: {source}")
+    magic, version, _, header_len = _PREFIX.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError(f"not an array container: {source}")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"unsupported container version {version}: {source}")
+    header = json.loads(bytes(buffer[_PREFIX.size : _PREFIX.size + header_len]))
+    if kind is not None and header["kind"] != kind:
+        raise ValueError(f"expected a {kind!r} container, got {header['kind']!r}")
+    data_start = _aligned(_PREFIX.size + header_len)
+    arrays = {}
+    for name, entry in header["arrays"].items():
+        dtype = np.dtype(entry["dtype"])
+        shape = tuple(entry["shape"])
+        count = math.prod(shape)
+        arr = np.frombuffer(
+            buffer, dtype, count=count, offset=data_start + entry["offset"]
+        )
+        arrays[name] = arr.reshape(shape)
+    return ArrayContainer(header["kind"], header["meta"], arrays)
+
+
+def read_container(
+    path: str | Path, kind: str | None = None, mmap_mode: bool = False
+) -> ArrayContainer:
+    """Read a container written by :func:`write_container`.
+
+    With ``mmap_mode`` the file is memory-mapped read-only and arrays page in on
+    first access (large payloads); otherwise the file is read in one call, which
+    is fastest for small files. ``kind`` (if given) must match the file's kind.
+    """
+    with open(path, "rb") as f:
+        if mmap_mode:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            buffer = f.read()
+    return _parse(buffer, kind, path)
+
+
+def read_container_meta(path: str | Path) -> tuple[str, dict[str, Any]]:
+    """Return ``(kind, meta)`` without touching the array payload."""
+    with open(path, "rb") as f:
+        prefix = f.read(_PREFIX.size)
+        if len(prefix) < _PREFIX.size:
+            raise ValueError(f"not an array container: {path}")
+        magic, version, _, header_len = _PREFIX.unpack(prefix)
+        if magic != MAGIC:
+            raise ValueError(f"not an array container: {path}")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"unsupported container version {version}: {path}")
+        header = json.loads(f.read(header_len))
+    return header["kind"], header["meta"]
@@ -0,0 +1,3 @@
+"""Pre-scanned point cloud services.
+
+中文注释：点云/网格数据读写等可复用工具。"""
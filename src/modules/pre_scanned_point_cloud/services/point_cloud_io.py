@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from ....common.array_container import read_container, write_container
+
+CLOUD_KIND = "point_cloud"
+CLOUD_SUFFIX = ".cloud"
+OBJ_HEADER = "#Generated by structured-light reconstruction."
+# 每批格式化的行数：限制一次性生成的文本大小
+_CHUNK_ROWS = 65536
+
+
+def _write_rows(f, prefix: str, data: np.ndarray) -> None:
+    cols = data.shape[1]
+    line = prefix + " %.6f" * cols + (" \n" if prefix == "v" else "\n")
+    for start in range(0, len(data), _CHUNK_ROWS):
+        chunk = data[start : start + _CHUNK_ROWS]
+        f.write((line * len(chunk)) % tuple(chunk.ravel().tolist()))
+
+
+def write_obj_point_cloud(
+    path: str | Path,
+    points: np.ndarray,
+    colors: np.ndarray | None = None,
+    normals: np.ndarray | None = None,
+    header: str = OBJ_HEADER,
+) -> Path:
+    """Write a point cloud in the layout of the ZED ``pointcloud_*.obj`` exports.
+
+    One ``v x y z r g b`` line per point (colors as floats in ``[0, 1]``,
+    omitted when ``colors`` is ``None``) followed by one ``vn`` line per point.
+    """
+    path = Path(path)
+    points = np.asarray(points, np.float32).reshape(-1, 3)
+    if colors is not None:
+        colors = np.asarray(colors)
+        if colors.dtype == np.uint8:
+            colors = colors.astype(np.float32) / 255.0
+        colors = np.broadcast_to(colors.reshape(len(points), -1), (len(points), 3))
+        rows = np.hstack([points, colors.astype(np.float32)])
+    else:
+        rows = points
+    with open(path, "w", encoding="ascii", newline="\n") as f:
+        f.write(header + "\n")
+        _write_rows(f, "v", rows)
+        if normals is not None:
+            _write_rows(f, "vn", np.asarray(normals, np.float32).reshape(-1, 3))
+    return path
+
+
+def save_point_cloud(
+    path: str | Path,
+    points: np.ndarray,
+    colors: np.ndarray | None = None,
+    normals: np.ndarray | None = None,
+    confidence: np.ndarray | None = None,
+    meta: dict[str, Any] | None = None,
+    **arrays: np.ndarray,
+) -> tuple[Path, Path]:
+    """Write the OBJ plus a binary sidecar (same stem, :data:`CLOUD_SUFFIX`).
+
+    OBJ has no per-vertex scalar field, so per-point ``confidence`` (and any
+    extra ``arrays``, e.g. source pixels) is stored in the sidecar together with
+    the points in OBJ order; it can be memory-mapped by :func:`load_point_cloud`.
+    """
+    obj_path = write_obj_point_cloud(path, points, colors, normals)
+    payload = {"points": np.asarray(points, np.float32).reshape(-1, 3)}
+    if colors is not None:
+        payload["colors"] = np.asarray(colors)
+    if normals is not None:
+        payload["normals"] = np.asarray(normals, np.float32)
+    if confidence is not None:
+        payload["confidence"] = np.asarray(confidence, np.float32)
+    payload.update(arrays)
+    meta = dict(meta or {})
+    meta["obj"] = obj_path.name
+    meta["count"] = len(payload["points"])
+    sidecar = write_container(
+        obj_path.with_suffix(CLOUD_SUFFIX), CLOUD_KIND, payload, meta
+    )
+    return obj_path, sidecar
+
+
+def load_point_cloud(path: str | Path, mmap_mode: bool = True):
+    """Read a sidecar written by :func:`save_point_cloud` (OBJ path accepted)."""
+    return read_container(
+        Path(path).with_suffix(CLOUD_SUFFIX), kind=CLOUD_KIND, mmap_mode=mmap_mode
+    )
@@ -9,3 +9,5 @@ class ProjectorCalibrationSettings(BaseSettings):
     proj_height: int = 1080
     proj_width: int = 1920
     rounds: int = 1
+    # 标定结果二进制包（calibrate_optimized.py 在 XML 旁写出），GET /calibration/result 读取
+    result_bundle: str = "Projector-Calibration/calibration_result_optimized.calib"
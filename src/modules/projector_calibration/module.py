@@ -10,6 +10,7 @@ from pydantic_settings import BaseSettings
 from ...common.module_base import ModuleBase
 from ...common.types import ModuleState
 from .config import ProjectorCalibrationSettings
+from .services.calibration_bundle import CalibrationBundle, load_bundle
 
 
 class ProjectorCalibrationModule(ModuleBase):
@@ -18,6 +19,7 @@ class ProjectorCalibrationModule(ModuleBase):
     def __init__(self) -> None:
         self._proc: Optional[subprocess.Popen] = None
         self._state: ModuleState = ModuleState.STOPPED
+        self._result_bundle = Path(ProjectorCalibrationSettings().result_bundle)
 
     def configure(self, config: BaseSettings) -> None:
         # 保存基本参数（当前脚本未通过CLI接收，后续扩展）
@@ -25,6 +27,7 @@ class ProjectorCalibrationModule(ModuleBase):
             self._proj_height = config.proj_height
             self._proj_width = config.proj_width
             self._rounds = config.rounds
+            self._result_bundle = Path(config.result_bundle)
 
     def start(self) -> None:
         base_dir = Path("Projector-Calibration").resolve()
@@ -43,3 +46,9 @@ class ProjectorCalibrationModule(ModuleBase):
 
     def status(self) -> dict:
         return {"state": self._state}
+
+    def latest_result(self) -> Optional[CalibrationBundle]:
+        """最新标定结果（二进制包，按文件修改时间缓存）；尚无结果时返回 None"""
+        if not self._result_bundle.is_file():
+            return None
+        return load_bundle(self._result_bundle)
@@ -0,0 +1,3 @@
+"""Projector calibration services.
+
+中文注释：投影标定相关的可复用算法与工具。"""
@@ -0,0 +1,298 @@
+from __future__ import annotations
+
+import functools
+import hashlib
+import math
+import os
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterable
+
+import numpy as np
+
+from ....common.array_container import read_container, write_container
+
+BUNDLE_KIND = "projector_calibration"
+BUNDLE_VERSION = 1
+BUNDLE_SUFFIX = ".calib"
+
+# OpenCV（右手，X右 Y下 Z前，毫米）-> 虚幻引擎（左手，X前 Y右 Z上，厘米）
+OPENCV_TO_UNREAL = np.array([[0, 0, 1], [1, 0, 0], [0, -1, 0]], dtype=np.float64)
+
+
+def opencv_to_unreal_transform(
+    rotation: np.ndarray, translation: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Convert an OpenCV pose (mm) to the Unreal frame (cm).
+
+    ``R_u = C R C^T`` and ``t_u = C t / 10`` with ``C`` = :data:`OPENCV_TO_UNREAL`.
+    """
+    unreal_rotation = OPENCV_TO_UNREAL @ rotation @ OPENCV_TO_UNREAL.T
+    unreal_translation = OPENCV_TO_UNREAL @ np.asarray(translation).reshape(3) / 10.0
+    return unreal_rotation, unreal_translation
+
+
+def rotation_matrix_to_unreal_euler(rotation: np.ndarray) -> np.ndarray:
+    """Unreal Euler angles ``(roll, pitch, yaw)`` in degrees (ZYX order)."""
+    sy = math.sqrt(rotation[0, 0] ** 2 + rotation[1, 0] ** 2)
+    if sy >= 1e-6:
+        roll = math.atan2(rotation[2, 1], rotation[2, 2])
+        pitch = math.atan2(-rotation[2, 0], sy)
+        yaw = math.atan2(rotation[1, 0], rotation[0, 0])
+    else:
+        roll = math.atan2(-rotation[1, 2], rotation[1, 1])
+        pitch = math.atan2(-rotation[2, 0], sy)
+        yaw = 0.0
+    return np.degrees([roll, pitch, yaw])
+
+
+def sha256_files(paths: Iterable[str | Path], chunk_size: int = 1 << 20) -> str:
+    """One digest over the names and contents of ``paths`` (in the given order)."""
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(Path(path).name.encode("utf-8") + b"\0")
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+@dataclass
+class ProjectorCalibration:
+    """Intrinsics and camera->projector extrinsics of one projector.
+
+    ``rotation``/``translation`` map camera coordinates (mm) to projector
+    coordinates; the ``unreal_*`` fields hold the same pose converted with
+    :func:`opencv_to_unreal_transform` and are filled in when omitted.
+    ``distortion_model`` names the lens model of ``proj_dist`` (see
+    ``distortion_models``; empty for results written before model selection).
+    """
+
+    id: int
+    proj_shape: tuple[int, int]
+    rms: float
+    proj_int: np.ndarray
+    proj_dist: np.ndarray
+    rotation: np.ndarray
+    translation: np.ndarray
+    successful_captures: int = 0
+    distortion_model: str = ""
+    unreal_rotation: np.ndarray | None = None
+    unreal_translation: np.ndarray | None = None
+    unreal_euler: np.ndarray | None = None
+
+    def __post_init__(self) -> None:
+        if self.unreal_rotation is None or self.unreal_translation is None:
+            self.unreal_rotation, self.unreal_translation = opencv_to_unreal_transform(
+                self.rotation, self.translation
+            )
+        if self.unreal_euler is None:
+            self.unreal_euler = rotation_matrix_to_unreal_euler(self.unreal_rotation)
+
+
+@dataclass
+class CalibrationBundle:
+    """Camera/projector calibration result in a compact binary container.
+
+    The OpenCV XML written by ``calibrate_optimized.py`` stays the interchange
+    format; the bundle (same name, :data:`BUNDLE_SUFFIX`) is what the server and
+    tools load. It stores all matrices as little-endian arrays behind a small
+    JSON header, including the precomputed Unreal transforms and provenance
+    digests, so loading needs no XML parsing and no pose conversion.
+    """
+
+    img_shape: tuple[int, int]
+    rms: float
+    cam_int: np.ndarray
+    cam_dist: np.ndarray
+    successful_captures: int
+    projectors: list[ProjectorCalibration] = field(default_factory=list)
+    provenance: dict[str, Any] = field(default_factory=dict)
+    version: int = BUNDLE_VERSION
+
+    def save(self, path: str | Path) -> Path:
+        """Write the bundle; projector arrays are stacked along axis 0."""
+        count = len(self.projectors)
+        dist_len = [int(np.asarray(p.proj_dist).size) for p in self.projectors]
+        proj_dist = np.zeros((count, max(dist_len, default=0)), np.float64)
+        for i, p in enumerate(self.projectors):
+            proj_dist[i, : dist_len[i]] = np.asarray(p.proj_dist).ravel()
+
+        def stack(name, shape):
+            if not count:
+                return np.zeros((0,) + shape, np.float64)
+            return np.stack(
+                [
+                    np.asarray(getattr(p, name), np.float64).reshape(shape)
+                    for p in self.projectors
+                ]
+            )
+
+        arrays = {
+            "cam_int": np.asarray(self.cam_int, np.float64),
+            "cam_dist": np.asarray(self.cam_dist, np.float64),
+            "proj_int": stack("proj_int", (3, 3)),
+            "proj_dist": proj_dist,
+            "rotation": stack("rotation", (3, 3)),
+            "translation": stack("translation", (3, 1)),
+            "unreal_rotation": stack("unreal_rotation", (3, 3)),
+            "unreal_translation": stack("unreal_translation", (3,)),
+            "unreal_euler": stack("unreal_euler", (3,)),
+        }
+        meta = {
+            "version": self.version,
+            "img_shape": [int(v) for v in self.img_shape],
+            "rms": float(self.rms),
+            "successful_captures": int(self.successful_captures),
+            "projectors": [
+                {
+                    "id": int(p.id),
+                    "proj_shape": [int(v) for v in p.proj_shape],
+                    "rms": float(p.rms),
+                    "successful_captures": int(p.successful_captures),
+                    "dist_len": n,
+                    "distortion_model": p.distortion_model,
+                }
+                for p, n in zip(self.projectors, dist_len)
+            ],
+            "provenance": self.provenance,
+        }
+        return write_container(path, BUNDLE_KIND, arrays, meta)
+
+    @classmethod
+    def load(cls, path: str | Path) -> CalibrationBundle:
+        """Load a bundle; matrices are read-only views into the file buffer."""
+        container = read_container(path, kind=BUNDLE_KIND)
+        meta = container.meta
+        if meta["version"] > BUNDLE_VERSION:
+            raise ValueError(
+                f"bundle version {meta['version']} is newer than supported"
+            )
+        a = container.arrays
+        projectors = [
+            ProjectorCalibration(
+                id=info["id"],
+                proj_shape=tuple(info["proj_shape"]),
+                rms=info["rms"],
+                proj_int=a["proj_int"][i],
+                proj_dist=a["proj_dist"][i, None, : info["dist_len"]],
+                rotation=a["rotation"][i],
+                translation=a["translation"][i],
+                successful_captures=info["successful_captures"],
+                distortion_model=info.get("distortion_model", ""),
+                unreal_rotation=a["unreal_rotation"][i],
+                unreal_translation=a["unreal_translation"][i],
+                unreal_euler=a["unreal_euler"][i],
+            )
+            for i, info in enumerate(meta["projectors"])
+        ]
+        return cls(
+            img_shape=tuple(meta["img_shape"]),
+            rms=meta["rms"],
+            cam_int=a["cam_int"],
+            cam_dist=a["cam_dist"],
+            successful_captures=meta["successful_captures"],
+            projectors=projectors,
+            provenance=meta["provenance"],
+            version=meta["version"],
+        )
+
+    @classmethod
+    def from_opencv_xml(cls, path: str | Path) -> CalibrationBundle:
+        """Convert an OpenCV FileStorage XML result (single or multi projector).
+
+        Only used when importing results; the source digest is recorded in
+        ``provenance["source_xml_sha256"]``.
+        """
+        root = ET.parse(path).getroot()
+        img_shape = _xml_matrix(root.find("img_shape")).ravel()
+        nodes = root.find("projectors")
+        if nodes is not None:
+            projectors = [_xml_projector(node) for node in nodes.findall("_")]
+        else:
+            projectors = [_xml_projector(root)]
+        return cls(
+            img_shape=(int(img_shape[0]), int(img_shape[1])),
+            rms=float(root.find("rms").text),
+            cam_int=_xml_matrix(root.find("cam_int")),
+            cam_dist=_xml_matrix(root.find("cam_dist")),
+            successful_captures=int(root.find("successful_captures").text),
+            projectors=projectors,
+            provenance={"source_xml_sha256": sha256_files([path])},
+        )
+
+    def summary(self) -> dict[str, Any]:
+        """JSON-friendly view used by the API."""
+        return {
+            "version": self.version,
+            "img_shape": list(self.img_shape),
+            "rms": self.rms,
+            "successful_captures": self.successful_captures,
+            "cam_int": np.asarray(self.cam_int).tolist(),
+            "cam_dist": np.asarray(self.cam_dist).ravel().tolist(),
+            "projectors": [
+                {
+                    "id": p.id,
+                    "proj_shape": list(p.proj_shape),
+                    "rms": p.rms,
+                    "successful_captures": p.successful_captures,
+                    "distortion_model": p.distortion_model,
+                    "proj_int": np.asarray(p.proj_int).tolist(),
+                    "proj_dist": np.asarray(p.proj_dist).ravel().tolist(),
+                    "rotation": np.asarray(p.rotation).tolist(),
+                    "translation": np.asarray(p.translation).ravel().tolist(),
+                    "unreal_location": np.asarray(p.unreal_translation).tolist(),
+                    "unreal_rotation": np.asarray(p.unreal_euler).tolist(),
+                }
+                for p in self.projectors
+            ],
+            "provenance": self.provenance,
+        }
+
+
+def bundle_path_for(xml_path: str | Path) -> Path:
+    """Bundle file written next to an XML result (same stem)."""
+    return Path(xml_path).with_suffix(BUNDLE_SUFFIX)
+
+
+@functools.lru_cache(maxsize=8)
+def _load_cached(path: str, mtime_ns: int, size: int) -> CalibrationBundle:
+    return CalibrationBundle.load(path)
+
+
+def load_bundle(path: str | Path) -> CalibrationBundle:
+    """Load a bundle, reusing the previous result while the file is unchanged.
+
+    The cache key is ``(path, mtime_ns, size)``, so a re-run of the calibrator
+    (which replaces the file atomically) is picked up on the next call.
+    """
+    st = os.stat(path)
+    return _load_cached(os.fspath(path), st.st_mtime_ns, st.st_size)
+
+
+def _xml_matrix(node) -> np.ndarray:
+    # OpenCV FileStorage 矩阵节点：<rows>/<cols>/<data>
+    rows = int(node.find("rows").text)
+    cols = int(node.find("cols").text)
+    values = np.array(node.find("data").text.split(), dtype=np.float64)
+    return values.reshape(rows, cols)
+
+
+def _xml_projector(node) -> ProjectorCalibration:
+    shape_node = node.find("proj_shape")
+    shape = _xml_matrix(shape_node).ravel() if shape_node is not None else (0, 0)
+    id_node = node.find("id")
+    captures = node.find("successful_captures")
+    model = node.find("distortion_model")
+    return ProjectorCalibration(
+        id=int(id_node.text) if id_node is not None else 0,
+        proj_shape=(int(shape[0]), int(shape[1])),
+        rms=float(node.find("rms").text),
+        proj_int=_xml_matrix(node.find("proj_int")),
+        proj_dist=_xml_matrix(node.find("proj_dist")),
+        rotation=_xml_matrix(node.find("rotation")),
+        translation=_xml_matrix(node.find("translation")),
+        successful_captures=int(captures.text) if captures is not None else 0,
+        distortion_model=model.text.strip() if model is not None else "",
+    )
@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+import json
+import math
+import sqlite3
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from .calibration_bundle import CalibrationBundle
+
+HISTORY_NAME = "calibration_history.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    source TEXT,
+    decode_mode TEXT,
+    inputs_sha256 TEXT,
+    rms REAL NOT NULL,
+    successful_captures INTEGER NOT NULL,
+    img_height INTEGER NOT NULL,
+    img_width INTEGER NOT NULL,
+    duration_s REAL,
+    cam_fx REAL, cam_fy REAL, cam_cx REAL, cam_cy REAL,
+    cam_dist TEXT,
+    provenance TEXT
+);
+CREATE TABLE IF NOT EXISTS projector_runs (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    projector_id INTEGER NOT NULL,
+    proj_height INTEGER, proj_width INTEGER,
+    rms REAL NOT NULL,
+    successful_captures INTEGER,
+    fx REAL, fy REAL, cx REAL, cy REAL,
+    dist TEXT,
+    r00 REAL, r01 REAL, r02 REAL,
+    r10 REAL, r11 REAL, r12 REAL,
+    r20 REAL, r21 REAL, r22 REAL,
+    tx REAL, ty REAL, tz REAL,
+    PRIMARY KEY (run_id, projector_id)
+);
+CREATE INDEX IF NOT EXISTS idx_runs_created ON runs(created_at);
+CREATE INDEX IF NOT EXISTS idx_projector_runs_projector
+    ON projector_runs(projector_id, run_id);
+-- 只追加：禁止修改与删除历史记录
+CREATE TRIGGER IF NOT EXISTS runs_no_update BEFORE UPDATE ON runs
+    BEGIN SELECT RAISE(ABORT, 'calibration history is append-only'); END;
+CREATE TRIGGER IF NOT EXISTS runs_no_delete BEFORE DELETE ON runs
+    BEGIN SELECT RAISE(ABORT, 'calibration history is append-only'); END;
+CREATE TRIGGER IF NOT EXISTS projector_runs_no_update BEFORE UPDATE ON projector_runs
+    BEGIN SELECT RAISE(ABORT, 'calibration history is append-only'); END;
+CREATE TRIGGER IF NOT EXISTS projector_runs_no_delete BEFORE DELETE ON projector_runs
+    BEGIN SELECT RAISE(ABORT, 'calibration history is append-only'); END;
+"""
+
+# 单条 SQL 计算每次运行相对基准运行的参数差：旋转差角由 trace(Ra^T Rb) 给出
+# （两矩阵逐元素乘积之和），acos 在 Python 侧计算以兼容未编译数学函数的 SQLite
+_DELTA_SQL = """
+SELECT b.run_id, r.created_at, b.projector_id,
+       b.rms - a.rms,
+       (b.fx - a.fx) / a.fx * 100.0, (b.fy - a.fy) / a.fy * 100.0,
+       b.cx - a.cx, b.cy - a.cy,
+       b.tx - a.tx, b.ty - a.ty, b.tz - a.tz,
+       a.r00*b.r00 + a.r01*b.r01 + a.r02*b.r02 + a.r10*b.r10 + a.r11*b.r11
+         + a.r12*b.r12 + a.r20*b.r20 + a.r21*b.r21 + a.r22*b.r22
+FROM projector_runs AS b
+JOIN runs AS r ON r.run_id = b.run_id
+JOIN projector_runs AS a ON a.projector_id = b.projector_id AND a.run_id = ?
+WHERE b.run_id != a.run_id {where}
+ORDER BY b.run_id, b.projector_id
+"""
+
+
+@dataclass
+class DriftThresholds:
+    """Per-projector limits beyond which a run is flagged as drifted.
+
+    Focal lengths are compared in percent, principal point in projector pixels,
+    translation (Euclidean) in mm, rotation (angle of ``Ra^T Rb``) in degrees and
+    RMS as an absolute increase in pixels.
+    """
+
+    focal_pct: float = 0.5
+    principal_px: float = 3.0
+    translation_mm: float = 2.0
+    rotation_deg: float = 0.2
+    rms_increase: float = 0.5
+
+
+@dataclass
+class ProjectorDelta:
+    """Parameter change of one projector between a base run and ``run_id``."""
+
+    run_id: int
+    created_at: str
+    projector_id: int
+    rms: float
+    fx_pct: float
+    fy_pct: float
+    cx: float
+    cy: float
+    translation: tuple[float, float, float]
+    rotation_deg: float
+    flags: list[str] = field(default_factory=list)
+
+    @property
+    def translation_mm(self) -> float:
+        return math.sqrt(sum(v * v for v in self.translation))
+
+    @property
+    def drifted(self) -> bool:
+        return bool(self.flags)
+
+
+class CalibrationHistory:
+    """Append-only SQLite store with one row per calibration run.
+
+    ``runs`` holds the run-level values (camera intrinsics, RMS, capture counts,
+    timing, provenance); ``projector_runs`` holds each projector's intrinsics and
+    camera->projector pose with the rotation as nine columns, so deltas and
+    drift against a baseline for any number of runs are a single indexed join.
+    Triggers reject ``UPDATE``/``DELETE``.
+    """
+
+    def __init__(self, path: str | Path = HISTORY_NAME) -> None:
+        self.path = Path(path)
+        self._conn = sqlite3.connect(str(self.path))
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> CalibrationHistory:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def record(
+        self,
+        bundle: CalibrationBundle,
+        mode: str = "full",
+        duration_s: float | None = None,
+        source: str | Path | None = None,
+        created_at: str | None = None,
+    ) -> int:
+        """Append one run (all projectors of ``bundle``); returns its ``run_id``."""
+        prov = bundle.provenance or {}
+        cam = np.asarray(bundle.cam_int, np.float64)
+        if created_at is None:
+            created_at = prov.get("created_at") or datetime.now().isoformat(
+                timespec="seconds"
+            )
+        with self._conn:
+            cur = self._conn.execute(
+                "INSERT INTO runs (created_at, mode, source, decode_mode,"
+                " inputs_sha256, rms, successful_captures, img_height, img_width,"
+                " duration_s, cam_fx, cam_fy, cam_cx, cam_cy, cam_dist, provenance)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    created_at,
+                    mode,
+                    str(source) if source is not None else None,
+                    prov.get("decode_mode"),
+                    prov.get("inputs_sha256"),
+                    float(bundle.rms),
+                    int(bundle.successful_captures),
+                    int(bundle.img_shape[0]),
+                    int(bundle.img_shape[1]),
+                    duration_s,
+                    cam[0, 0],
+                    cam[1, 1],
+                    cam[0, 2],
+                    cam[1, 2],
+                    json.dumps(np.asarray(bundle.cam_dist).ravel().tolist()),
+                    json.dumps(prov),
+                ),
+            )
+            run_id = cur.lastrowid
+            rows = []
+            for p in bundle.projectors:
+                k = np.asarray(p.proj_int, np.float64)
+                rot = np.asarray(p.rotation, np.float64).ravel()
+                t = np.asarray(p.translation, np.float64).ravel()
+                rows.append(
+                    (run_id, int(p.id), int(p.proj_shape[0]), int(p.proj_shape[1]))
+                    + (float(p.rms), int(p.successful_captures))
+                    + (k[0, 0], k[1, 1], k[0, 2], k[1, 2])
+                    + (json.dumps(np.asarray(p.proj_dist).ravel().tolist()),)
+                    + tuple(float(v) for v in rot)
+                    + tuple(float(v) for v in t)
+                )
+            self._conn.executemany(
+                "INSERT INTO projector_runs VALUES"
+                " (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        return run_id
+
+    def runs(self, limit: int | None = None) -> list[dict[str, Any]]:
+        """Run-level rows, newest first."""
+        sql = "SELECT * FROM runs ORDER BY run_id DESC"
+        params: tuple = ()
+        if limit is not None:
+            sql += " LIMIT ?"
+            params = (limit,)
+        return [dict(row) for row in self._conn.execute(sql, params)]
+
+    def projector_series(self, projector_id: int) -> list[dict[str, Any]]:
+        """All stored parameters of one projector in run order."""
+        rows = self._conn.execute(
+            "SELECT p.*, r.created_at, r.mode FROM projector_runs AS p"
+            " JOIN runs AS r ON r.run_id = p.run_id"
+            " WHERE p.projector_id = ? ORDER BY p.run_id",
+            (projector_id,),
+        )
+        return [dict(row) for row in rows]
+
+    def latest_run_id(self) -> int | None:
+        row = self._conn.execute("SELECT MAX(run_id) FROM runs").fetchone()
+        return row[0]
+
+    def compare(
+        self,
+        base_run: int,
+        run_id: int,
+        thresholds: DriftThresholds | None = None,
+    ) -> list[ProjectorDelta]:
+        """Per-projector deltas of ``run_id`` relative to ``base_run``."""
+        return self._deltas(base_run, thresholds, "AND b.run_id = ?", (run_id,))
+
+    def drift(
+        self,
+        baseline: int | None = None,
+        thresholds: DriftThresholds | None = None,
+        since_run: int | None = None,
+    ) -> list[ProjectorDelta]:
+        """Deltas of every later run against ``baseline`` (default: first run)."""
+        if baseline is None:
+            row = self._conn.execute("SELECT MIN(run_id) FROM runs").fetchone()
+            baseline = row[0]
+            if baseline is None:
+                return []
+        where, params = "AND b.run_id > ?", (baseline,)
+        if since_run is not None:
+            where, params = "AND b.run_id >= ?", (max(since_run, baseline + 1),)
+        return self._deltas(baseline, thresholds, where, params)
+
+    def _deltas(self, base_run, thresholds, where, params) -> list[ProjectorDelta]:
+        thresholds = thresholds or DriftThresholds()
+        sql = _DELTA_SQL.format(where=where)
+        deltas = []
+        for row in self._conn.execute(sql, (int(base_run),) + tuple(params)):
+            cos = max(-1.0, min(1.0, (row[11] - 1.0) / 2.0))
+            delta = ProjectorDelta(
+                run_id=row[0],
+                created_at=row[1],
+                projector_id=row[2],
+                rms=row[3],
+                fx_pct=row[4],
+                fy_pct=row[5],
+                cx=row[6],
+                cy=row[7],
+                translation=(row[8], row[9], row[10]),
+                rotation_deg=math.degrees(math.acos(cos)),
+            )
+            delta.flags = _flags(delta, thresholds)
+            deltas.append(delta)
+        return deltas
+
+
+def _flags(delta: ProjectorDelta, limits: DriftThresholds) -> list[str]:
+    flags = []
+    if max(abs(delta.fx_pct), abs(delta.fy_pct)) > limits.focal_pct:
+        flags.append("focal")
+    if max(abs(delta.cx), abs(delta.cy)) > limits.principal_px:
+        flags.append("principal_point")
+    if delta.translation_mm > limits.translation_mm:
+        flags.append("translation")
+    if delta.rotation_deg > limits.rotation_deg:
+        flags.append("rotation")
+    if delta.rms > limits.rms_increase:
+        flags.append("rms")
+    return flags
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Iterable
+
+import numpy as np
+
+
+@dataclass
+class FrameQuality:
+    """Result of a per-frame quality check."""
+
+    ok: bool
+    reasons: list[str] = field(default_factory=list)
+    valid_ratio: float = 0.0
+    stripe_ratio: float = 0.0
+    motion: float = 0.0
+
+
+class CaptureQualityGate:
+    """Lightweight per-frame quality gate for gray code captures.
+
+    Works on a strided, downsampled copy of each grabbed frame so that the check
+    costs far less than the grab itself. The pattern order follows OpenCV's
+    GrayCodePattern: bit-plane pairs ``(2i, 2i+1)`` (pattern and its inverse)
+    followed by white and black. White and black must be checked first; they
+    become the reference for the contrast mask of all bit-plane frames.
+
+    For pattern sets that are not made of inverse pairs (e.g. the hybrid phase
+    shift set) pass ``paired=False`` and restrict the stripe check to the binary
+    frames with ``stripe_frames``; the other frames only get the motion check.
+    """
+
+    def __init__(
+        self,
+        pattern_count: int,
+        black_thr: int = 40,
+        white_thr: int = 5,
+        step: int = 4,
+        min_valid_ratio: float = 0.02,
+        min_stripe_ratio: float = 0.5,
+        min_pair_ratio: float = 0.8,
+        max_motion: float = 4.0,
+        max_saturated_ratio: float = 0.05,
+        stripe_frames: Iterable[int] | None = None,
+        paired: bool = True,
+    ) -> None:
+        if pattern_count < 4:
+            raise ValueError(
+                "pattern_count must include bit-plane pairs plus white/black"
+            )
+        self.pattern_count = pattern_count
+        self.white_index = pattern_count - 2
+        self.black_index = pattern_count - 1
+        self.black_thr = black_thr
+        self.white_thr = white_thr
+        self.step = max(1, int(step))
+        self.min_valid_ratio = min_valid_ratio
+        self.min_stripe_ratio = min_stripe_ratio
+        self.min_pair_ratio = min_pair_ratio
+        self.max_motion = max_motion
+        self.max_saturated_ratio = max_saturated_ratio
+        self.stripe_frames = None if stripe_frames is None else set(stripe_frames)
+        self.paired = paired
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget the references of the current round."""
+        self._white: np.ndarray | None = None
+        self._black: np.ndarray | None = None
+        self._valid: np.ndarray | None = None
+        self._mid: np.ndarray | None = None
+        self._half: np.ndarray | None = None
+        self._signs: dict[int, np.ndarray] = {}
+
+    def capture_order(self) -> list[int]:
+        """Pattern indices in the order they should be projected (white, black first)."""
+        return [self.white_index, self.black_index] + list(range(self.white_index))
+
+    def downsample(self, frame: np.ndarray) -> np.ndarray:
+        # 步进采样（不做平均），保留细条纹的原始亮度，避免抗锯齿把条纹抹成中灰
+        if frame.ndim == 3:
+            frame = frame[..., 0]
+        return np.asarray(frame[:: self.step, :: self.step], dtype=np.int16)
+
+    def check(
+        self, index: int, frame: np.ndarray, frame_next: np.ndarray | None = None
+    ) -> FrameQuality:
+        """Check one captured frame of pattern ``index``.
+
+        ``frame_next`` is an optional second grab of the same projected pattern;
+        when given, the mean absolute difference between the two is used as the
+        frame-to-frame motion estimate.
+        """
+        small = self.downsample(frame)
+        result = FrameQuality(ok=True)
+        if frame_next is not None:
+            result.motion = float(np.abs(small - self.downsample(frame_next)).mean())
+            if result.motion > self.max_motion:
+                result.reasons.append(f"motion {result.motion:.1f} > {self.max_motion}")
+
+        if index == self.white_index:
+            saturated = float((small >= 250).mean())
+            if saturated > self.max_saturated_ratio:
+                result.reasons.append(
+                    f"saturated {saturated:.1%} > {self.max_saturated_ratio:.1%}"
+                )
+            if not result.reasons:
+                self._white = small
+                self._update_reference()
+        elif index == self.black_index:
+            if self._white is None:
+                result.reasons.append("white reference missing")
+            else:
+                valid = (self._white - small) > self.black_thr
+                result.valid_ratio = float(valid.mean())
+                if result.valid_ratio < self.min_valid_ratio:
+                    result.reasons.append(
+                        f"low contrast: {result.valid_ratio:.1%} pixels above black_thr={self.black_thr}"
+                    )
+            if not result.reasons:
+                self._black = small
+                self._update_reference()
+        elif self._valid is not None and (
+            self.stripe_frames is None or index in self.stripe_frames
+        ):
+            self._check_stripes(index, small, result)
+
+        result.ok = not result.reasons
+        return result
+
+    def _update_reference(self) -> None:
+        if self._white is None or self._black is None:
+            return
+        self._valid = (self._white - self._black) > self.black_thr
+        self._mid = (self._white + self._black) // 2
+        # 判定阈值：对比度的 1/4 与 white_thr 取大，低于该偏差视为“不确定”像素
+        self._half = np.maximum((self._white - self._black) // 4, self.white_thr)
+        self._signs.clear()
+
+    def _check_stripes(
+        self, index: int, small: np.ndarray, result: FrameQuality
+    ) -> None:
+        valid = self._valid
+        result.valid_ratio = float(valid.mean())
+        if not valid.any():
+            result.reasons.append("no projected area")
+            return
+        diff = small - self._mid
+        decisive = valid & (np.abs(diff) > self._half)
+        result.stripe_ratio = float(decisive.sum() / valid.sum())
+        if result.stripe_ratio < self.min_stripe_ratio:
+            result.reasons.append(
+                f"stripes unclear: {result.stripe_ratio:.1%} decisive pixels"
+            )
+        sign = np.where(decisive, np.sign(diff), 0).astype(np.int8)
+        partner = index ^ 1
+        if self.paired and partner in self._signs:
+            # 互补帧应在确定像素上亮暗相反；不一致通常意味着投影未刷新或画面移动
+            both = (sign != 0) & (self._signs[partner] != 0)
+            if both.any():
+                opposite = float((sign[both] != self._signs[partner][both]).mean())
+                if opposite < self.min_pair_ratio:
+                    result.reasons.append(
+                        f"inverse pair mismatch: {opposite:.1%} opposite"
+                    )
+        if not result.reasons:
+            self._signs[index] = sign
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import math
+from dataclasses import asdict, dataclass, field
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class DistortionModel:
+    """One candidate lens model, named after the OpenCV flags it uses.
+
+    ``flags`` are ``cv2`` attribute names (resolved by the caller, so this module
+    does not need OpenCV); ``params`` is the number of distortion coefficients
+    the model estimates and ``coeffs`` the shortest vector OpenCV accepts for it
+    (4, 5, 8, 12 or 14), which is what the result stores.
+    """
+
+    name: str
+    flags: tuple[str, ...]
+    params: int
+    coeffs: int
+
+
+# 按求解与去畸变代价从低到高排列；"full" 即原先固定使用的模型
+DISTORTION_MODELS = (
+    DistortionModel("radial2", ("CALIB_FIX_K3", "CALIB_ZERO_TANGENT_DIST"), 2, 4),
+    DistortionModel("radial2_tangential", ("CALIB_FIX_K3",), 4, 4),
+    DistortionModel("standard", (), 5, 5),
+    DistortionModel("rational", ("CALIB_RATIONAL_MODEL",), 8, 8),
+    DistortionModel(
+        "rational_prism", ("CALIB_RATIONAL_MODEL", "CALIB_THIN_PRISM_MODEL"), 12, 12
+    ),
+    DistortionModel(
+        "full",
+        ("CALIB_RATIONAL_MODEL", "CALIB_THIN_PRISM_MODEL", "CALIB_TILTED_MODEL"),
+        14,
+        14,
+    ),
+)
+MODEL_NAMES = tuple(m.name for m in DISTORTION_MODELS)
+
+
+def get_model(name: str) -> DistortionModel:
+    for model in DISTORTION_MODELS:
+        if model.name == name:
+            return model
+    raise ValueError(f"unknown distortion model: {name}")
+
+
+def trim_coefficients(dist: np.ndarray, model: DistortionModel) -> np.ndarray:
+    """Drop the trailing (fixed, zero) coefficients a wider solver call returned.
+
+    ``cv2.stereoCalibrate`` with ``CALIB_RATIONAL_MODEL`` pads fixed intrinsics to
+    14 coefficients; storing only ``model.coeffs`` keeps undistortion on the
+    cheaper code path of the chosen model.
+    """
+    flat = np.asarray(dist, np.float64).ravel()
+    return flat[: model.coeffs].reshape(1, -1).copy()
+
+
+def kfold_splits(n_views: int, k: int = 5) -> list[tuple[list[int], list[int]]]:
+    """Interleaved k-fold split of view indices into ``(train, test)`` lists.
+
+    Falls back to leave-one-out when there are fewer views than folds. Views are
+    assigned round-robin so poses captured in sequence end up in different folds.
+    """
+    if n_views < 2:
+        raise ValueError("cross-validation needs at least two views")
+    k = max(2, min(k, n_views))
+    folds = [list(range(i, n_views, k)) for i in range(k)]
+    return [
+        ([j for j in range(n_views) if j not in fold], fold) for fold in folds if fold
+    ]
+
+
+def cv_score(fold_errors: list[tuple[float, int] | None]) -> float | None:
+    """Pooled held-out RMS from per-fold ``(sum_squared_error, point_count)``.
+
+    A model that failed to fit (or to solve a held-out pose) in any fold gets
+    ``None`` so it is never preferred on a partial score.
+    """
+    if not fold_errors or any(e is None for e in fold_errors):
+        return None
+    total = sum(e[0] for e in fold_errors)
+    count = sum(e[1] for e in fold_errors)
+    return math.sqrt(total / count) if count else None
+
+
+@dataclass
+class ModelSelection:
+    """Outcome of the cross-validated model selection.
+
+    ``scores`` maps model name to held-out reprojection RMS (px; ``None`` when
+    every fold failed); ``chosen`` is the cheapest model whose score is within
+    ``tolerance`` (relative) of the best score.
+    """
+
+    chosen: str
+    scores: dict[str, float | None] = field(default_factory=dict)
+    folds: int = 0
+    tolerance: float = 0.05
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def select_model(
+    scores: dict[str, float | None], tolerance: float = 0.05, folds: int = 0
+) -> ModelSelection:
+    """Pick the cheapest model with ``score <= best * (1 + tolerance)``."""
+    valid = {name: s for name, s in scores.items() if s is not None}
+    if not valid:
+        raise ValueError("no distortion model could be fitted")
+    limit = min(valid.values()) * (1.0 + tolerance)
+    for model in DISTORTION_MODELS:
+        if model.name in valid and valid[model.name] <= limit:
+            return ModelSelection(model.name, dict(scores), folds, tolerance)
+    # 仅包含未登记的模型名时按分数取最优
+    best = min(valid, key=valid.get)
+    return ModelSelection(best, dict(scores), folds, tolerance)
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import math
+from typing import Sequence
+
+import numpy as np
+
+
+def relative_pose(
+    r_cam: np.ndarray, t_cam: np.ndarray, r_proj: np.ndarray, t_proj: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Camera->projector pose from the board pose seen by each device.
+
+    With ``X_c = R_c X_b + t_c`` and ``X_p = R_p X_b + t_p`` the pose mapping
+    camera to projector coordinates is ``R = R_p R_c^T``, ``t = t_p - R t_c``
+    (same convention as ``cv2.stereoCalibrate``).
+    """
+    r_cam = np.asarray(r_cam, np.float64)
+    r_proj = np.asarray(r_proj, np.float64)
+    rotation = r_proj @ r_cam.T
+    translation = np.asarray(t_proj, np.float64).reshape(3, 1) - rotation @ np.asarray(
+        t_cam, np.float64
+    ).reshape(3, 1)
+    return rotation, translation
+
+
+def project_to_rotation(matrix: np.ndarray) -> np.ndarray:
+    """Closest rotation matrix (Frobenius norm) via SVD."""
+    u, _, vt = np.linalg.svd(matrix)
+    rotation = u @ vt
+    if np.linalg.det(rotation) < 0:
+        u[:, -1] *= -1
+        rotation = u @ vt
+    return rotation
+
+
+def mean_pose(
+    rotations: Sequence[np.ndarray],
+    translations: Sequence[np.ndarray],
+    weights: Sequence[float] | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Weighted chordal mean of rotations and mean of translations."""
+    w = np.ones(len(rotations)) if weights is None else np.asarray(weights, float)
+    w = w / w.sum()
+    r_sum = sum(wi * np.asarray(r, np.float64) for wi, r in zip(w, rotations))
+    t_sum = sum(
+        wi * np.asarray(t, np.float64).reshape(3, 1) for wi, t in zip(w, translations)
+    )
+    return project_to_rotation(r_sum), t_sum
+
+
+def rotation_angle_deg(r_a: np.ndarray, r_b: np.ndarray) -> float:
+    """Angle of the rotation ``R_a^T R_b`` in degrees."""
+    cos = (np.trace(np.asarray(r_a).T @ np.asarray(r_b)) - 1.0) / 2.0
+    return math.degrees(math.acos(max(-1.0, min(1.0, cos))))
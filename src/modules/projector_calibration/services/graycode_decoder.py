@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Sequence, Union
+
+import numpy as np
+
+from .pattern_manifest import GRAYCODE_MODES
+
+Frame = Union[np.ndarray, str, Path]
+
+# 每行解码中间量的估算字节数（不含位平面本身）：x/y/临时 int32、各类布尔掩码
+_ROW_OVERHEAD_BYTES = 4 * 4 + 8
+
+
+@dataclass
+class DecodedMaps:
+    """Dense camera->projector correspondence maps of one capture.
+
+    ``x``/``y`` hold gray code coordinates (multiply by ``gc_step`` for projector
+    pixels); they are only meaningful where ``valid`` is set. ``origin`` is the
+    camera pixel ``(x0, y0)`` of element ``[0, 0]`` when decoding a ROI.
+    """
+
+    x: np.ndarray
+    y: np.ndarray
+    valid: np.ndarray
+    origin: tuple[int, int] = (0, 0)
+
+
+def graycode_bit_counts(gc_width: int, gc_height: int) -> tuple[int, int]:
+    """Number of column/row bit-planes used by OpenCV's GrayCodePattern."""
+    return math.ceil(math.log2(gc_width)), math.ceil(math.log2(gc_height))
+
+
+class TiledGrayCodeDecoder:
+    """Dense, bounded-memory decoder for OpenCV gray code captures.
+
+    Frames are streamed one pattern/inverse pair at a time and reduced to packed
+    bit-planes (1 bit per pixel and plane) plus one "unreliable" mask, so full
+    resolution frames are never held together. Gray-to-binary conversion and the
+    3x3 neighbour-consistency check then run over row tiles whose height is
+    derived from ``memory_budget_mb``; each tile carries one halo row above and
+    below so the neighbour check is identical to an untiled decode.
+
+    The result matches ``GrayCodePattern.getProjPixel`` followed by the shadow
+    mask ``white - black > black_thr`` and the check that every valid 8-neighbour
+    decodes to within ``neighbour_tol`` projector pixels.
+
+    In ``"complementary"`` mode each bit is still decided by comparing the
+    pattern with its inverse, but the reliability test is relative to the
+    pixel's own white/black contrast (``|p - inv| >= pair_ratio * (w - b)``,
+    never below ``white_thr``) instead of the global thresholds. Dark or
+    unevenly lit surfaces keep their pixels, while bits blurred towards the
+    midpoint are dropped before the neighbour check and homography fit.
+    """
+
+    def __init__(
+        self,
+        gc_width: int,
+        gc_height: int,
+        black_thr: int = 40,
+        white_thr: int = 5,
+        memory_budget_mb: float = 256.0,
+        neighbour_tol: int = 2,
+        mode: str = "standard",
+        pair_ratio: float = 0.25,
+    ) -> None:
+        if mode not in GRAYCODE_MODES:
+            raise ValueError(f"unknown decode mode: {mode}")
+        self.gc_width = gc_width
+        self.gc_height = gc_height
+        self.col_bits, self.row_bits = graycode_bit_counts(gc_width, gc_height)
+        self.black_thr = black_thr
+        self.white_thr = white_thr
+        self.memory_budget_mb = memory_budget_mb
+        self.neighbour_tol = neighbour_tol
+        self.mode = mode
+        self.pair_ratio = pair_ratio
+
+    @property
+    def pattern_count(self) -> int:
+        """Number of frames expected, including white and black."""
+        return 2 * (self.col_bits + self.row_bits) + 2
+
+    def tile_rows(self, width: int) -> int:
+        """Tile height (rows) that keeps per-tile intermediates within budget."""
+        planes = self.col_bits + self.row_bits
+        per_row = width * (planes + _ROW_OVERHEAD_BYTES)
+        budget = int(self.memory_budget_mb * 1024 * 1024)
+        return max(1, budget // max(per_row, 1) - 2)
+
+    def decode(
+        self,
+        frames: Sequence[Frame],
+        roi: tuple[int, int, int, int] | None = None,
+    ) -> DecodedMaps:
+        """Decode a capture given as arrays or image paths.
+
+        ``roi`` is ``(x0, y0, x1, y1)`` in camera pixels (exclusive end); only
+        that window is decoded and returned.
+        """
+        if len(frames) < self.pattern_count:
+            raise ValueError(f"expected {self.pattern_count} frames, got {len(frames)}")
+        if roi is not None:
+            roi = (max(0, roi[0]), max(0, roi[1]), roi[2], roi[3])
+        planes, unreliable, shadow_ok = self._pack(frames, roi)
+        origin = (roi[0], roi[1]) if roi is not None else (0, 0)
+        height, width = unreliable.shape
+        out_x = np.zeros((height, width), np.uint16)
+        out_y = np.zeros((height, width), np.uint16)
+        out_valid = np.zeros((height, width), bool)
+        step = self.tile_rows(width)
+        for y0 in range(0, height, step):
+            y1 = min(height, y0 + step)
+            h0, h1 = max(0, y0 - 1), min(height, y1 + 1)
+            x, y, valid = self._decode_rows(planes, unreliable, shadow_ok, h0, h1)
+            valid = self._neighbour_check(x, y, valid)
+            out_x[y0:y1] = x[y0 - h0 : y1 - h0]
+            out_y[y0:y1] = y[y0 - h0 : y1 - h0]
+            out_valid[y0:y1] = valid[y0 - h0 : y1 - h0]
+        return DecodedMaps(out_x, out_y, out_valid, origin)
+
+    def _load(self, frame: Frame, roi) -> np.ndarray:
+        if isinstance(frame, np.ndarray):
+            img = frame
+        else:
+            # 路径输入时才需要 OpenCV（可选依赖）
+            import cv2
+
+            img = cv2.imread(str(frame), cv2.IMREAD_GRAYSCALE)
+            if img is None:
+                raise ValueError(f"Cannot read image: {frame}")
+        if img.ndim == 3:
+            img = img[..., 0]
+        if roi is not None:
+            x0, y0, x1, y1 = roi
+            img = img[y0:y1, x0:x1]
+        return img
+
+    def _pack(self, frames: Sequence[Frame], roi):
+        planes_count = self.col_bits + self.row_bits
+        white = self._load(frames[2 * planes_count], roi)
+        shape = white.shape
+        black = self._load(frames[2 * planes_count + 1], roi)
+        if black.shape != shape:
+            raise ValueError("Image size mismatch between white and black frames")
+        contrast = white.astype(np.int16) - black
+        del white, black
+        if self.mode == "complementary":
+            # 逐像素阈值：按该像素白/黑对比度缩放，且不低于噪声下限 white_thr
+            pair_thr = np.maximum(
+                (contrast * self.pair_ratio).astype(np.int16), self.white_thr
+            )
+            shadow_ok = contrast > self.white_thr
+        else:
+            pair_thr = self.white_thr
+            shadow_ok = contrast > self.black_thr
+        del contrast
+
+        packed_width = (shape[1] + 7) // 8
+        planes = np.empty((planes_count, shape[0], packed_width), np.uint8)
+        unreliable = np.zeros(shape, bool)
+        for k in range(planes_count):
+            pattern = self._load(frames[2 * k], roi)
+            inverse = self._load(frames[2 * k + 1], roi)
+            if pattern.shape != shape or inverse.shape != shape:
+                raise ValueError(f"Image size mismatch in pattern pair {k}")
+            diff = pattern.astype(np.int16) - inverse
+            unreliable |= np.abs(diff) < pair_thr
+            planes[k] = np.packbits(diff > 0, axis=1)
+        return planes, unreliable, shadow_ok
+
+    def _gray_to_binary(self, bits: np.ndarray) -> np.ndarray:
+        # 格雷码转二进制：b_i = b_{i-1} XOR g_i，按 MSB 优先累加
+        value = np.zeros(bits.shape[1:], np.int32)
+        current = np.zeros(bits.shape[1:], np.uint8)
+        for plane in bits:
+            current ^= plane
+            value <<= 1
+            value |= current
+        return value
+
+    def _decode_rows(self, planes, unreliable, shadow_ok, r0: int, r1: int):
+        width = unreliable.shape[1]
+        bits = np.unpackbits(planes[:, r0:r1], axis=2, count=width)
+        x = self._gray_to_binary(bits[: self.col_bits])
+        y = self._gray_to_binary(bits[self.col_bits :])
+        del bits
+        valid = shadow_ok[r0:r1] & ~unreliable[r0:r1]
+        valid &= (x < self.gc_width) & (y < self.gc_height)
+        return x, y, valid
+
+    def _neighbour_check(self, x, y, valid):
+        tol = self.neighbour_tol
+        consistent = valid.copy()
+        height, width = valid.shape
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                if dx == 0 and dy == 0:
+                    continue
+                # 目标像素区域 [ty0:ty1, tx0:tx1] 与其邻居区域对齐
+                ty0, ty1 = max(0, -dy), height - max(0, dy)
+                tx0, tx1 = max(0, -dx), width - max(0, dx)
+                ny0, nx0 = ty0 + dy, tx0 + dx
+                nv = valid[ny0 : ny0 + ty1 - ty0, nx0 : nx0 + tx1 - tx0]
+                nx = x[ny0 : ny0 + ty1 - ty0, nx0 : nx0 + tx1 - tx0]
+                ny = y[ny0 : ny0 + ty1 - ty0, nx0 : nx0 + tx1 - tx0]
+                close = (np.abs(nx - x[ty0:ty1, tx0:tx1]) <= tol) & (
+                    np.abs(ny - y[ty0:ty1, tx0:tx1]) <= tol
+                )
+                consistent[ty0:ty1, tx0:tx1] &= ~nv | close
+        return consistent
@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import itertools
+from dataclasses import dataclass
+
+import numpy as np
+
+from .reconstruction import pixel_rays
+
+
+@dataclass
+class Plane:
+    """Plane ``normal . X = offset`` (unit normal) in camera coordinates (mm)."""
+
+    normal: np.ndarray
+    offset: float
+
+    def distance(self, points: np.ndarray) -> np.ndarray:
+        return np.asarray(points, np.float64) @ self.normal - self.offset
+
+    def facing(self, point: np.ndarray) -> Plane:
+        """Same plane with the normal pointing towards ``point``."""
+        if self.distance(np.asarray(point, np.float64).reshape(1, 3))[0] < 0:
+            return Plane(-self.normal, -self.offset)
+        return self
+
+
+def fit_plane(
+    points: np.ndarray,
+    threshold: float = 5.0,
+    iterations: int = 200,
+    seed: int = 0,
+    sample: int = 200_000,
+) -> tuple[Plane, np.ndarray]:
+    """RANSAC plane fit followed by a least-squares refit on the inliers.
+
+    ``threshold`` is the inlier distance (same units as ``points``). Hypotheses
+    are scored on a random subset of at most ``sample`` points so the fit stays
+    fast on full-frame reconstructions. Returns ``(plane, inlier_mask)``.
+    """
+    points = np.asarray(points, np.float64).reshape(-1, 3)
+    if len(points) < 3:
+        raise ValueError("plane fit needs at least three points")
+    rng = np.random.default_rng(seed)
+    subset = points
+    if len(points) > sample:
+        subset = points[rng.choice(len(points), sample, replace=False)]
+    # 批量生成假设：每组三点的法向
+    triples = subset[rng.integers(0, len(subset), size=(iterations, 3))]
+    normals = np.cross(triples[:, 1] - triples[:, 0], triples[:, 2] - triples[:, 0])
+    norms = np.linalg.norm(normals, axis=1)
+    good = norms > 1e-9
+    normals = normals[good] / norms[good, None]
+    offsets = np.einsum("ij,ij->i", normals, triples[good, 0])
+    if not len(normals):
+        raise ValueError("points are degenerate (collinear)")
+    best, best_count = 0, -1
+    for i, (normal, offset) in enumerate(zip(normals, offsets)):
+        count = int(np.count_nonzero(np.abs(subset @ normal - offset) < threshold))
+        if count > best_count:
+            best, best_count = i, count
+    inliers = np.abs(points @ normals[best] - offsets[best]) < threshold
+    centroid = points[inliers].mean(axis=0)
+    _, _, vt = np.linalg.svd(points[inliers] - centroid, full_matrices=False)
+    normal = vt[2]
+    plane = Plane(normal, float(normal @ centroid))
+    return plane, np.abs(plane.distance(points)) < threshold
+
+
+def intersect_rays(
+    origin: np.ndarray, directions: np.ndarray, plane: Plane
+) -> np.ndarray:
+    """Intersections of rays ``origin + s * d`` (``s > 0``) with ``plane``."""
+    origin = np.asarray(origin, np.float64).reshape(3)
+    directions = np.asarray(directions, np.float64).reshape(-1, 3)
+    denom = directions @ plane.normal
+    with np.errstate(divide="ignore", invalid="ignore"):
+        s = (plane.offset - origin @ plane.normal) / denom
+    if np.any(~np.isfinite(s)) or np.any(s <= 0):
+        raise ValueError("projector rays do not hit the plane in front of it")
+    return origin + s[:, None] * directions
+
+
+def projector_footprint(
+    proj_int: np.ndarray,
+    rotation: np.ndarray,
+    translation: np.ndarray,
+    proj_shape: tuple[int, int],
+    plane: Plane,
+    proj_dist=None,
+) -> np.ndarray:
+    """Camera-frame corners of the projector image on ``plane`` (TL, TR, BR, BL)."""
+    height, width = proj_shape
+    corners = np.array(
+        [[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]], np.float64
+    )
+    rt = np.asarray(rotation, np.float64).T
+    centre = -(rt @ np.asarray(translation, np.float64).reshape(3))
+    rays = pixel_rays(corners, proj_int, proj_dist) @ rt.T
+    return intersect_rays(centre, rays, plane)
+
+
+def plane_axes(plane: Plane, up: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """In-plane ``(right, up)`` unit axes for a viewer facing the plane.
+
+    ``plane`` must face the viewer (see :meth:`Plane.facing`); ``up`` is any
+    3D direction not parallel to the normal and is projected onto the plane.
+    """
+    up = np.asarray(up, np.float64).reshape(3)
+    up = up - (up @ plane.normal) * plane.normal
+    length = np.linalg.norm(up)
+    if length < 1e-9:
+        raise ValueError("up direction is parallel to the plane normal")
+    up /= length
+    return np.cross(up, plane.normal), up
+
+
+def largest_rectangle(
+    quad: np.ndarray, aspect: float
+) -> tuple[float, float, float, float]:
+    """Largest axis-aligned rectangle of ``aspect`` (w/h) inside a convex quad.
+
+    The rectangle ``(cx, cy, w, h)`` is the optimum of a 3-variable linear
+    program (centre and width; every rectangle corner inside every edge
+    half-plane), solved by enumerating constraint vertices.
+    """
+    quad = np.asarray(quad, np.float64).reshape(-1, 2)
+    # 统一为逆时针，边的内侧在左：a . x <= b
+    area = np.sum(
+        quad[:, 0] * np.roll(quad[:, 1], -1) - np.roll(quad[:, 0], -1) * quad[:, 1]
+    )
+    if area < 0:
+        quad = quad[::-1]
+    edges = np.roll(quad, -1, axis=0) - quad
+    a = np.stack([edges[:, 1], -edges[:, 0]], axis=1)
+    b = np.einsum("ij,ij->i", a, quad)
+    rows, rhs = [], []
+    for (ax, ay), bi in zip(a, b):
+        for sx, sy in itertools.product((-0.5, 0.5), repeat=2):
+            rows.append([ax, ay, ax * sx + ay * sy / aspect])
+            rhs.append(bi)
+    rows.append([0.0, 0.0, -1.0])
+    rhs.append(0.0)
+    rows, rhs = np.array(rows), np.array(rhs)
+    combos = np.array(list(itertools.combinations(range(len(rows)), 3)))
+    mats = rows[combos]
+    dets = np.linalg.det(mats)
+    ok = np.abs(dets) > 1e-12
+    solutions = np.linalg.solve(mats[ok], rhs[combos[ok]][..., None])[..., 0]
+    feasible = np.all(solutions @ rows.T <= rhs + 1e-7 * (1 + np.abs(rhs)), axis=1)
+    if not np.any(feasible):
+        raise ValueError("no rectangle fits inside the footprint")
+    cx, cy, w = solutions[feasible][np.argmax(solutions[feasible, 2])]
+    return float(cx), float(cy), float(w), float(w / aspect)
+
+
+def homography_from_points(src: np.ndarray, dst: np.ndarray) -> np.ndarray:
+    """Homography ``dst ~ H src`` from four or more point pairs (normalized DLT)."""
+    src = np.asarray(src, np.float64).reshape(-1, 2)
+    dst = np.asarray(dst, np.float64).reshape(-1, 2)
+
+    def normalizer(pts):
+        mean = pts.mean(axis=0)
+        scale = np.sqrt(2) / max(np.mean(np.linalg.norm(pts - mean, axis=1)), 1e-12)
+        return np.array(
+            [[scale, 0, -scale * mean[0]], [0, scale, -scale * mean[1]], [0, 0, 1]]
+        )
+
+    t_src, t_dst = normalizer(src), normalizer(dst)
+    s = np.c_[src, np.ones(len(src))] @ t_src.T
+    d = np.c_[dst, np.ones(len(dst))] @ t_dst.T
+    rows = []
+    for (x, y, w), (u, v, z) in zip(s, d):
+        rows.append([0, 0, 0, -z * x, -z * y, -z * w, v * x, v * y, v * w])
+        rows.append([z * x, z * y, z * w, 0, 0, 0, -u * x, -u * y, -u * w])
+    _, _, vt = np.linalg.svd(np.asarray(rows))
+    h = np.linalg.inv(t_dst) @ vt[-1].reshape(3, 3) @ t_src
+    return h / h[2, 2]
+
+
+@dataclass
+class KeystoneSolution:
+    """Content placement on a plane for one projector.
+
+    ``homography`` maps content pixels to ideal (undistorted) projector pixels;
+    ``corners`` are the content corners TL, TR, BR, BL on the plane in camera
+    coordinates (mm) and ``size_mm`` the rectangle's width and height.
+    """
+
+    homography: np.ndarray
+    corners: np.ndarray
+    size_mm: tuple[float, float]
+    content_size: tuple[int, int]
+    proj_shape: tuple[int, int]
+
+
+def solve_keystone(
+    proj_int: np.ndarray,
+    rotation: np.ndarray,
+    translation: np.ndarray,
+    proj_shape: tuple[int, int],
+    plane: Plane,
+    content_size: tuple[int, int],
+    up: str | np.ndarray = "projector",
+    proj_dist=None,
+    margin: float = 0.0,
+) -> KeystoneSolution:
+    """Largest undistorted ``content_size`` (w, h) rectangle inside the footprint.
+
+    ``up`` is ``"projector"`` (the projector's -Y axis), ``"camera"`` (the
+    camera's -Y axis) or an explicit camera-frame vector; ``margin`` shrinks
+    the rectangle by that fraction of its size.
+    """
+    rotation = np.asarray(rotation, np.float64)
+    translation = np.asarray(translation, np.float64).reshape(3)
+    centre = -(rotation.T @ translation)
+    plane = plane.facing(centre)
+    if isinstance(up, str):
+        up = (
+            rotation.T @ np.array([0.0, -1.0, 0.0])
+            if up == "projector"
+            else np.array([0.0, -1.0, 0.0])
+        )
+    right, up_axis = plane_axes(plane, up)
+    footprint = projector_footprint(
+        proj_int, rotation, translation, proj_shape, plane, proj_dist
+    )
+    origin = footprint.mean(axis=0)
+    quad = np.stack(
+        [(footprint - origin) @ right, (footprint - origin) @ up_axis], axis=1
+    )
+    width, height = content_size
+    cx, cy, w, h = largest_rectangle(quad, width / height)
+    w, h = w * (1.0 - margin), h * (1.0 - margin)
+    top_left = origin + (cx - w / 2) * right + (cy + h / 2) * up_axis
+    corners = np.stack(
+        [
+            top_left,
+            top_left + w * right,
+            top_left + w * right - h * up_axis,
+            top_left - h * up_axis,
+        ]
+    )
+    in_proj = corners @ rotation.T + translation
+    k = np.asarray(proj_int, np.float64)
+    proj_px = (in_proj[:, :2] / in_proj[:, 2:]) * [k[0, 0], k[1, 1]] + [
+        k[0, 2],
+        k[1, 2],
+    ]
+    content = np.array([[0, 0], [width, 0], [width, height], [0, height]], np.float64)
+    return KeystoneSolution(
+        homography_from_points(content, proj_px),
+        corners,
+        (w, h),
+        (int(width), int(height)),
+        (int(proj_shape[0]), int(proj_shape[1])),
+    )
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import json
+from dataclasses import asdict, dataclass, fields
+from pathlib import Path
+
+MANIFEST_NAME = "pattern_manifest.json"
+
+# standard：OpenCV 默认解码（全局 white_thr/black_thr）
+# complementary：每个位平面与其反相帧逐像素比较，阈值按像素自身对比度归一化
+GRAYCODE_MODES = ("standard", "complementary")
+# phase_shift：粗格雷码 + N 步正弦相移，解码为连续投影仪坐标
+DECODE_MODES = GRAYCODE_MODES + ("phase_shift",)
+
+
+@dataclass
+class PatternManifest:
+    """Describes a generated pattern set so capture and decode agree on it.
+
+    Written next to the pattern images by ``gen_graycode_imgs.py``, copied into
+    every capture directory by the capture program and read by the calibrator.
+    """
+
+    mode: str
+    proj_height: int
+    proj_width: int
+    graycode_step: int
+    gc_width: int
+    gc_height: int
+    pattern_count: int
+    phase_period: int = 0
+    phase_steps: int = 0
+    version: int = 1
+
+    def __post_init__(self) -> None:
+        if self.mode not in DECODE_MODES:
+            raise ValueError(f"unknown pattern mode: {self.mode}")
+
+    def save(self, directory: str | Path) -> Path:
+        path = Path(directory) / MANIFEST_NAME
+        path.write_text(json.dumps(asdict(self), indent=2), encoding="utf-8")
+        return path
+
+    @classmethod
+    def load(cls, directory: str | Path) -> PatternManifest | None:
+        """Read the manifest of ``directory``; ``None`` if there is none."""
+        path = Path(directory) / MANIFEST_NAME
+        if not path.is_file():
+            return None
+        data = json.loads(path.read_text(encoding="utf-8"))
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
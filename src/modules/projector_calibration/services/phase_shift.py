@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import math
+from typing import Sequence
+
+import numpy as np
+
+from .graycode_decoder import DecodedMaps, Frame, TiledGrayCodeDecoder
+
+# 每行解码中间量的估算字节数：S/C 累加、相位、粗码与结果（float32/int32）
+_ROW_OVERHEAD_BYTES = 4 * 10 + 8
+
+
+def coarse_bit_count(size: int, period: int) -> int:
+    """Gray code bits needed to index half-period cells along one axis."""
+    cells = math.ceil(size / (period / 2))
+    return max(1, math.ceil(math.log2(cells)))
+
+
+def phase_shift_pattern_count(width: int, height: int, period: int, steps: int) -> int:
+    """Frames of a hybrid set, including the trailing white and black frames."""
+    return (
+        coarse_bit_count(width, period)
+        + coarse_bit_count(height, period)
+        + 2 * steps
+        + 2
+    )
+
+
+def coarse_frame_indices(width: int, height: int, period: int, steps: int) -> list[int]:
+    """Indices of the binary (coarse gray code) frames within a hybrid set."""
+    col_bits = coarse_bit_count(width, period)
+    row_bits = coarse_bit_count(height, period)
+    row_start = col_bits + steps
+    return list(range(col_bits)) + list(range(row_start, row_start + row_bits))
+
+
+def generate_phase_shift_patterns(
+    width: int, height: int, period: int = 32, steps: int = 4
+) -> list[np.ndarray]:
+    """Hybrid pattern set: coarse gray code plus N-step sinusoidal phase shift.
+
+    Order: column coarse bits, column phase frames, row coarse bits, row phase
+    frames, white, black. Coarse bits index half-period cells (MSB first); the
+    phase frames are ``127.5 + 127.5 * cos(2*pi*x/period - 2*pi*n/steps)``.
+    """
+    if period < 4 or steps < 3:
+        raise ValueError("period must be >= 4 and steps >= 3")
+    patterns = []
+    for size, axis in ((width, 1), (height, 0)):
+        coord = np.arange(size)
+        cell = coord // (period // 2) if period % 2 == 0 else (2 * coord) // period
+        gray = cell ^ (cell >> 1)
+        bits = coarse_bit_count(size, period)
+        lines = [np.where((gray >> (bits - 1 - i)) & 1, 255, 0) for i in range(bits)]
+        for n in range(steps):
+            wave = 127.5 + 127.5 * np.cos(
+                2 * np.pi * coord / period - 2 * np.pi * n / steps
+            )
+            lines.append(np.round(wave))
+        for line in lines:
+            line = line.astype(np.uint8)
+            if axis == 1:
+                patterns.append(np.repeat(line[None, :], height, axis=0))
+            else:
+                patterns.append(np.repeat(line[:, None], width, axis=1))
+    patterns.append(np.full((height, width), 255, np.uint8))
+    patterns.append(np.zeros((height, width), np.uint8))
+    return patterns
+
+
+class PhaseShiftDecoder(TiledGrayCodeDecoder):
+    """Decodes hybrid gray code + phase-shift captures to continuous coordinates.
+
+    The coarse gray code gives the half-period cell ``c`` (centre
+    ``x_c = (c + 0.5) * period / 2``, accurate to a quarter period); the wrapped
+    phase gives ``x_p`` within one period. Unwrapping picks
+    ``k = round((x_c - x_p) / period)`` and returns ``k * period + x_p``.
+    Coarse bits are decided against the per-pixel midpoint of white and black;
+    because neighbouring gray codes differ in one bit, an ambiguous bit at a
+    cell edge moves ``x_c`` by at most one cell and unwrapping still succeeds.
+
+    Pixels are rejected when the white/black contrast is below ``black_thr``,
+    when the sinusoid modulation is below ``min_modulation`` of the expected
+    amplitude, or when the coarse and unwrapped coordinates disagree by more
+    than ``3/8`` of a period. ``x``/``y`` of the result are float32 projector
+    pixels.
+    """
+
+    def __init__(
+        self,
+        proj_width: int,
+        proj_height: int,
+        period: int = 32,
+        steps: int = 4,
+        black_thr: int = 40,
+        memory_budget_mb: float = 256.0,
+        min_modulation: float = 0.3,
+    ) -> None:
+        super().__init__(
+            proj_width, proj_height, black_thr, memory_budget_mb=memory_budget_mb
+        )
+        self.period = period
+        self.steps = steps
+        self.min_modulation = min_modulation
+        self.col_bits = coarse_bit_count(proj_width, period)
+        self.row_bits = coarse_bit_count(proj_height, period)
+        angles = 2 * np.pi * np.arange(steps) / steps
+        self._cos = np.cos(angles).astype(np.float32)
+        self._sin = np.sin(angles).astype(np.float32)
+
+    @property
+    def pattern_count(self) -> int:
+        return self.col_bits + self.row_bits + 2 * self.steps + 2
+
+    def tile_rows(self, width: int) -> int:
+        per_row = width * (self.col_bits + self.row_bits + _ROW_OVERHEAD_BYTES)
+        budget = int(self.memory_budget_mb * 1024 * 1024)
+        return max(1, budget // max(per_row, 1))
+
+    def decode(
+        self,
+        frames: Sequence[Frame],
+        roi: tuple[int, int, int, int] | None = None,
+    ) -> DecodedMaps:
+        if len(frames) < self.pattern_count:
+            raise ValueError(f"expected {self.pattern_count} frames, got {len(frames)}")
+        if roi is not None:
+            roi = (max(0, roi[0]), max(0, roi[1]), roi[2], roi[3])
+        white = self._load(frames[self.pattern_count - 2], roi).astype(np.int16)
+        black = self._load(frames[self.pattern_count - 1], roi)
+        if black.shape != white.shape:
+            raise ValueError("Image size mismatch between white and black frames")
+        contrast = white - black
+        mid = white + black
+        shadow_ok = contrast > self.black_thr
+        del white, black
+
+        # 流式读取：粗码压缩为位平面，相移帧累加到 S/C（每轴两张 float32）
+        axes = []
+        index = 0
+        for bits in (self.col_bits, self.row_bits):
+            planes = np.empty(
+                (bits,) + mid.shape[:1] + ((mid.shape[1] + 7) // 8,), np.uint8
+            )
+            for i in range(bits):
+                img = self._checked(frames[index], roi, mid.shape)
+                planes[i] = np.packbits(2 * img.astype(np.int16) > mid, axis=1)
+                index += 1
+            sin_sum = np.zeros(mid.shape, np.float32)
+            cos_sum = np.zeros(mid.shape, np.float32)
+            for n in range(self.steps):
+                img = self._checked(frames[index], roi, mid.shape).astype(np.float32)
+                sin_sum += self._sin[n] * img
+                cos_sum += self._cos[n] * img
+                index += 1
+            axes.append((planes, sin_sum, cos_sum))
+
+        height, width = mid.shape
+        out_x = np.zeros((height, width), np.float32)
+        out_y = np.zeros((height, width), np.float32)
+        out_valid = np.zeros((height, width), bool)
+        step = self.tile_rows(width)
+        for y0 in range(0, height, step):
+            y1 = min(height, y0 + step)
+            valid = shadow_ok[y0:y1].copy()
+            # 期望调制幅度约为对比度的一半（余弦幅度）
+            expected = contrast[y0:y1].astype(np.float32) * (self.steps / 4.0)
+            coords = []
+            for (planes, sin_sum, cos_sum), size in zip(
+                axes, (self.gc_width, self.gc_height)
+            ):
+                coord, ok = self._unwrap(
+                    planes[:, y0:y1], sin_sum[y0:y1], cos_sum[y0:y1], expected, width
+                )
+                valid &= ok & (coord >= -0.5) & (coord < size - 0.5)
+                coords.append(coord)
+            out_x[y0:y1], out_y[y0:y1] = coords
+            out_valid[y0:y1] = valid
+        origin = (roi[0], roi[1]) if roi is not None else (0, 0)
+        return DecodedMaps(out_x, out_y, out_valid, origin)
+
+    def _checked(self, frame: Frame, roi, shape) -> np.ndarray:
+        img = self._load(frame, roi)
+        if img.shape != shape:
+            raise ValueError(f"Image size mismatch in frame {frame!r:.80}")
+        return img
+
+    def _unwrap(self, planes, sin_sum, cos_sum, expected, width):
+        period = self.period
+        bits = np.unpackbits(planes, axis=2, count=width)
+        cell = self._gray_to_binary(bits).astype(np.float32)
+        coarse = (cell + 0.5) * (period / 2.0)
+        phase = np.arctan2(sin_sum, cos_sum)
+        fine = np.mod(phase, 2 * np.pi) * (period / (2 * np.pi))
+        k = np.round((coarse - fine) / period)
+        coord = k * period + fine
+        amplitude = np.hypot(sin_sum, cos_sum)
+        ok = amplitude >= self.min_modulation * expected
+        ok &= np.abs(coord - coarse) <= 0.375 * period
+        return coord.astype(np.float32), ok
@@ -0,0 +1,411 @@
+from __future__ import annotations
+
+import json
+import threading
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+import numpy as np
+
+from src.common.array_container import read_container, write_container
+
+LEVELS_NAME = "photometric_levels.json"
+FRAME_PREFIX = "photometric_"
+PHOTOMETRIC_KIND = "photometric_compensation"
+PHOTOMETRIC_SUFFIX = ".photo"
+# 默认投影的平场灰度（必须包含 0 与 255 作为响应曲线端点）
+DEFAULT_LEVELS = (0, 51, 102, 153, 204, 255)
+# 相机饱和阈值：达到该值的观测不参与拟合
+SATURATED = 250
+# 线性光域编码表长度（16 bit）：伽马 2.2 下暗部 8-bit 码值仍可区分
+ENCODE_SIZE = 65536
+# 仿射模式的量化范围：gain ∈ [0, GAIN_MAX]，offset ∈ [-1, 1]
+GAIN_MAX = 8.0
+MODES = ("affine", "lut")
+
+
+@dataclass
+class PhotometricCapture:
+    """Flat grey levels of one photometric capture (``photometric_levels.json``).
+
+    Written by the capture program next to the ``photometric_XX.png`` frames,
+    frame ``i`` showing ``levels[i]`` on the whole projector.
+    """
+
+    levels: list[int]
+    proj_height: int
+    proj_width: int
+    version: int = 1
+
+    def __post_init__(self) -> None:
+        self.levels = [int(v) for v in self.levels]
+        if 0 not in self.levels or 255 not in self.levels or len(set(self.levels)) < 3:
+            raise ValueError(
+                "photometric levels must include 0, 255 and one level in between"
+            )
+
+    def frame_name(self, index: int) -> str:
+        return f"{FRAME_PREFIX}{index:02d}.png"
+
+    def save(self, directory: str | Path) -> Path:
+        path = Path(directory) / LEVELS_NAME
+        path.write_text(json.dumps(asdict(self), indent=2), encoding="utf-8")
+        return path
+
+    @classmethod
+    def load(cls, directory: str | Path) -> PhotometricCapture | None:
+        path = Path(directory) / LEVELS_NAME
+        if not path.is_file():
+            return None
+        data = json.loads(path.read_text(encoding="utf-8"))
+        return cls(data["levels"], data["proj_height"], data["proj_width"])
+
+
+def flat_frame(level: int, proj_shape: tuple[int, int]) -> np.ndarray:
+    return np.full(proj_shape, level, np.uint8)
+
+
+def accumulate_responses(
+    frames: list[np.ndarray],
+    cam_pixels: np.ndarray,
+    proj_pixels: np.ndarray,
+    proj_shape: tuple[int, int],
+    cell: int = 4,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Mean camera response of every ``cell`` x ``cell`` projector block.
+
+    ``cam_pixels``/``proj_pixels`` are decoded correspondences ``(N, 2)`` (u, v
+    and x, y). Returns ``(responses, counts)`` shaped ``(L, gh, gw)`` and
+    ``(gh, gw)``, one response per captured level; unobserved cells have count 0.
+    """
+    gh, gw = -(-proj_shape[0] // cell), -(-proj_shape[1] // cell)
+    px = np.clip(np.asarray(proj_pixels[:, 0]).astype(np.int64) // cell, 0, gw - 1)
+    py = np.clip(np.asarray(proj_pixels[:, 1]).astype(np.int64) // cell, 0, gh - 1)
+    index = py * gw + px
+    u = np.asarray(cam_pixels[:, 0]).astype(np.int64)
+    v = np.asarray(cam_pixels[:, 1]).astype(np.int64)
+    counts = np.bincount(index, minlength=gh * gw)
+    responses = np.empty((len(frames), gh * gw), np.float32)
+    for i, frame in enumerate(frames):
+        sums = np.bincount(index, weights=frame[v, u], minlength=gh * gw)
+        responses[i] = sums / np.maximum(counts, 1)
+    return responses.reshape(len(frames), gh, gw), counts.reshape(gh, gw)
+
+
+def fit_gamma(
+    levels: list[int],
+    responses: np.ndarray,
+    counts: np.ndarray,
+    min_range: float = 20.0,
+) -> float:
+    """Global projector gamma from the normalized mid-level responses.
+
+    Each usable cell (observed, unsaturated, with a white-black range of at
+    least ``min_range``) gives ``gamma`` as the log-domain least-squares slope
+    of ``(R - R_0) / (R_255 - R_0)`` against ``level / 255``; the median over
+    cells is returned, which is robust to shadowed or specular cells.
+    """
+    levels = np.asarray(levels, np.float64)
+    order = np.argsort(levels)
+    levels, r = levels[order], responses[order].reshape(len(levels), -1).astype(
+        np.float64
+    )
+    black, white = r[0], r[-1]
+    usable = (counts.ravel() > 0) & (white - black >= min_range) & (white < SATURATED)
+    if not np.any(usable):
+        raise ValueError("no cell has enough contrast to fit the projector gamma")
+    mid = slice(1, len(levels) - 1)
+    x = np.log(levels[mid] / 255.0)
+    norm = (r[mid][:, usable] - black[usable]) / (white[usable] - black[usable])
+    y = np.log(np.clip(norm, 1e-4, None))
+    gammas = (x @ y) / (x @ x)
+    return float(np.median(gammas))
+
+
+def fit_affine_response(
+    levels: list[int], responses: np.ndarray, gamma: float
+) -> tuple[np.ndarray, np.ndarray]:
+    """Per-cell ``R = a * (level / 255) ** gamma + b`` by weighted least squares.
+
+    Saturated observations get zero weight. Returns ``(a, b)`` shaped like one
+    response image; cells with fewer than two usable levels get ``a = 0``.
+    """
+    x = (np.asarray(levels, np.float64) / 255.0) ** gamma
+    r = responses.reshape(len(x), -1).astype(np.float64)
+    w = (r < SATURATED).astype(np.float64)
+    sw, sx, sy = w.sum(0), (w * x[:, None]).sum(0), (w * r).sum(0)
+    sxx, sxy = (w * x[:, None] ** 2).sum(0), (w * x[:, None] * r).sum(0)
+    det = sw * sxx - sx * sx
+    ok = (sw >= 2) & (det > 1e-12)
+    safe = np.where(ok, det, 1.0)
+    a = np.where(ok, (sw * sxy - sx * sy) / safe, 0.0)
+    b = np.where(ok, (sxx * sy - sx * sxy) / safe, 0.0)
+    shape = responses.shape[1:]
+    return a.reshape(shape), b.reshape(shape)
+
+
+def target_range(
+    levels: list[int],
+    responses: np.ndarray,
+    counts: np.ndarray,
+    percentile: float = 2.0,
+) -> tuple[float, float]:
+    """Common ``(floor, ceiling)`` camera response every cell can reach.
+
+    The floor is the ``100 - percentile`` percentile of the black response and
+    the ceiling the ``percentile`` percentile of the white response over
+    observed cells, so a few dark or hot outliers do not flatten the range.
+    """
+    seen = counts > 0
+    order = np.argsort(levels)
+    floor = float(np.percentile(responses[order[0]][seen], 100.0 - percentile))
+    ceiling = float(np.percentile(responses[order[-1]][seen], percentile))
+    if ceiling <= floor:
+        raise ValueError("the surface is too uneven: no common brightness range")
+    return floor, ceiling
+
+
+def encode_lut(gamma: float) -> np.ndarray:
+    """Linear light ``[0, 1]`` quantized to :data:`ENCODE_SIZE` -> 8-bit level."""
+    x = np.linspace(0.0, 1.0, ENCODE_SIZE)
+    return np.round(255.0 * x ** (1.0 / gamma)).astype(np.uint8)
+
+
+def decode_lut(gamma: float) -> np.ndarray:
+    """8-bit level -> linear light ``(v / 255) ** gamma`` (float32)."""
+    return ((np.arange(256) / 255.0) ** gamma).astype(np.float32)
+
+
+@dataclass
+class PhotometricCompensation:
+    """Quantized per-cell compensation for one projector.
+
+    ``mode="affine"``: ``lin_out = gain * lin_in + offset`` in linear light, with
+    ``gain_q`` (uint16) and ``offset_q`` (int16) per cell; a frame is decoded
+    with a 256-entry LUT, multiplied-added per pixel and re-encoded with a
+    65536-entry LUT. ``mode="lut"``: ``tables`` holds a 256-entry uint8 table per
+    cell built from the measured (piecewise-linear) response curves, applied as
+    one gather. Both are stored in a ``.photo`` array container and can be
+    memory-mapped.
+    """
+
+    mode: str
+    gamma: float
+    cell: int
+    proj_shape: tuple[int, int]
+    floor: float
+    ceiling: float
+    arrays: dict[str, np.ndarray]
+    meta: dict = field(default_factory=dict)
+    _cache: dict = field(default_factory=dict, repr=False, compare=False)
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, repr=False, compare=False
+    )
+    _local: threading.local = field(
+        default_factory=threading.local, repr=False, compare=False
+    )
+
+    def __post_init__(self) -> None:
+        if self.mode not in MODES:
+            raise ValueError(f"unknown compensation mode: {self.mode}")
+        self.proj_shape = (int(self.proj_shape[0]), int(self.proj_shape[1]))
+
+    def _expand(self, grid: np.ndarray) -> np.ndarray:
+        # 按单元块最近邻展开到投影仪分辨率（只在首次 apply 时计算）
+        full = np.repeat(np.repeat(grid, self.cell, axis=0), self.cell, axis=1)
+        return np.ascontiguousarray(full[: self.proj_shape[0], : self.proj_shape[1]])
+
+    def gain(self) -> np.ndarray:
+        return self.arrays["gain_q"].astype(np.float32) * np.float32(GAIN_MAX / 65535.0)
+
+    def offset(self) -> np.ndarray:
+        return self.arrays["offset_q"].astype(np.float32) / np.float32(32767.0)
+
+    def _prepare(self, shape: tuple[int, ...]) -> dict:
+        """Full-resolution tables for one frame shape (shared by all threads)."""
+        cache = self._cache.get(shape)
+        if cache is not None:
+            return cache
+        with self._lock:
+            if shape in self._cache:
+                return self._cache[shape]
+            channels = shape[2:]
+
+            def per_channel(grid):
+                full = self._expand(grid)
+                return np.ascontiguousarray(
+                    np.broadcast_to(
+                        full.reshape(full.shape + (1,) * len(channels)), shape
+                    )
+                )
+
+            cache = {}
+            if self.mode == "affine":
+                # 线性光域按编码表长度缩放，截断到整数即为编码表下标
+                scale = np.float32(ENCODE_SIZE - 1)
+                cache["gain"] = per_channel(self.gain())
+                # +0.5：下面截断取整即为四舍五入
+                cache["offset"] = per_channel(self.offset() * scale + np.float32(0.5))
+                cache["decode"] = decode_lut(self.gamma) * scale
+                cache["encode"] = encode_lut(self.gamma)
+            else:
+                gh, gw = self.arrays["tables"].shape[:2]
+                base = np.arange(gh * gw, dtype=np.int32).reshape(gh, gw) * 256
+                cache["base"] = per_channel(base)
+                cache["flat"] = np.ascontiguousarray(self.arrays["tables"]).reshape(-1)
+            self._cache[shape] = cache
+            return cache
+
+    def _buffers(self, shape: tuple[int, ...]) -> tuple[np.ndarray, np.ndarray]:
+        """Per-thread intermediate buffers ``(linear, index)`` for one shape."""
+        buffers = getattr(self._local, "buffers", None)
+        if buffers is None:
+            buffers = self._local.buffers = {}
+        if shape not in buffers:
+            buffers[shape] = (np.empty(shape, np.float32), np.empty(shape, np.int32))
+        return buffers[shape]
+
+    def apply(self, frame: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+        """Compensate an 8-bit projector frame (``(H, W)`` or ``(H, W, C)``).
+
+        Tables are expanded to full resolution once per frame shape and shared;
+        intermediate buffers are allocated once per thread, so steady-state
+        frames do not allocate and one instance can serve a worker pool. The
+        affine path uses OpenCV's SIMD LUT/multiply/add when it is installed.
+        """
+        if frame.dtype != np.uint8 or frame.shape[:2] != self.proj_shape:
+            raise ValueError(
+                f"expected a uint8 frame of {self.proj_shape[1]}x{self.proj_shape[0]}"
+            )
+        cache = self._prepare(frame.shape)
+        if out is None:
+            out = np.empty_like(frame)
+        lin, index = self._buffers(frame.shape)
+        if self.mode == "lut":
+            np.add(cache["base"], frame, out=index)
+            np.take(cache["flat"], index, out=out)
+            return out
+        try:
+            import cv2
+        except ImportError:
+            cv2 = None
+        if cv2 is not None:
+            cv2.LUT(frame, cache["decode"], dst=lin)
+            cv2.multiply(lin, cache["gain"], dst=lin)
+            cv2.add(lin, cache["offset"], dst=lin)
+        else:
+            np.take(cache["decode"], frame, out=lin)
+            lin *= cache["gain"]
+            lin += cache["offset"]
+        # mode="clip" 同时完成 [0, 1] 截断
+        np.copyto(index, lin, casting="unsafe")
+        np.take(cache["encode"], index, out=out, mode="clip")
+        return out
+
+    def save(self, path: str | Path) -> Path:
+        meta = {
+            "mode": self.mode,
+            "gamma": self.gamma,
+            "cell": self.cell,
+            "proj_shape": list(self.proj_shape),
+            "floor": self.floor,
+            "ceiling": self.ceiling,
+            **self.meta,
+        }
+        return write_container(path, PHOTOMETRIC_KIND, self.arrays, meta)
+
+    @classmethod
+    def load(cls, path: str | Path, mmap_mode: bool = True) -> PhotometricCompensation:
+        container = read_container(path, PHOTOMETRIC_KIND, mmap_mode=mmap_mode)
+        meta = dict(container.meta)
+        known = {
+            k: meta.pop(k)
+            for k in ("mode", "gamma", "cell", "proj_shape", "floor", "ceiling")
+        }
+        return cls(
+            known["mode"],
+            float(known["gamma"]),
+            int(known["cell"]),
+            tuple(known["proj_shape"]),
+            float(known["floor"]),
+            float(known["ceiling"]),
+            dict(container.arrays),
+            meta,
+        )
+
+
+def build_affine(
+    a: np.ndarray,
+    b: np.ndarray,
+    counts: np.ndarray,
+    gamma: float,
+    floor: float,
+    ceiling: float,
+    cell: int,
+    proj_shape: tuple[int, int],
+    min_gain: float = 1.0,
+) -> PhotometricCompensation:
+    """Affine compensation mapping every cell onto ``floor..ceiling``.
+
+    In linear light the cell outputs ``a * x + b``; showing
+    ``x = gain * v + offset`` with ``gain = (ceiling - floor) / a`` and
+    ``offset = (floor - b) / a`` makes it ``floor + (ceiling - floor) * v``.
+    Unobserved cells and cells with ``a < min_gain`` (shadow) are left as is.
+    """
+    ok = (counts > 0) & (a >= min_gain)
+    safe = np.where(ok, a, 1.0)
+    gain = np.where(ok, (ceiling - floor) / safe, 1.0)
+    offset = np.where(ok, (floor - b) / safe, 0.0)
+    arrays = {
+        "gain_q": np.round(np.clip(gain, 0.0, GAIN_MAX) * (65535.0 / GAIN_MAX)).astype(
+            np.uint16
+        ),
+        "offset_q": np.round(np.clip(offset, -1.0, 1.0) * 32767.0).astype(np.int16),
+    }
+    return PhotometricCompensation(
+        "affine", gamma, cell, proj_shape, floor, ceiling, arrays
+    )
+
+
+def build_lut(
+    levels: list[int],
+    responses: np.ndarray,
+    counts: np.ndarray,
+    gamma: float,
+    floor: float,
+    ceiling: float,
+    cell: int,
+    proj_shape: tuple[int, int],
+    chunk: int = 16384,
+) -> PhotometricCompensation:
+    """Per-cell 256-entry tables inverting the measured response curves.
+
+    The responses are made monotone, interpolated piecewise-linearly in linear
+    light between the captured levels, and inverted at the targets
+    ``floor + (ceiling - floor) * (v / 255) ** gamma``. Unobserved cells get
+    the identity table.
+    """
+    order = np.argsort(levels)
+    x = (np.asarray(levels, np.float64)[order] / 255.0) ** gamma
+    r = responses[order].reshape(len(x), -1).astype(np.float64)
+    r = np.maximum.accumulate(r, axis=0)
+    target = floor + (ceiling - floor) * decode_lut(gamma).astype(np.float64)
+    cells = r.shape[1]
+    tables = np.empty((cells, 256), np.uint8)
+    for start in range(0, cells, chunk):
+        rc = r[:, start : start + chunk]
+        lin = np.zeros((rc.shape[1], 256))
+        # 逐段反插值：R_l <= T < R_{l+1} 时在线性光域内插
+        for lo in range(len(x) - 1):
+            r0, r1 = rc[lo][:, None], rc[lo + 1][:, None]
+            span = np.maximum(r1 - r0, 1e-6)
+            t = np.clip((target[None, :] - r0) / span, 0.0, 1.0)
+            inside = target[None, :] >= r0
+            lin = np.where(inside, x[lo] + t * (x[lo + 1] - x[lo]), lin)
+        tables[start : start + chunk] = np.round(255.0 * lin ** (1.0 / gamma))
+    identity = np.arange(256, dtype=np.uint8)
+    tables[counts.ravel() == 0] = identity
+    tables = tables.reshape(*responses.shape[1:], 256)
+    return PhotometricCompensation(
+        "lut", gamma, cell, proj_shape, floor, ceiling, {"tables": tables}
+    )
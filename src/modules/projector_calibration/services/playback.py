@@ -0,0 +1,501 @@
+from __future__ import annotations
+
+import heapq
+import os
+import queue
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+
+# 队列结束标记 / 工作线程跳过的过期帧
+_END = object()
+_SKIPPED = object()
+VIDEO_SUFFIXES = (".mp4", ".avi", ".mov", ".mkv", ".m4v", ".webm")
+
+
+class FrameSource:
+    """Iterable of content frames (``uint8``, ``(H, W, 3)``) with a nominal rate."""
+
+    fps: float = 0.0
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class VideoSource(FrameSource):
+    """Frames decoded by ``cv2.VideoCapture`` (files, devices, streams)."""
+
+    def __init__(self, path: str | int, loop: bool = False):
+        import cv2
+
+        self._cv2 = cv2
+        self._cap = cv2.VideoCapture(path)
+        if not self._cap.isOpened():
+            raise ValueError(f"cannot open video: {path}")
+        self.fps = float(self._cap.get(cv2.CAP_PROP_FPS) or 0.0)
+        self.loop = loop
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        while True:
+            ok, frame = self._cap.read()
+            if not ok:
+                if not self.loop:
+                    return
+                self._cap.set(self._cv2.CAP_PROP_POS_FRAMES, 0)
+                ok, frame = self._cap.read()
+                if not ok:
+                    return
+            yield frame
+
+    def close(self) -> None:
+        self._cap.release()
+
+
+class ImageSequenceSource(FrameSource):
+    """Still images in order, each decoded once and cached when ``loop``."""
+
+    def __init__(self, paths: list[str | Path], fps: float = 30.0, loop: bool = False):
+        if not paths:
+            raise ValueError("image sequence is empty")
+        self.paths = [str(p) for p in paths]
+        self.fps = fps
+        self.loop = loop
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        import cv2
+
+        cache: list[np.ndarray] = []
+        for path in self.paths:
+            frame = cv2.imread(path, cv2.IMREAD_COLOR)
+            if frame is None:
+                raise ValueError(f"cannot read image: {path}")
+            if self.loop:
+                cache.append(frame)
+            yield frame
+        while self.loop:
+            yield from cache
+
+
+class SyntheticSource(FrameSource):
+    """Moving-bar test frames for benchmarks; decoding cost is excluded."""
+
+    def __init__(
+        self, size: tuple[int, int], count: int, fps: float = 60.0, variants: int = 8
+    ):
+        width, height = size
+        self.fps = fps
+        self.count = count
+        rng = np.random.default_rng(0)
+        base = rng.integers(0, 64, (height, width, 3), dtype=np.uint8)
+        self._frames = []
+        for i in range(variants):
+            frame = base.copy()
+            x0 = i * width // variants
+            frame[:, x0 : x0 + max(1, width // variants)] = 255
+            self._frames.append(frame)
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        for i in range(self.count):
+            yield self._frames[i % len(self._frames)]
+
+
+def open_source(spec: str, fps: float = 30.0, loop: bool = False) -> FrameSource:
+    """Video file/device index, image file, directory or glob of images."""
+    import glob
+
+    if spec.isdigit():
+        return VideoSource(int(spec), loop)
+    path = Path(spec)
+    if path.suffix.lower() in VIDEO_SUFFIXES:
+        return VideoSource(spec, loop)
+    if path.is_dir():
+        paths = sorted(
+            p
+            for p in path.iterdir()
+            if p.suffix.lower() in (".png", ".jpg", ".jpeg", ".bmp")
+        )
+    else:
+        paths = sorted(glob.glob(spec))
+    return ImageSequenceSource(paths, fps, loop)
+
+
+class FrameSink:
+    """Consumer of processed frames; ``write`` returns ``False`` to stop playback."""
+
+    def write(self, frame: np.ndarray) -> bool:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class NullSink(FrameSink):
+    """Discards frames (benchmarks); touches one pixel so work is not elided."""
+
+    def __init__(self) -> None:
+        self.frames = 0
+        self.checksum = 0
+
+    def write(self, frame: np.ndarray) -> bool:
+        self.frames += 1
+        self.checksum = (
+            self.checksum + int(frame[0, 0, 0] if frame.ndim == 3 else frame[0, 0])
+        ) & 0xFFFF
+        return True
+
+
+class FileSink(FrameSink):
+    """Video file (by suffix, ``cv2.VideoWriter``) or a directory of PNG frames."""
+
+    def __init__(self, path: str | Path, fps: float = 30.0, fourcc: str = "mp4v"):
+        self.path = Path(path)
+        self.fps = fps
+        self.fourcc = fourcc
+        self._writer = None
+        self._index = 0
+        if self.path.suffix.lower() not in VIDEO_SUFFIXES:
+            self.path.mkdir(parents=True, exist_ok=True)
+
+    def write(self, frame: np.ndarray) -> bool:
+        import cv2
+
+        if self.path.suffix.lower() in VIDEO_SUFFIXES:
+            if self._writer is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                size = (frame.shape[1], frame.shape[0])
+                self._writer = cv2.VideoWriter(
+                    str(self.path), cv2.VideoWriter_fourcc(*self.fourcc), self.fps, size
+                )
+            self._writer.write(frame)
+        else:
+            cv2.imwrite(str(self.path / f"frame_{self._index:06d}.png"), frame)
+        self._index += 1
+        return True
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.release()
+            self._writer = None
+
+
+class WindowSink(FrameSink):
+    """Borderless full-screen OpenCV window at a monitor position; ``q``/Esc stops."""
+
+    def __init__(
+        self,
+        name: str = "projection",
+        position: tuple[int, int] = (0, 0),
+        fullscreen: bool = True,
+    ):
+        import cv2
+
+        self._cv2 = cv2
+        self.name = name
+        cv2.namedWindow(name, cv2.WINDOW_NORMAL)
+        cv2.moveWindow(name, *position)
+        if fullscreen:
+            cv2.setWindowProperty(name, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
+
+    def write(self, frame: np.ndarray) -> bool:
+        self._cv2.imshow(self.name, frame)
+        return (self._cv2.waitKey(1) & 0xFF) not in (ord("q"), 27)
+
+    def close(self) -> None:
+        self._cv2.destroyWindow(self.name)
+
+
+@dataclass
+class PlaybackStats:
+    """Throughput and latency of one playback run.
+
+    ``latency_ms`` is measured from the moment the reader produced a frame to
+    the moment the sink returned; ``dropped`` counts frames that missed their
+    presentation deadline by more than one frame period (real-time mode only).
+    """
+
+    frames_read: int = 0
+    frames_shown: int = 0
+    dropped: int = 0
+    elapsed_s: float = 0.0
+    fps: float = 0.0
+    process_ms: float = 0.0
+    latency_ms: dict[str, float] = field(default_factory=dict)
+    workers: int = 0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def _percentiles(values: list[float]) -> dict[str, float]:
+    if not values:
+        return {}
+    arr = np.asarray(values) * 1000.0
+    return {
+        "mean": round(float(arr.mean()), 3),
+        "p50": round(float(np.percentile(arr, 50)), 3),
+        "p95": round(float(np.percentile(arr, 95)), 3),
+        "max": round(float(arr.max()), 3),
+    }
+
+
+class PlaybackPipeline:
+    """Reader thread -> worker pool (warp + compensation) -> double-buffered sink.
+
+    The reader decodes frames into a bounded queue; each worker resizes a frame
+    to the warp's content size, pre-warps it into a pooled output buffer and
+    applies the photometric compensation in place. Finished frames are put
+    back in order and handed to the sink through a two-slot queue, so one
+    frame can be shown while the next waits; output buffers return to the pool
+    once the sink is done with them. With ``realtime`` frames are paced at
+    ``fps`` and frames later than one period are dropped -- by the worker
+    before any processing when possible, so an overloaded pipeline catches up
+    instead of falling further behind; otherwise the pipeline runs as fast as
+    it can (benchmarks, file export).
+    """
+
+    def __init__(
+        self,
+        source: FrameSource,
+        sink: FrameSink,
+        warp=None,
+        compensation=None,
+        workers: int | None = None,
+        fps: float | None = None,
+        realtime: bool = True,
+        max_frames: int | None = None,
+    ):
+        self.source = source
+        self.sink = sink
+        self.warp = warp
+        self.compensation = compensation
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.fps = fps or source.fps or 30.0
+        self.realtime = realtime
+        self.max_frames = max_frames
+        if (
+            warp is not None
+            and compensation is not None
+            and tuple(warp.proj_shape) != compensation.proj_shape
+        ):
+            raise ValueError(
+                "warp maps and compensation table are for different projector resolutions"
+            )
+        self._stop = threading.Event()
+        self._errors: list[BaseException] = []
+        # 实时模式的显示时刻基准（第一帧显示时由 presenter 设置）
+        self._start: float | None = None
+        # 单帧处理耗时的滑动估计，工作线程据此提前跳过赶不上的帧
+        self._cost = 0.0
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _put(self, q: queue.Queue, item) -> bool:
+        # 带超时的阻塞写入，便于响应停止请求
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _reader(self, inbox: queue.Queue, stats: PlaybackStats) -> None:
+        try:
+            for index, frame in enumerate(self.source):
+                if self._stop.is_set() or (
+                    self.max_frames is not None and index >= self.max_frames
+                ):
+                    break
+                stats.frames_read += 1
+                if not self._put(inbox, (index, frame, time.perf_counter())):
+                    break
+        except BaseException as exc:  # 记录后由 run() 重新抛出
+            self._errors.append(exc)
+        finally:
+            for _ in range(self.workers):
+                if not self._put(inbox, _END):
+                    break
+
+    def _late(self, index: int, now: float, cost: float = 0.0) -> bool:
+        start = self._start
+        return (
+            self.realtime
+            and start is not None
+            and now + cost > start + (index + 1) / self.fps
+        )
+
+    def _process(self, frame: np.ndarray, out: np.ndarray | None) -> np.ndarray:
+        if self.warp is not None:
+            width, height = self.warp.content_size
+            if frame.shape[1] != width or frame.shape[0] != height:
+                import cv2
+
+                frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+            if out is None or out.shape[2:] != frame.shape[2:]:
+                out = self.warp.allocate(frame)
+            frame = self.warp.warp(frame, out)
+        elif out is None or out.shape != frame.shape:
+            out = frame.copy()
+        else:
+            np.copyto(out, frame)
+            frame = out
+        if self.compensation is not None:
+            frame = self.compensation.apply(frame, frame)
+        return frame
+
+    def _worker(self, number, inbox, pool, done, cond, timings) -> None:
+        try:
+            while not self._stop.is_set():
+                try:
+                    item = inbox.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if item is _END:
+                    break
+                index, frame, t_read = item
+                if self._late(index, time.perf_counter(), self._cost):
+                    # 已错过显示时刻：不做处理，直接让位给后续帧
+                    with cond:
+                        heapq.heappush(done, (index, t_read, _SKIPPED))
+                        cond.notify_all()
+                    continue
+                buffer = pool.get()
+                started = time.perf_counter()
+                result = self._process(frame, buffer)
+                elapsed = time.perf_counter() - started
+                timings.append(elapsed)
+                self._cost = (
+                    elapsed if not self._cost else 0.9 * self._cost + 0.1 * elapsed
+                )
+                with cond:
+                    heapq.heappush(done, (index, t_read, result))
+                    cond.notify_all()
+        except BaseException as exc:  # 记录后由 run() 重新抛出
+            self._errors.append(exc)
+            self._stop.set()
+        finally:
+            # 结束标记排在所有帧之后（按工作线程编号区分）
+            with cond:
+                heapq.heappush(done, (float("inf"), number, None))
+                cond.notify_all()
+
+    def _presenter(
+        self, done, cond, outbox: queue.Queue, pool: queue.Queue, stats: PlaybackStats
+    ) -> None:
+        expected, finished = 0, 0
+        period = 1.0 / self.fps
+        while finished < self.workers:
+            with cond:
+                while not done or (
+                    done[0][0] != expected and done[0][0] != float("inf")
+                ):
+                    if self._stop.is_set():
+                        break
+                    cond.wait(0.1)
+                if self._stop.is_set() and (not done or done[0][0] != expected):
+                    break
+                index, t_read, frame = heapq.heappop(done)
+            if frame is None:
+                finished += 1
+                continue
+            expected += 1
+            if frame is _SKIPPED:
+                stats.dropped += 1
+                continue
+            if self.realtime:
+                now = time.perf_counter()
+                if self._start is None:
+                    self._start = now - index * period
+                deadline = self._start + index * period
+                if self._late(index, now):
+                    # 处理完成时已错过显示时刻超过一帧：丢弃并归还缓冲
+                    stats.dropped += 1
+                    pool.put(frame)
+                    continue
+                if deadline > now:
+                    time.sleep(deadline - now)
+            if not self._put(outbox, (t_read, frame)):
+                break
+        self._put(outbox, _END)
+
+    def run(self) -> PlaybackStats:
+        """Play until the source ends, the sink asks to stop or :meth:`stop`."""
+        stats = PlaybackStats(workers=self.workers)
+        self._stop.clear()
+        self._errors.clear()
+        self._start = None
+        self._cost = 0.0
+        inbox: queue.Queue = queue.Queue(maxsize=2 * self.workers)
+        # 双缓冲输出队列：显示一帧的同时下一帧就绪
+        outbox: queue.Queue = queue.Queue(maxsize=2)
+        pool: queue.Queue = queue.Queue()
+        for _ in range(2 * self.workers + 3):
+            pool.put(None)
+        done: list = []
+        cond = threading.Condition()
+        timings: list[float] = []
+        latencies: list[float] = []
+        threads = [
+            threading.Thread(target=self._reader, args=(inbox, stats), daemon=True)
+        ]
+        threads += [
+            threading.Thread(
+                target=self._worker,
+                args=(i, inbox, pool, done, cond, timings),
+                daemon=True,
+            )
+            for i in range(self.workers)
+        ]
+        threads.append(
+            threading.Thread(
+                target=self._presenter,
+                args=(done, cond, outbox, pool, stats),
+                daemon=True,
+            )
+        )
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        try:
+            while True:
+                try:
+                    item = outbox.get(timeout=0.1)
+                except queue.Empty:
+                    if self._stop.is_set():
+                        break
+                    continue
+                if item is _END:
+                    break
+                t_read, frame = item
+                keep_going = self.sink.write(frame)
+                latencies.append(time.perf_counter() - t_read)
+                stats.frames_shown += 1
+                pool.put(frame)
+                if not keep_going:
+                    break
+        finally:
+            self._stop.set()
+            # 释放可能阻塞在池/队列上的线程
+            for _ in range(self.workers):
+                pool.put(None)
+            for t in threads:
+                t.join(timeout=2.0)
+            self.source.close()
+            self.sink.close()
+        stats.elapsed_s = time.perf_counter() - started
+        stats.fps = stats.frames_shown / stats.elapsed_s if stats.elapsed_s > 0 else 0.0
+        stats.process_ms = (
+            round(1000.0 * float(np.mean(timings)), 3) if timings else 0.0
+        )
+        stats.latency_ms = _percentiles(latencies)
+        if self._errors:
+            raise self._errors[0]
+        return stats
@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from src.common.array_container import read_container, write_container
+
+PREWARP_KIND = "prewarp_maps"
+PREWARP_SUFFIX = ".warp"
+
+
+def prewarp_key(
+    calibration_sha256: str,
+    projector_id: int,
+    homography: np.ndarray,
+    proj_shape: tuple[int, int],
+    content_size: tuple[int, int],
+) -> str:
+    """Cache key of a set of remap tables (inputs that change the maps)."""
+    payload = json.dumps(
+        {
+            "calibration": calibration_sha256,
+            "projector": int(projector_id),
+            # 量化单应矩阵，避免浮点末位差异导致缓存失效
+            "homography": np.round(
+                np.asarray(homography, np.float64) / homography[2][2], 9
+            ).tolist(),
+            "proj_shape": [int(v) for v in proj_shape],
+            "content_size": [int(v) for v in content_size],
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def inverse_maps(
+    homography: np.ndarray,
+    proj_shape: tuple[int, int],
+    proj_int: np.ndarray | None = None,
+    proj_dist=None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Content-space sampling position of every projector pixel (float32 maps).
+
+    With ``proj_int``/``proj_dist`` every physical projector pixel is first
+    undistorted to the ideal pinhole pixel the homography was solved for, so
+    the lens distortion of the projector is corrected in the same lookup.
+    """
+    height, width = proj_shape
+    vv, uu = np.mgrid[0:height, 0:width].astype(np.float64)
+    if proj_dist is not None and np.any(np.asarray(proj_dist)):
+        import cv2
+
+        k = np.asarray(proj_int, np.float64)
+        ideal = cv2.undistortPoints(
+            np.stack([uu.ravel(), vv.ravel()], axis=1).reshape(-1, 1, 2),
+            k,
+            np.asarray(proj_dist, np.float64),
+            P=k,
+        ).reshape(height, width, 2)
+        uu, vv = ideal[..., 0], ideal[..., 1]
+    h_inv = np.linalg.inv(np.asarray(homography, np.float64))
+    w = h_inv[2, 0] * uu + h_inv[2, 1] * vv + h_inv[2, 2]
+    map_x = (h_inv[0, 0] * uu + h_inv[0, 1] * vv + h_inv[0, 2]) / w
+    map_y = (h_inv[1, 0] * uu + h_inv[1, 1] * vv + h_inv[1, 2]) / w
+    return map_x.astype(np.float32), map_y.astype(np.float32)
+
+
+class PlanarPrewarp:
+    """Pre-warp content frames into projector frames for one projector.
+
+    The inverse lookup is computed once and stored as OpenCV fixed-point maps
+    (``CV_16SC2`` + interpolation table), the fastest input ``cv2.remap``
+    accepts; :meth:`warp` splits the output into row strips remapped on a
+    thread pool (OpenCV releases the GIL) into a preallocated frame. Frames
+    must have the ``content_size`` the maps were built for.
+    """
+
+    def __init__(
+        self,
+        homography: np.ndarray,
+        proj_shape: tuple[int, int],
+        content_size: tuple[int, int],
+        proj_int: np.ndarray | None = None,
+        proj_dist=None,
+        threads: int | None = None,
+        strips: int | None = None,
+        maps: tuple[np.ndarray, np.ndarray] | None = None,
+    ):
+        import cv2
+
+        self.homography = np.asarray(homography, np.float64)
+        self.proj_shape = (int(proj_shape[0]), int(proj_shape[1]))
+        self.content_size = (int(content_size[0]), int(content_size[1]))
+        self.threads = max(1, threads or os.cpu_count() or 1)
+        if maps is None:
+            map_x, map_y = inverse_maps(
+                self.homography, self.proj_shape, proj_int, proj_dist
+            )
+            maps = cv2.convertMaps(map_x, map_y, cv2.CV_16SC2)
+        self.map_xy, self.map_frac = maps
+        # 条带数取线程数的整数倍，负载更均衡
+        count = strips or (1 if self.threads == 1 else 4 * self.threads)
+        bounds = np.linspace(0, self.proj_shape[0], count + 1).astype(int)
+        self._strips = [(a, b) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+        self._pool = ThreadPoolExecutor(self.threads) if self.threads > 1 else None
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self) -> PlanarPrewarp:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def allocate(self, frame: np.ndarray) -> np.ndarray:
+        return np.empty(self.proj_shape + frame.shape[2:], frame.dtype)
+
+    def _check(self, frame: np.ndarray) -> None:
+        if (frame.shape[1], frame.shape[0]) != self.content_size:
+            raise ValueError(
+                f"frame is {frame.shape[1]}x{frame.shape[0]}, maps were built for "
+                f"{self.content_size[0]}x{self.content_size[1]}"
+            )
+
+    def warp(self, frame: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+        """Remap ``frame`` into ``out`` (allocated on first use); black outside."""
+        import cv2
+
+        self._check(frame)
+        if out is None:
+            out = self.allocate(frame)
+
+        def run(strip):
+            a, b = strip
+            cv2.remap(
+                frame,
+                self.map_xy[a:b],
+                self.map_frac[a:b],
+                cv2.INTER_LINEAR,
+                dst=out[a:b],
+                borderMode=cv2.BORDER_CONSTANT,
+            )
+
+        if self._pool is None:
+            for strip in self._strips:
+                run(strip)
+        else:
+            list(self._pool.map(run, self._strips))
+        return out
+
+    def warp_perspective(
+        self, frame: np.ndarray, out: np.ndarray | None = None
+    ) -> np.ndarray:
+        """``cv2.warpPerspective`` per row strip (no lens distortion correction).
+
+        Each strip uses the homography shifted by its first row, so the strips
+        tile the full frame exactly. Kept for comparison with :meth:`warp`.
+        """
+        import cv2
+
+        self._check(frame)
+        if out is None:
+            out = self.allocate(frame)
+        width = self.proj_shape[1]
+
+        def run(strip):
+            a, b = strip
+            shift = np.array([[1.0, 0.0, 0.0], [0.0, 1.0, -a], [0.0, 0.0, 1.0]])
+            cv2.warpPerspective(
+                frame,
+                shift @ self.homography,
+                (width, b - a),
+                dst=out[a:b],
+                flags=cv2.INTER_LINEAR,
+                borderMode=cv2.BORDER_CONSTANT,
+            )
+
+        if self._pool is None:
+            for strip in self._strips:
+                run(strip)
+        else:
+            list(self._pool.map(run, self._strips))
+        return out
+
+    def save(self, path: str | Path, key: str = "", meta: dict | None = None) -> Path:
+        """Store the fixed-point maps (``.warp`` array container)."""
+        header = {
+            "key": key,
+            "homography": self.homography.tolist(),
+            "proj_shape": list(self.proj_shape),
+            "content_size": list(self.content_size),
+            **(meta or {}),
+        }
+        return write_container(
+            path,
+            PREWARP_KIND,
+            {"map_xy": self.map_xy, "map_frac": self.map_frac},
+            header,
+        )
+
+    @classmethod
+    def load(
+        cls, path: str | Path, key: str | None = None, threads: int | None = None
+    ) -> PlanarPrewarp | None:
+        """Engine from a ``.warp`` file, or ``None`` if missing or ``key`` differs.
+
+        The maps are memory-mapped, so loading is O(1) and pages are shared
+        between processes projecting the same content.
+        """
+        path = Path(path)
+        if not path.exists():
+            return None
+        container = read_container(path, PREWARP_KIND, mmap_mode=True)
+        meta = container.meta
+        if key is not None and meta.get("key") != key:
+            return None
+        return cls(
+            np.asarray(meta["homography"]),
+            tuple(meta["proj_shape"]),
+            tuple(meta["content_size"]),
+            threads=threads,
+            maps=(container.arrays["map_xy"], container.arrays["map_frac"]),
+        )
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+
+# 输出单位：毫米（标定单位）-> 厘米/米
+UNIT_SCALE = {"MILLIMETER": 1.0, "CENTIMETER": 0.1, "METER": 0.001}
+
+
+@dataclass
+class ReconstructedCloud:
+    """Triangulated points of one decoded capture, in camera coordinates (mm).
+
+    ``pixels`` are the camera pixels ``(u, v)`` each point came from, ``gap_px``
+    is the distance between the camera and projector rays expressed in camera
+    pixels at the point's depth, and ``confidence`` lies in ``[0, 1]``.
+    """
+
+    points: np.ndarray
+    pixels: np.ndarray
+    intensity: np.ndarray
+    gap_px: np.ndarray
+    confidence: np.ndarray
+    normals: np.ndarray | None = None
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def select(self, mask: np.ndarray) -> ReconstructedCloud:
+        return ReconstructedCloud(
+            self.points[mask],
+            self.pixels[mask],
+            self.intensity[mask],
+            self.gap_px[mask],
+            self.confidence[mask],
+            None if self.normals is None else self.normals[mask],
+        )
+
+    @classmethod
+    def concatenate(cls, clouds: list[ReconstructedCloud]) -> ReconstructedCloud:
+        with_normals = all(c.normals is not None for c in clouds)
+        return cls(
+            np.concatenate([c.points for c in clouds]),
+            np.concatenate([c.pixels for c in clouds]),
+            np.concatenate([c.intensity for c in clouds]),
+            np.concatenate([c.gap_px for c in clouds]),
+            np.concatenate([c.confidence for c in clouds]),
+            np.concatenate([c.normals for c in clouds]) if with_normals else None,
+        )
+
+
+def pixel_rays(points: np.ndarray, int_mat: np.ndarray, dist=None) -> np.ndarray:
+    """Normalized ray directions ``(x, y, 1)`` for pixel coordinates ``(N, 2)``.
+
+    Without distortion this is ``K^-1 [u v 1]^T`` in numpy; otherwise the pixels
+    are undistorted with ``cv2.undistortPoints`` (any OpenCV model length).
+    """
+    points = np.asarray(points, np.float64).reshape(-1, 2)
+    rays = np.ones((len(points), 3), np.float64)
+    if dist is None or not np.any(np.asarray(dist)):
+        k = np.asarray(int_mat, np.float64)
+        # 忽略斜切项：标定未估计 skew
+        rays[:, 0] = (points[:, 0] - k[0, 2]) / k[0, 0]
+        rays[:, 1] = (points[:, 1] - k[1, 2]) / k[1, 1]
+        return rays
+    # 有畸变时才需要 OpenCV（可选依赖）
+    import cv2
+
+    undistorted = cv2.undistortPoints(
+        points.reshape(-1, 1, 2),
+        np.asarray(int_mat, np.float64),
+        np.asarray(dist, np.float64),
+    )
+    rays[:, :2] = undistorted.reshape(-1, 2)
+    return rays
+
+
+def triangulate_rays(
+    cam_rays: np.ndarray,
+    proj_rays: np.ndarray,
+    rotation: np.ndarray,
+    translation: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Midpoint triangulation of camera rays against projector rays.
+
+    ``rotation``/``translation`` map camera to projector coordinates, so the
+    projector centre in camera coordinates is ``-R^T t`` and a projector ray
+    ``d`` points along ``R^T d``. Solves the closest points of every ray pair in
+    closed form. Returns ``(points, gap, ok)``: the midpoints (camera frame),
+    the distance between the rays, and a mask of pairs that intersect in front
+    of both devices and are not parallel.
+    """
+    rt = np.asarray(rotation, np.float64).T
+    centre = -(rt @ np.asarray(translation, np.float64).reshape(3))
+    d_c = np.asarray(cam_rays, np.float64)
+    d_p = np.asarray(proj_rays, np.float64) @ rt.T
+    # 最近点参数：s * d_c = centre + u * d_p（最小二乘）
+    a = np.einsum("ij,ij->i", d_c, d_c)
+    b = np.einsum("ij,ij->i", d_c, d_p)
+    c = np.einsum("ij,ij->i", d_p, d_p)
+    d = d_c @ centre
+    e = d_p @ centre
+    denom = a * c - b * b
+    ok = denom > 1e-12 * a * c
+    safe = np.where(ok, denom, 1.0)
+    s = (c * d - b * e) / safe
+    u = (b * d - a * e) / safe
+    on_cam = s[:, None] * d_c
+    on_proj = centre + u[:, None] * d_p
+    points = 0.5 * (on_cam + on_proj)
+    gap = np.linalg.norm(on_cam - on_proj, axis=1)
+    ok &= (s > 0) & (u > 0)
+    return points, gap, ok
+
+
+def reconstruct(
+    cam_pixels: np.ndarray,
+    proj_pixels: np.ndarray,
+    cam_int: np.ndarray,
+    cam_dist,
+    proj_int: np.ndarray,
+    proj_dist,
+    rotation: np.ndarray,
+    translation: np.ndarray,
+    contrast: np.ndarray | None = None,
+    intensity: np.ndarray | None = None,
+    contrast_ref: float = 128.0,
+    gap_sigma_px: float = 1.0,
+    cam_rays: np.ndarray | None = None,
+) -> ReconstructedCloud:
+    """Triangulate decoded correspondences ``cam_pixels <-> proj_pixels``.
+
+    ``confidence = min(1, contrast / contrast_ref) * exp(-(gap_px / sigma)^2 / 2)``
+    combines the white/black contrast of the camera pixel with the ray gap in
+    camera pixels. ``cam_rays`` may be passed to reuse undistorted camera rays
+    (they only depend on the pixel grid). Pairs that do not intersect in front
+    of both devices are dropped.
+    """
+    if cam_rays is None:
+        cam_rays = pixel_rays(cam_pixels, cam_int, cam_dist)
+    proj_rays = pixel_rays(proj_pixels, proj_int, proj_dist)
+    points, gap, ok = triangulate_rays(cam_rays, proj_rays, rotation, translation)
+    depth = np.where(ok, points[:, 2], 1.0)
+    ok &= depth > 0
+    focal = 0.5 * (float(cam_int[0][0]) + float(cam_int[1][1]))
+    gap_px = gap * focal / np.where(ok, depth, 1.0)
+    confidence = np.exp(-0.5 * (gap_px / gap_sigma_px) ** 2)
+    if contrast is not None:
+        contrast = np.asarray(contrast, np.float64).reshape(-1)
+        confidence *= np.clip(contrast / contrast_ref, 0.0, 1.0)
+    if intensity is None:
+        intensity = np.zeros(len(points), np.uint8)
+    cloud = ReconstructedCloud(
+        points.astype(np.float32),
+        np.asarray(cam_pixels).reshape(-1, 2).astype(np.float32),
+        np.asarray(intensity).reshape(-1),
+        gap_px.astype(np.float32),
+        confidence.astype(np.float32),
+    )
+    return cloud.select(ok)
+
+
+def grid_normals(
+    points: np.ndarray, pixels: np.ndarray, shape: tuple[int, int], step: int = 4
+) -> np.ndarray:
+    """Normals from the camera pixel grid, oriented towards the camera.
+
+    Points are scattered back into an ``(H, W, 3)`` grid; the normal of a pixel
+    is the cross product of its horizontal and vertical central differences
+    over ``step`` pixels (one-sided where a neighbour is missing), which damps
+    the quantisation of integer gray code coordinates. Pixels without any
+    usable neighbour pair get the direction back to the camera.
+    """
+    height, width = shape
+    u = pixels[:, 0].astype(np.int64)
+    v = pixels[:, 1].astype(np.int64)
+    grid = np.full((height, width, 3), np.nan, np.float32)
+    grid[v, u] = points
+
+    def diff(axis):
+        fwd = np.full_like(grid, np.nan)
+        bwd = np.full_like(grid, np.nan)
+        if axis == 1:
+            fwd[:, :-step] = grid[:, step:] - grid[:, :-step]
+            bwd[:, step:] = grid[:, step:] - grid[:, :-step]
+        else:
+            fwd[:-step] = grid[step:] - grid[:-step]
+            bwd[step:] = grid[step:] - grid[:-step]
+        central = 0.5 * (fwd + bwd)
+        return np.where(np.isnan(central), np.where(np.isnan(fwd), bwd, fwd), central)
+
+    normals = np.cross(diff(1)[v, u], diff(0)[v, u])
+    length = np.linalg.norm(normals, axis=1)
+    good = np.isfinite(length) & (length > 0)
+    view = -points / np.maximum(np.linalg.norm(points, axis=1, keepdims=True), 1e-12)
+    normals = np.where(
+        good[:, None], normals / np.where(good, length, 1.0)[:, None], view
+    )
+    # 朝向相机
+    flip = np.einsum("ij,ij->i", normals, view) < 0
+    normals[flip] *= -1
+    return normals.astype(np.float32)
+
+
+def to_y_up(points: np.ndarray, units: str = "CENTIMETER") -> np.ndarray:
+    """OpenCV camera frame (mm, Y down, Z forward) -> ``RIGHT_HANDED_Y_UP``.
+
+    Matches the ZED spatial-mapping exports: ``(x, -y, -z)`` scaled to ``units``.
+    """
+    scale = UNIT_SCALE[units]
+    out = np.asarray(points, np.float32) * np.float32(scale)
+    out[:, 1:] *= -1
+    return out
+
+
+def from_y_up(points: np.ndarray, units: str = "CENTIMETER") -> np.ndarray:
+    """Inverse of :func:`to_y_up`: back to the OpenCV frame in millimetres."""
+    out = np.asarray(points, np.float64) / UNIT_SCALE[units]
+    out[:, 1:] *= -1
+    return out
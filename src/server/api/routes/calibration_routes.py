@@ -2,8 +2,9 @@ from fastapi import APIRouter, Depends
 
 from ....common.registry import ModuleRegistry
 from ....modules.projector_calibration.config import ProjectorCalibrationSettings
+from ....modules.projector_calibration.module import ProjectorCalibrationModule
 from ..deps import get_registry
-from ..schemas.calibration import CalibrationRunRequest
+from ..schemas.calibration import CalibrationResultResponse, CalibrationRunRequest
 
 router = APIRouter(tags=["calibration"])
 
@@ -25,9 +26,25 @@ def run_calibration(
     return {"accepted": True}
 
 
-@router.get("/result")
+@router.get("/result", response_model=CalibrationResultResponse)
 def calibration_result(registry: ModuleRegistry = Depends(get_registry)):
-    """返回最新标定结果（占位）"""
-    # TODO: 解析标定输出文件，当前返回占位信息
+    """返回最新标定结果：读取二进制标定包（不解析 XML，文件未变化时直接复用缓存）"""
     mod = registry.get("projector_calibration")
-    return {"module": "projector_calibration", "running": mod.status() if mod else None}
+    if mod is None or not isinstance(mod, ProjectorCalibrationModule):
+        return CalibrationResultResponse(
+            error_code="MODULE_NOT_REGISTERED", error="Module not registered"
+        )
+    running = mod.status()
+    try:
+        bundle = mod.latest_result()
+    except (OSError, ValueError, KeyError) as e:
+        return CalibrationResultResponse(
+            running=running, error_code="BAD_RESULT_BUNDLE", error=str(e)
+        )
+    if bundle is None:
+        return CalibrationResultResponse(
+            running=running, error_code="NO_RESULT", error="No calibration result yet"
+        )
+    return CalibrationResultResponse(
+        running=running, available=True, result=bundle.summary()
+    )
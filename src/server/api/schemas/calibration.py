@@ -1,3 +1,7 @@
+from __future__ import annotations
+
+from typing import Any, Optional
+
 from pydantic import BaseModel
 
 
@@ -7,3 +11,43 @@ class CalibrationRunRequest(BaseModel):
     proj_height: int
     proj_width: int
     rounds: int = 1
+
+
+class ProjectorResult(BaseModel):
+    """单台投影仪标定结果（外参为相机->投影仪；unreal_* 为虚幻引擎坐标系下的位置/欧拉角）"""
+
+    id: int
+    proj_shape: list[int]
+    rms: float
+    successful_captures: int
+    distortion_model: str = ""
+    proj_int: list[list[float]]
+    proj_dist: list[float]
+    rotation: list[list[float]]
+    translation: list[float]
+    unreal_location: list[float]
+    unreal_rotation: list[float]
+
+
+class CalibrationResult(BaseModel):
+    """标定结果（来自二进制标定包）"""
+
+    version: int
+    img_shape: list[int]
+    rms: float
+    successful_captures: int
+    cam_int: list[list[float]]
+    cam_dist: list[float]
+    projectors: list[ProjectorResult]
+    provenance: dict[str, Any] = {}
+
+
+class CalibrationResultResponse(BaseModel):
+    """标定结果响应"""
+
+    module: str = "projector_calibration"
+    running: Optional[dict] = None
+    available: bool = False
+    result: Optional[CalibrationResult] = None
+    error_code: Optional[str] = None
+    error: Optional[str] = None
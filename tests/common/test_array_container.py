@@ -0,0 +1,54 @@
+# [Test] 单元测试文件：二进制数组容器（使用完可删除）
+import numpy as np
+import pytest
+
+from src.common.array_container import (
+    ALIGNMENT,
+    read_container,
+    read_container_meta,
+    write_container,
+)
+
+
+def test_round_trip_keeps_dtype_shape_and_meta(tmp_path):
+    path = tmp_path / "data.bin"
+    arrays = {
+        "a": np.arange(12, dtype=np.float64).reshape(3, 4),
+        "b": np.arange(5, dtype=">i4"),
+        "empty": np.zeros((0, 3), np.float32),
+        "flag": np.array([True, False]),
+    }
+    write_container(path, "demo", arrays, {"name": "x", "n": 3})
+    container = read_container(path, kind="demo")
+    assert container.meta == {"name": "x", "n": 3}
+    assert container["a"].dtype == np.float64
+    assert np.array_equal(container["a"], arrays["a"])
+    # 大端输入统一写为小端
+    assert container["b"].dtype == np.dtype("<i4")
+    assert np.array_equal(container["b"], np.arange(5))
+    assert container["empty"].shape == (0, 3)
+    assert container["flag"].tolist() == [True, False]
+    assert read_container_meta(path) == ("demo", {"name": "x", "n": 3})
+
+
+def test_arrays_are_aligned_and_mmap_matches(tmp_path):
+    path = tmp_path / "data.bin"
+    write_container(path, "demo", {"x": np.arange(3, dtype=np.uint8), "y": np.ones(7)})
+    loaded = read_container(path)
+    mapped = read_container(path, mmap_mode=True)
+    for name in ("x", "y"):
+        # 内存映射从页边界开始，数组起点按 ALIGNMENT 对齐
+        assert mapped[name].ctypes.data % ALIGNMENT == 0
+        assert np.array_equal(loaded[name], mapped[name])
+    assert not mapped["y"].flags.writeable
+
+
+def test_kind_and_magic_are_checked(tmp_path):
+    path = tmp_path / "data.bin"
+    write_container(path, "demo", {})
+    with pytest.raises(ValueError):
+        read_container(path, kind="other")
+    bad = tmp_path / "bad.bin"
+    bad.write_bytes(b"not a container at all")
+    with pytest.raises(ValueError):
+        read_container(bad)
@@ -0,0 +1,46 @@
+# [Test] 单元测试文件：点云 OBJ 与附加文件读写（使用完可删除）
+import numpy as np
+
+from src.modules.pre_scanned_point_cloud.services.point_cloud_io import (
+    CLOUD_SUFFIX,
+    load_point_cloud,
+    save_point_cloud,
+    write_obj_point_cloud,
+)
+
+
+def test_obj_layout_matches_spatial_mapping_exports(tmp_path):
+    points = np.array([[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]])
+    normals = np.array([[0.0, 0.0, 1.0], [0.0, 1.0, 0.0]])
+    path = write_obj_point_cloud(
+        tmp_path / "pc.obj", points, np.array([255, 0], np.uint8), normals
+    )
+    lines = path.read_text().splitlines()
+    assert lines[0].startswith("#")
+    assert lines[1] == "v 1.000000 2.000000 3.000000 1.000000 1.000000 1.000000 "
+    assert lines[2] == "v 4.000000 5.000000 6.000000 0.000000 0.000000 0.000000 "
+    assert lines[3:] == [
+        "vn 0.000000 0.000000 1.000000",
+        "vn 0.000000 1.000000 0.000000",
+    ]
+
+
+def test_sidecar_keeps_confidence_in_obj_order(tmp_path):
+    rng = np.random.default_rng(0)
+    points = rng.normal(size=(70000, 3)).astype(np.float32)
+    confidence = rng.random(70000).astype(np.float32)
+    obj, sidecar = save_point_cloud(
+        tmp_path / "pc.obj",
+        points,
+        confidence=confidence,
+        meta={"units": "CENTIMETER"},
+        pixels=np.zeros((70000, 2), np.float32),
+    )
+    assert sidecar.suffix == CLOUD_SUFFIX
+    # 跨越分批格式化的边界后行数仍一致
+    assert sum(1 for line in open(obj) if line.startswith("v ")) == 70000
+    cloud = load_point_cloud(obj)
+    assert cloud.meta["count"] == 70000 and cloud.meta["units"] == "CENTIMETER"
+    assert np.array_equal(cloud["confidence"], confidence)
+    assert np.array_equal(cloud["points"], points)
+    assert cloud["pixels"].shape == (70000, 2)
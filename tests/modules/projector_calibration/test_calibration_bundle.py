@@ -0,0 +1,97 @@
+# [Test] 单元测试文件：二进制标定包（使用完可删除）
+import os
+
+import numpy as np
+
+from src.modules.projector_calibration.services.calibration_bundle import (
+    CalibrationBundle,
+    ProjectorCalibration,
+    bundle_path_for,
+    load_bundle,
+    opencv_to_unreal_transform,
+)
+
+_XML = """<?xml version="1.0"?>
+<opencv_storage>
+<img_shape type_id="opencv-matrix"><rows>2</rows><cols>1</cols><dt>i</dt>
+  <data>720 1280</data></img_shape>
+<rms>1.5</rms>
+<cam_int type_id="opencv-matrix"><rows>3</rows><cols>3</cols><dt>d</dt>
+  <data>1000. 0. 640. 0. 1000. 360. 0. 0. 1.</data></cam_int>
+<cam_dist type_id="opencv-matrix"><rows>5</rows><cols>1</cols><dt>d</dt>
+  <data>0.1 0. 0. 0. 0.</data></cam_dist>
+<proj_int type_id="opencv-matrix"><rows>3</rows><cols>3</cols><dt>d</dt>
+  <data>2000. 0. 960. 0. 2000. 540. 0. 0. 1.</data></proj_int>
+<proj_dist type_id="opencv-matrix"><rows>1</rows><cols>5</cols><dt>d</dt>
+  <data>0.01 0.02 0. 0. 0.03</data></proj_dist>
+<rotation type_id="opencv-matrix"><rows>3</rows><cols>3</cols><dt>d</dt>
+  <data>1. 0. 0. 0. 1. 0. 0. 0. 1.</data></rotation>
+<translation type_id="opencv-matrix"><rows>3</rows><cols>1</cols><dt>d</dt>
+  <data>-200. 10. 30.</data></translation>
+<successful_captures>4</successful_captures>
+</opencv_storage>
+"""
+
+
+def _projector(pid, dist_len=5):
+    return ProjectorCalibration(
+        id=pid,
+        proj_shape=(1080, 1920),
+        rms=0.5 + pid,
+        proj_int=np.eye(3) * (pid + 1),
+        proj_dist=np.arange(dist_len, dtype=float).reshape(1, -1),
+        rotation=np.eye(3),
+        translation=np.array([[100.0 * pid], [0.0], [500.0]]),
+        successful_captures=3,
+    )
+
+
+def test_unreal_transform_is_precomputed():
+    proj = _projector(1)
+    # OpenCV (x, y, z) mm -> Unreal (z, x, -y) cm
+    assert np.allclose(proj.unreal_translation, [50.0, 10.0, 0.0])
+    assert np.allclose(proj.unreal_euler, 0.0)
+    rot, _ = opencv_to_unreal_transform(np.eye(3), np.zeros(3))
+    assert np.allclose(rot, np.eye(3))
+
+
+def test_round_trip_with_mixed_distortion_lengths(tmp_path):
+    bundle = CalibrationBundle(
+        img_shape=(720, 1280),
+        rms=1.5,
+        cam_int=np.eye(3),
+        cam_dist=np.zeros((5, 1)),
+        successful_captures=4,
+        projectors=[_projector(0, 5), _projector(2, 14)],
+        provenance={"inputs_sha256": "abc"},
+    )
+    loaded = CalibrationBundle.load(bundle.save(tmp_path / "r.calib"))
+    assert loaded.img_shape == (720, 1280)
+    assert loaded.provenance == {"inputs_sha256": "abc"}
+    assert [p.id for p in loaded.projectors] == [0, 2]
+    assert loaded.projectors[1].proj_dist.shape == (1, 14)
+    for a, b in zip(bundle.projectors, loaded.projectors):
+        assert np.array_equal(a.proj_int, b.proj_int)
+        assert np.array_equal(a.translation, b.translation)
+        assert np.allclose(a.unreal_translation, b.unreal_translation)
+    assert loaded.summary()["projectors"][1]["unreal_location"][0] == 50.0
+
+
+def test_xml_import_and_cached_loader(tmp_path):
+    xml = tmp_path / "calibration_result_optimized.xml"
+    xml.write_text(_XML, encoding="utf-8")
+    bundle = CalibrationBundle.from_opencv_xml(xml)
+    assert bundle.img_shape == (720, 1280)
+    assert bundle.projectors[0].proj_shape == (0, 0)
+    assert np.allclose(bundle.projectors[0].unreal_translation, [3.0, -20.0, -1.0])
+    assert len(bundle.provenance["source_xml_sha256"]) == 64
+
+    path = bundle.save(bundle_path_for(xml))
+    assert path.suffix == ".calib"
+    first = load_bundle(path)
+    assert load_bundle(path) is first
+    # 文件被替换后（mtime 变化）重新加载
+    bundle.rms = 0.25
+    bundle.save(path)
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1_000_000))
+    assert load_bundle(path).rms == 0.25
@@ -0,0 +1,82 @@
+# [Test] 单元测试文件：标定历史库与漂移检测（使用完可删除）
+import math
+import sqlite3
+
+import numpy as np
+import pytest
+
+from src.modules.projector_calibration.services.calibration_bundle import (
+    CalibrationBundle,
+    ProjectorCalibration,
+)
+from src.modules.projector_calibration.services.calibration_history import (
+    CalibrationHistory,
+    DriftThresholds,
+)
+
+
+def _bundle(fx=2000.0, tx=-200.0, yaw_deg=0.0, rms=0.8, projector_ids=(0,)):
+    a = math.radians(yaw_deg)
+    rot = np.array(
+        [[math.cos(a), 0, math.sin(a)], [0, 1, 0], [-math.sin(a), 0, math.cos(a)]]
+    )
+    projectors = [
+        ProjectorCalibration(
+            id=pid,
+            proj_shape=(1080, 1920),
+            rms=rms,
+            proj_int=np.array([[fx, 0, 960], [0, fx, 540], [0, 0, 1]], float),
+            proj_dist=np.zeros((1, 5)),
+            rotation=rot,
+            translation=np.array([[tx], [0.0], [0.0]]),
+            successful_captures=4,
+        )
+        for pid in projector_ids
+    ]
+    return CalibrationBundle(
+        img_shape=(720, 1280),
+        rms=rms,
+        cam_int=np.eye(3),
+        cam_dist=np.zeros((5, 1)),
+        successful_captures=4,
+        projectors=projectors,
+        provenance={"decode_mode": "standard"},
+    )
+
+
+def test_record_and_compare(tmp_path):
+    with CalibrationHistory(tmp_path / "h.db") as history:
+        base = history.record(_bundle(), duration_s=12.5)
+        run = history.record(_bundle(fx=2010.0, tx=-203.0, yaw_deg=0.5, rms=1.0))
+        assert [r["run_id"] for r in history.runs()] == [run, base]
+        assert history.runs()[1]["duration_s"] == 12.5
+        (delta,) = history.compare(base, run)
+    assert delta.fx_pct == pytest.approx(0.5)
+    assert delta.translation_mm == pytest.approx(3.0)
+    assert delta.rotation_deg == pytest.approx(0.5)
+    assert delta.rms == pytest.approx(0.2)
+    assert delta.flags == ["translation", "rotation"]
+
+
+def test_drift_against_baseline_over_many_runs(tmp_path):
+    with CalibrationHistory(tmp_path / "h.db") as history:
+        for i in range(50):
+            history.record(_bundle(tx=-200.0 - 0.1 * i, projector_ids=(0, 1)))
+        deltas = history.drift(thresholds=DriftThresholds(translation_mm=2.0))
+        assert len(deltas) == 49 * 2
+        drifted = sorted({d.run_id for d in deltas if d.drifted})
+        # 第 i 次（run_id = i+1）平移 0.1*i mm，超过 2 mm 从 i=21 开始
+        assert drifted == list(range(22, 51))
+        assert len(history.drift(since_run=45)) == 6 * 2
+        assert len(history.projector_series(1)) == 50
+
+
+def test_history_is_append_only(tmp_path):
+    with CalibrationHistory(tmp_path / "h.db") as history:
+        history.record(_bundle())
+    conn = sqlite3.connect(str(tmp_path / "h.db"))
+    with pytest.raises(sqlite3.DatabaseError):
+        conn.execute("DELETE FROM runs")
+    with pytest.raises(sqlite3.DatabaseError):
+        conn.execute("UPDATE projector_runs SET rms = 0")
+    conn.close()
@@ -0,0 +1,80 @@
+# [Test] 单元测试文件：采集质量门控（使用完可删除）
+import numpy as np
+import pytest
+
+from src.modules.projector_calibration.services.capture_quality import (
+    CaptureQualityGate,
+)
+
+
+def _frames(height=120, width=160):
+    white = np.full((height, width), 200, np.uint8)
+    black = np.full((height, width), 20, np.uint8)
+    cols = np.arange(width)[None, :].repeat(height, axis=0)
+    stripe = np.where((cols // 8) % 2 == 0, 200, 20).astype(np.uint8)
+    inverse = (220 - stripe).astype(np.uint8)
+    return white, black, stripe, inverse
+
+
+def _gate_with_reference():
+    white, black, stripe, inverse = _frames()
+    gate = CaptureQualityGate(pattern_count=6, step=2)
+    assert gate.check(gate.white_index, white).ok
+    assert gate.check(gate.black_index, black).ok
+    return gate, stripe, inverse
+
+
+def test_capture_order_starts_with_references():
+    gate = CaptureQualityGate(pattern_count=6)
+    assert gate.capture_order() == [4, 5, 0, 1, 2, 3]
+
+
+def test_good_pair_passes():
+    gate, stripe, inverse = _gate_with_reference()
+    assert gate.check(0, stripe, stripe).ok
+    assert gate.check(1, inverse, inverse).ok
+
+
+def test_low_contrast_is_rejected():
+    white, black, _, _ = _frames()
+    gate = CaptureQualityGate(pattern_count=6, black_thr=40)
+    gate.check(gate.white_index, black + 10)
+    result = gate.check(gate.black_index, black)
+    assert not result.ok
+    assert "low contrast" in result.reasons[0]
+
+
+def test_blurred_stripes_are_rejected():
+    gate, _, _ = _gate_with_reference()
+    grey = np.full((120, 160), 110, np.uint8)
+    result = gate.check(0, grey)
+    assert not result.ok
+    assert result.stripe_ratio == pytest.approx(0.0)
+
+
+def test_stale_inverse_frame_is_rejected():
+    gate, stripe, _ = _gate_with_reference()
+    assert gate.check(0, stripe).ok
+    result = gate.check(1, stripe)
+    assert not result.ok
+    assert "inverse pair" in result.reasons[0]
+
+
+def test_motion_between_grabs_is_rejected():
+    gate, stripe, _ = _gate_with_reference()
+    result = gate.check(0, stripe, np.roll(stripe, 4, axis=1))
+    assert not result.ok
+    assert result.motion > gate.max_motion
+
+
+def test_unpaired_set_only_checks_stripe_frames():
+    white, black, stripe, _ = _frames()
+    gate = CaptureQualityGate(
+        pattern_count=6, step=2, stripe_frames=[0, 1], paired=False
+    )
+    gate.check(gate.white_index, white)
+    gate.check(gate.black_index, black)
+    assert gate.check(0, stripe).ok
+    # 非反相对：连续两帧相同也不视为不一致；相移帧（中灰）不做条纹检查
+    assert gate.check(1, stripe).ok
+    assert gate.check(2, np.full_like(stripe, 110)).ok
@@ -0,0 +1,98 @@
+# [Test] 单元测试文件：畸变模型交叉验证选择（使用完可删除）
+import math
+
+import numpy as np
+import pytest
+
+from src.modules.projector_calibration.services.calibration_bundle import (
+    CalibrationBundle,
+    ProjectorCalibration,
+)
+from src.modules.projector_calibration.services.distortion_models import (
+    DISTORTION_MODELS,
+    MODEL_NAMES,
+    cv_score,
+    get_model,
+    kfold_splits,
+    select_model,
+    trim_coefficients,
+)
+
+
+def test_models_are_ordered_by_cost():
+    params = [m.params for m in DISTORTION_MODELS]
+    assert params == sorted(params)
+    assert MODEL_NAMES[-1] == "full"
+    assert get_model("full").coeffs == 14
+    with pytest.raises(ValueError):
+        get_model("fisheye")
+
+
+def test_kfold_splits_cover_every_view_once():
+    splits = kfold_splits(7, 3)
+    assert len(splits) == 3
+    tested = sorted(i for _, test in splits for i in test)
+    assert tested == list(range(7))
+    for train, test in splits:
+        assert not set(train) & set(test)
+        assert sorted(train + test) == list(range(7))
+    # 视图少于折数时退化为留一法
+    assert [test for _, test in kfold_splits(3, 5)] == [[0], [1], [2]]
+    with pytest.raises(ValueError):
+        kfold_splits(1)
+
+
+def test_cv_score_pools_folds_and_rejects_failures():
+    assert math.isclose(cv_score([(4.0, 2), (0.0, 2)]), 1.0)
+    assert cv_score([(4.0, 2), None]) is None
+    assert cv_score([]) is None
+
+
+def test_select_cheapest_model_within_tolerance():
+    scores = {
+        "radial2": 0.52,
+        "standard": 0.505,
+        "rational": 0.49,
+        "full": 0.50,
+    }
+    selection = select_model(scores, tolerance=0.05, folds=5)
+    # 0.505 <= 0.49 * 1.05，而 radial2 超出容差
+    assert selection.chosen == "standard"
+    assert selection.to_dict()["scores"] == scores
+    assert select_model(scores, tolerance=0.0).chosen == "rational"
+    assert select_model({"full": 0.4, "radial2": None}).chosen == "full"
+    with pytest.raises(ValueError):
+        select_model({"full": None})
+
+
+def test_trim_coefficients_drops_padding():
+    padded = np.r_[0.1, 0.2, 0.0, 0.0, 0.0, np.zeros(9)].reshape(-1, 1)
+    trimmed = trim_coefficients(padded, get_model("radial2"))
+    assert trimmed.shape == (1, 4)
+    assert np.allclose(trimmed, [[0.1, 0.2, 0.0, 0.0]])
+
+
+def test_bundle_keeps_distortion_model(tmp_path):
+    bundle = CalibrationBundle(
+        img_shape=(720, 1280),
+        rms=0.4,
+        cam_int=np.eye(3),
+        cam_dist=np.zeros((5, 1)),
+        successful_captures=4,
+        projectors=[
+            ProjectorCalibration(
+                0,
+                (1080, 1920),
+                0.4,
+                np.eye(3),
+                np.zeros((1, 4)),
+                np.eye(3),
+                np.zeros((3, 1)),
+                4,
+                "radial2",
+            )
+        ],
+    )
+    loaded = CalibrationBundle.load(bundle.save(tmp_path / "r.calib"))
+    assert loaded.projectors[0].distortion_model == "radial2"
+    assert loaded.summary()["projectors"][0]["distortion_model"] == "radial2"
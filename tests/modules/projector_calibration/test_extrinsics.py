@@ -0,0 +1,44 @@
+# [Test] 单元测试文件：外参组合与位姿平均（使用完可删除）
+import numpy as np
+import pytest
+
+from src.modules.projector_calibration.services.extrinsics import (
+    mean_pose,
+    project_to_rotation,
+    relative_pose,
+    rotation_angle_deg,
+)
+
+
+def _rot(axis, deg):
+    a = np.radians(deg)
+    c, s = np.cos(a), np.sin(a)
+    if axis == "y":
+        return np.array([[c, 0, s], [0, 1, 0], [-s, 0, c]])
+    return np.array([[c, -s, 0], [s, c, 0], [0, 0, 1]])
+
+
+def test_relative_pose_maps_camera_points_to_projector():
+    r_cp, t_cp = _rot("y", 8), np.array([[-200.0], [10.0], [30.0]])
+    r_cb, t_cb = _rot("z", 20), np.array([[50.0], [-20.0], [900.0]])
+    # 投影仪看到的标定板位姿 = 相机->投影仪 ∘ 相机看到的标定板位姿
+    r_pb, t_pb = r_cp @ r_cb, r_cp @ t_cb + t_cp
+    rotation, translation = relative_pose(r_cb, t_cb, r_pb, t_pb)
+    assert np.allclose(rotation, r_cp)
+    assert np.allclose(translation, t_cp)
+
+
+def test_mean_pose_averages_noisy_rounds():
+    rotations = [_rot("y", 10 + d) for d in (-0.2, 0.0, 0.2)]
+    translations = [np.array([1.0, 2.0, 3.0]) + d for d in (-0.5, 0.0, 0.5)]
+    rotation, translation = mean_pose(rotations, translations)
+    assert rotation_angle_deg(rotation, _rot("y", 10)) == pytest.approx(0.0, abs=1e-6)
+    assert np.allclose(translation.ravel(), [1.0, 2.0, 3.0])
+    assert np.isclose(np.linalg.det(rotation), 1.0)
+
+
+def test_project_to_rotation_and_angle():
+    noisy = _rot("z", 30) + 1e-3 * np.arange(9).reshape(3, 3)
+    rotation = project_to_rotation(noisy)
+    assert np.allclose(rotation @ rotation.T, np.eye(3))
+    assert rotation_angle_deg(np.eye(3), _rot("z", 30)) == pytest.approx(30.0)
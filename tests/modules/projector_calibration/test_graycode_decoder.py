@@ -0,0 +1,90 @@
+# [Test] 单元测试文件：分块格雷码解码器（使用完可删除）
+import numpy as np
+
+from src.modules.projector_calibration.services.graycode_decoder import (
+    TiledGrayCodeDecoder,
+    graycode_bit_counts,
+)
+
+
+def _capture(gc_width, gc_height, scale=2):
+    """Render OpenCV-ordered gray code frames as seen by an ideal camera."""
+    col_bits, row_bits = graycode_bit_counts(gc_width, gc_height)
+    cam_h, cam_w = gc_height * scale, gc_width * scale
+    px = np.arange(cam_w)[None, :].repeat(cam_h, axis=0) // scale
+    py = np.arange(cam_h)[:, None].repeat(cam_w, axis=1) // scale
+    frames = []
+    for bits, coord in ((col_bits, px), (row_bits, py)):
+        gray = coord ^ (coord >> 1)
+        for i in range(bits):
+            on = (gray >> (bits - 1 - i)) & 1
+            frames.append(np.where(on, 220, 30).astype(np.uint8))
+            frames.append(np.where(on, 30, 220).astype(np.uint8))
+    white = np.full((cam_h, cam_w), 230, np.uint8)
+    black = np.full((cam_h, cam_w), 20, np.uint8)
+    # 左侧阴影区域：白/黑对比度不足
+    white[:, :4] = 40
+    frames += [white, black]
+    return frames, px, py
+
+
+def test_dense_decode_matches_ground_truth():
+    frames, px, py = _capture(50, 30)
+    decoder = TiledGrayCodeDecoder(50, 30)
+    assert decoder.pattern_count == len(frames)
+    maps = decoder.decode(frames)
+    assert not maps.valid[:, :4].any()
+    assert maps.valid[:, 4:].all()
+    assert np.array_equal(maps.x[:, 4:], px[:, 4:])
+    assert np.array_equal(maps.y[:, 4:], py[:, 4:])
+
+
+def test_tiling_does_not_change_result():
+    frames, _, _ = _capture(40, 24)
+    # 破坏一个像素，使其邻域一致性检查在分块边界附近生效
+    frames[4][17, 30] = 255 - frames[4][17, 30]
+    frames[5][17, 30] = 255 - frames[5][17, 30]
+    whole = TiledGrayCodeDecoder(40, 24, memory_budget_mb=64).decode(frames)
+    tiled = TiledGrayCodeDecoder(40, 24, memory_budget_mb=0.001).decode(frames)
+    assert np.array_equal(whole.valid, tiled.valid)
+    assert np.array_equal(whole.x[whole.valid], tiled.x[tiled.valid])
+    assert not whole.valid[16:19, 29:32].any()
+
+
+def test_roi_decode_keeps_origin():
+    frames, px, py = _capture(40, 24)
+    maps = TiledGrayCodeDecoder(40, 24).decode(frames, roi=(10, 8, 30, 20))
+    assert maps.origin == (10, 8)
+    assert maps.valid.shape == (12, 20)
+    assert np.array_equal(maps.x, px[8:20, 10:30])
+    assert np.array_equal(maps.y, py[8:20, 10:30])
+
+
+def test_tile_height_follows_budget():
+    decoder = TiledGrayCodeDecoder(1920, 1080, memory_budget_mb=64)
+    assert decoder.tile_rows(4000) < decoder.tile_rows(2000)
+    assert TiledGrayCodeDecoder(1920, 1080, memory_budget_mb=0).tile_rows(4000) == 1
+
+
+def test_complementary_mode_keeps_dark_surface():
+    frames, px, _ = _capture(40, 24)
+    # 暗表面：整体反射率降为 1/8，白/黑对比度低于全局 black_thr
+    dark = [(f // 8).astype(np.uint8) for f in frames]
+    standard = TiledGrayCodeDecoder(40, 24, black_thr=40).decode(dark)
+    complementary = TiledGrayCodeDecoder(
+        40, 24, black_thr=40, mode="complementary"
+    ).decode(dark)
+    assert not standard.valid.any()
+    assert complementary.valid[:, 4:].all()
+    assert np.array_equal(complementary.x[:, 4:], px[:, 4:])
+
+
+def test_complementary_mode_rejects_ambiguous_bits():
+    frames, _, _ = _capture(40, 24)
+    # 模糊到接近中灰的位平面：全局 white_thr 仍接受，相对阈值拒绝
+    frames[10][:, 20:] = np.where(frames[10][:, 20:] > 128, 130, 120)
+    frames[11][:, 20:] = np.where(frames[11][:, 20:] > 128, 130, 120)
+    standard = TiledGrayCodeDecoder(40, 24).decode(frames)
+    complementary = TiledGrayCodeDecoder(40, 24, mode="complementary").decode(frames)
+    assert standard.valid[:, 24:].all()
+    assert not complementary.valid[:, 20:].any()
@@ -0,0 +1,119 @@
+# [Test] 单元测试文件：平面梯形校正与预变形映射（使用完可删除）
+import numpy as np
+import pytest
+
+from src.modules.projector_calibration.services.keystone import (
+    Plane,
+    fit_plane,
+    homography_from_points,
+    largest_rectangle,
+    solve_keystone,
+)
+from src.modules.projector_calibration.services.prewarp import (
+    inverse_maps,
+    prewarp_key,
+)
+from src.modules.projector_calibration.services.reconstruction import (
+    from_y_up,
+    to_y_up,
+)
+
+K_PROJ = np.array([[1100.0, 0, 400.0], [0, 1100.0, 300.0], [0, 0, 1]])
+ANGLE = np.radians(20)
+# 相机 -> 投影仪：投影仪绕 Y 轴偏转 20°，斜射墙面
+R = np.array(
+    [
+        [np.cos(ANGLE), 0, np.sin(ANGLE)],
+        [0, 1, 0],
+        [-np.sin(ANGLE), 0, np.cos(ANGLE)],
+    ]
+)
+T = np.array([-200.0, 10.0, 30.0])
+WALL = Plane(np.array([0.0, 0.0, -1.0]), -1500.0)  # z = 1500mm
+
+
+def test_fit_plane_ignores_outliers():
+    rng = np.random.default_rng(1)
+    xy = rng.uniform(-500, 500, (2000, 2))
+    points = np.c_[xy, 1200.0 + 0.2 * xy[:, 0] + rng.normal(0, 0.5, 2000)]
+    points[:200] += rng.uniform(-300, 300, (200, 3))
+    plane, inliers = fit_plane(points, threshold=3.0)
+    expected = np.array([-0.2, 0.0, 1.0]) / np.linalg.norm([-0.2, 0.0, 1.0])
+    assert abs(abs(plane.normal @ expected) - 1.0) < 1e-4
+    assert inliers[200:].mean() > 0.99
+    assert inliers[:200].mean() < 0.1
+
+
+def test_largest_rectangle_in_square_and_trapezoid():
+    square = np.array([[0, 0], [4, 0], [4, 4], [0, 4]], float)
+    cx, cy, w, h = largest_rectangle(square, 2.0)
+    assert (cx, w, h) == pytest.approx((2.0, 4.0, 2.0))
+    # 上窄下宽的梯形：最大矩形必须落在四条边内
+    trapezoid = np.array([[-3, 0], [3, 0], [1, 4], [-1, 4]], float)
+    cx, cy, w, h = largest_rectangle(trapezoid, 1.0)
+    assert cx == pytest.approx(0.0, abs=1e-9)
+    assert w == pytest.approx(h)
+    # 上角点恰好在斜边上：|x| = 3 - y / 2
+    assert w / 2 == pytest.approx(3 - (cy + h / 2) / 2)
+
+
+def test_homography_from_points_round_trip():
+    h_true = np.array([[1.2, 0.1, 30.0], [-0.05, 0.9, 12.0], [1e-4, 2e-4, 1.0]])
+    src = np.array([[0, 0], [640, 0], [640, 480], [0, 480], [320, 200]], float)
+    dst = np.c_[src, np.ones(len(src))] @ h_true.T
+    dst = dst[:, :2] / dst[:, 2:]
+    assert np.allclose(homography_from_points(src, dst), h_true, atol=1e-8)
+
+
+def _ray_to_wall(pixels):
+    # 投影仪像素 -> 相机坐标系下与墙面的交点
+    rays = np.c_[(pixels - [400.0, 300.0]) / 1100.0, np.ones(len(pixels))] @ R
+    centre = -(R.T @ T)
+    s = (1500.0 - centre[2]) / rays[:, 2]
+    return centre + s[:, None] * rays
+
+
+def test_solve_keystone_places_undistorted_rectangle():
+    solution = solve_keystone(K_PROJ, R, T, (600, 800), WALL, (1920, 1080))
+    w, h = solution.size_mm
+    assert w / h == pytest.approx(1920 / 1080)
+    content = np.array([[0, 0], [1920, 0], [1920, 1080], [0, 1080], [960, 540]], float)
+    proj = np.c_[content, np.ones(len(content))] @ solution.homography.T
+    proj = proj[:, :2] / proj[:, 2:]
+    # 内容角点都在投影仪画面内，且至少两个角点贴边（最大化）
+    assert np.all(proj >= -1e-6) and np.all(proj <= [799 + 1e-6, 599 + 1e-6])
+    on_wall = _ray_to_wall(proj)
+    assert np.allclose(on_wall[:4], solution.corners, atol=1e-6)
+    # 墙面上为矩形：边长比例正确、相邻边垂直、中心对应内容中心
+    top = on_wall[1] - on_wall[0]
+    left = on_wall[3] - on_wall[0]
+    assert np.linalg.norm(top) == pytest.approx(w)
+    assert np.linalg.norm(left) == pytest.approx(h)
+    assert abs(top @ left) < 1e-6 * w * h
+    assert np.allclose(on_wall[4], on_wall[:4].mean(axis=0), atol=1e-6)
+
+
+def test_inverse_maps_invert_homography():
+    h = np.array([[0.4, 0.02, 100.0], [-0.01, 0.42, 80.0], [1e-5, 2e-5, 1.0]])
+    map_x, map_y = inverse_maps(h, (300, 400))
+    content = np.array([[200.0, 100.0, 1.0]])
+    proj = content @ h.T
+    u, v = proj[0, :2] / proj[0, 2]
+    iu, iv = int(round(u)), int(round(v))
+    back = np.linalg.solve(h, [iu, iv, 1.0])
+    assert map_x[iv, iu] == pytest.approx(back[0] / back[2], abs=1e-3)
+    assert map_y[iv, iu] == pytest.approx(back[1] / back[2], abs=1e-3)
+
+
+def test_prewarp_key_tracks_inputs():
+    h = np.eye(3)
+    key = prewarp_key("abc", 0, h, (600, 800), (1920, 1080))
+    assert key == prewarp_key("abc", 0, 2.0 * h, (600, 800), (1920, 1080))
+    assert key != prewarp_key("abd", 0, h, (600, 800), (1920, 1080))
+    assert key != prewarp_key("abc", 1, h, (600, 800), (1920, 1080))
+    assert key != prewarp_key("abc", 0, h, (600, 800), (3840, 2160))
+
+
+def test_from_y_up_inverts_to_y_up():
+    points = np.array([[10.0, -20.0, 900.0], [0.5, 3.0, 1500.0]])
+    assert np.allclose(from_y_up(to_y_up(points, "METER"), "METER"), points, atol=1e-3)
@@ -0,0 +1,27 @@
+# [Test] 单元测试文件：图案清单（使用完可删除）
+import pytest
+
+from src.modules.projector_calibration.services.pattern_manifest import (
+    MANIFEST_NAME,
+    PatternManifest,
+)
+
+
+def test_manifest_roundtrip(tmp_path):
+    manifest = PatternManifest(
+        mode="complementary",
+        proj_height=1080,
+        proj_width=1920,
+        graycode_step=1,
+        gc_width=1920,
+        gc_height=1080,
+        pattern_count=46,
+    )
+    assert manifest.save(tmp_path).name == MANIFEST_NAME
+    assert PatternManifest.load(tmp_path) == manifest
+
+
+def test_missing_manifest_and_unknown_mode(tmp_path):
+    assert PatternManifest.load(tmp_path) is None
+    with pytest.raises(ValueError):
+        PatternManifest("bogus", 1, 1, 1, 1, 1, 4)
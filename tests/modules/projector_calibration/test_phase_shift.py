@@ -0,0 +1,69 @@
+# [Test] 单元测试文件：格雷码+相移混合图案（使用完可删除）
+import numpy as np
+
+from src.modules.projector_calibration.services.graycode_decoder import (
+    TiledGrayCodeDecoder,
+)
+from src.modules.projector_calibration.services.phase_shift import (
+    PhaseShiftDecoder,
+    coarse_frame_indices,
+    generate_phase_shift_patterns,
+    phase_shift_pattern_count,
+)
+
+
+def _observe(patterns, px, py):
+    """Bilinear camera view of the projector patterns at sub-pixel positions."""
+    x0, y0 = np.floor(px).astype(int), np.floor(py).astype(int)
+    fx, fy = px - x0, py - y0
+    frames = []
+    for pat in patterns:
+        pat = pat.astype(np.float64)
+        val = (
+            pat[y0, x0] * (1 - fx) * (1 - fy)
+            + pat[y0, x0 + 1] * fx * (1 - fy)
+            + pat[y0 + 1, x0] * (1 - fx) * fy
+            + pat[y0 + 1, x0 + 1] * fx * fy
+        )
+        frames.append(np.clip(20 + 0.8 * val, 0, 255).astype(np.uint8))
+    return frames
+
+
+def test_fewer_frames_than_graycode():
+    count = phase_shift_pattern_count(1920, 1080, 32, 4)
+    patterns = generate_phase_shift_patterns(1920, 1080, 32, 4)
+    assert len(patterns) == count
+    # 7+7 粗码位 + 2x4 相移帧 + 白/黑 = 24 帧，标准格雷码需 46 帧
+    assert count == 24
+    assert TiledGrayCodeDecoder(1920, 1080).pattern_count == 46
+    assert all(p.shape == (1080, 1920) and p.dtype == np.uint8 for p in patterns)
+    coarse = coarse_frame_indices(1920, 1080, 32, 4)
+    assert all(set(np.unique(patterns[i])) <= {0, 255} for i in coarse)
+
+
+def test_decode_is_subpixel_and_unwrapped():
+    patterns = generate_phase_shift_patterns(400, 300, 32, 4)
+    ys, xs = np.mgrid[0:120, 0:200]
+    px, py = xs * 1.7 + 3.3, ys * 2.1 + 1.6
+    frames = _observe(patterns, px, py)
+    maps = PhaseShiftDecoder(400, 300, 32, 4).decode(frames)
+    assert maps.valid.mean() > 0.99
+    err_x = np.abs(maps.x - px)[maps.valid]
+    err_y = np.abs(maps.y - py)[maps.valid]
+    # 无周期跳变（解包裹正确）且平均误差远小于一个像素
+    assert err_x.max() < 1.0 and err_y.max() < 1.0
+    assert err_x.mean() < 0.2 and err_y.mean() < 0.2
+
+
+def test_low_contrast_and_tiled_roi():
+    patterns = generate_phase_shift_patterns(400, 300, 32, 4)
+    ys, xs = np.mgrid[0:60, 0:80]
+    frames = _observe(patterns, xs * 1.5 + 2.0, ys * 1.5 + 2.0)
+    frames[-2][:, :10] = frames[-1][:, :10]
+    whole = PhaseShiftDecoder(400, 300).decode(frames)
+    assert not whole.valid[:, :10].any()
+    tiled = PhaseShiftDecoder(400, 300, memory_budget_mb=0.001).decode(
+        frames, roi=(20, 10, 70, 50)
+    )
+    assert tiled.origin == (20, 10)
+    assert np.array_equal(tiled.x, whole.x[10:50, 20:70])
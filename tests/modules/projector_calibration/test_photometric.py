@@ -0,0 +1,102 @@
+# [Test] 单元测试文件：投影仪光度响应标定与补偿表（使用完可删除）
+import numpy as np
+import pytest
+
+from src.modules.projector_calibration.services.photometric import (
+    DEFAULT_LEVELS,
+    PhotometricCapture,
+    PhotometricCompensation,
+    accumulate_responses,
+    build_affine,
+    build_lut,
+    fit_affine_response,
+    fit_gamma,
+    target_range,
+)
+
+SHAPE = (48, 64)
+GAMMA = 2.2
+
+
+def _surface():
+    # 渐晕 + 右侧暗区的反照率，黑电平略有起伏
+    yy, xx = np.mgrid[0 : SHAPE[0], 0 : SHAPE[1]]
+    albedo = (
+        0.6 + 0.4 * np.exp(-((xx - 32) ** 2 + (yy - 24) ** 2) / 600.0)
+    ) * np.where(xx > 40, 0.7, 1.0)
+    black = 8.0 + 2.0 * (yy / SHAPE[0])
+    return albedo, black
+
+
+def _camera(level, albedo, black):
+    return black + 200.0 * albedo * (level / 255.0) ** GAMMA
+
+
+def _fit(cell=4):
+    albedo, black = _surface()
+    levels = list(DEFAULT_LEVELS)
+    frames = [_camera(lv, albedo, black) for lv in levels]
+    # 相机像素与投影仪像素一一对应
+    v, u = np.nonzero(np.ones(SHAPE, bool))
+    pixels = np.stack([u, v], axis=1)
+    responses, counts = accumulate_responses(
+        frames, pixels, pixels.astype(float), SHAPE, cell
+    )
+    return levels, responses, counts, albedo, black
+
+
+def test_accumulate_and_fit_recover_response():
+    levels, responses, counts, albedo, black = _fit()
+    assert responses.shape == (len(levels), 12, 16)
+    assert np.all(counts == 16)
+    gamma = fit_gamma(levels, responses, counts)
+    assert gamma == pytest.approx(GAMMA, abs=1e-3)
+    a, b = fit_affine_response(levels, responses, gamma)
+    cell_albedo = albedo.reshape(12, 4, 16, 4).mean(axis=(1, 3))
+    assert np.allclose(a, 200.0 * cell_albedo, rtol=1e-3)
+
+
+@pytest.mark.parametrize("mode", ["affine", "lut"])
+def test_compensation_flattens_surface(tmp_path, mode):
+    levels, responses, counts, albedo, black = _fit(cell=1)
+    gamma = fit_gamma(levels, responses, counts)
+    floor, ceiling = target_range(levels, responses, counts, percentile=0.0)
+    if mode == "affine":
+        a, b = fit_affine_response(levels, responses, gamma)
+        comp = build_affine(a, b, counts, gamma, floor, ceiling, 1, SHAPE)
+    else:
+        comp = build_lut(levels, responses, counts, gamma, floor, ceiling, 1, SHAPE)
+    path = comp.save(tmp_path / "p.photo")
+    loaded = PhotometricCompensation.load(path)
+    assert loaded.mode == mode and loaded.proj_shape == SHAPE
+    for level in (64, 160, 255):
+        frame = np.full(SHAPE + (3,), level, np.uint8)
+        out = loaded.apply(frame)
+        seen = _camera(out[..., 0].astype(float), albedo, black)
+        target = floor + (ceiling - floor) * (level / 255.0) ** gamma
+        # 补偿前的起伏远大于补偿后的量化误差
+        assert np.std(_camera(level, albedo, black)) > 5 * np.std(seen)
+        assert np.mean(seen) == pytest.approx(target, rel=0.03)
+        assert np.array_equal(out[..., 0], out[..., 2])
+
+
+def test_affine_table_is_quantized_and_unobserved_cells_pass_through():
+    levels, responses, counts, _, _ = _fit()
+    counts = counts.copy()
+    counts[0, 0] = 0
+    gamma = fit_gamma(levels, responses, counts)
+    floor, ceiling = target_range(levels, responses, counts)
+    a, b = fit_affine_response(levels, responses, gamma)
+    comp = build_affine(a, b, counts, gamma, floor, ceiling, 4, SHAPE)
+    assert comp.arrays["gain_q"].dtype == np.uint16
+    assert comp.arrays["offset_q"].dtype == np.int16
+    frame = np.arange(256, dtype=np.uint8)[None, :].repeat(SHAPE[0], 0)[:, : SHAPE[1]]
+    out = comp.apply(np.ascontiguousarray(frame))
+    assert np.abs(out[:4, :4].astype(int) - frame[:4, :4]).max() <= 1
+
+
+def test_photometric_capture_levels():
+    with pytest.raises(ValueError):
+        PhotometricCapture([10, 128, 255], 600, 800)
+    capture = PhotometricCapture(list(DEFAULT_LEVELS), 600, 800)
+    assert capture.frame_name(3) == "photometric_03.png"
@@ -0,0 +1,109 @@
+# [Test] 单元测试文件：内容播放流水线（读取线程 -> 工作线程池 -> 双缓冲输出）（使用完可删除）
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from src.modules.projector_calibration.services.playback import (
+    FrameSink,
+    FrameSource,
+    NullSink,
+    PlaybackPipeline,
+    SyntheticSource,
+)
+
+CONTENT = (32, 24)
+
+
+class _Numbered(FrameSource):
+    # 帧序号写在第一个像素里，便于检查输出顺序
+    def __init__(self, count, fps=0.0, fail_at=None):
+        self.count = count
+        self.fps = fps
+        self.fail_at = fail_at
+        self.closed = False
+
+    def __iter__(self):
+        for i in range(self.count):
+            if i == self.fail_at:
+                raise RuntimeError("decode failed")
+            frame = np.zeros((CONTENT[1], CONTENT[0], 3), np.uint8)
+            frame[0, 0, 0] = i % 256
+            yield frame
+
+    def close(self):
+        self.closed = True
+
+
+class _Recorder(FrameSink):
+    def __init__(self, stop_after=None):
+        self.seen = []
+        self.stop_after = stop_after
+
+    def write(self, frame):
+        self.seen.append(int(frame[-1, -1, 0]))
+        return self.stop_after is None or len(self.seen) < self.stop_after
+
+
+class _FlipWarp:
+    # 与 PlanarPrewarp 相同的接口：旋转 180 度，可选处理延时
+    proj_shape = (CONTENT[1], CONTENT[0])
+    content_size = CONTENT
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+
+    def allocate(self, frame):
+        return np.empty(self.proj_shape + frame.shape[2:], frame.dtype)
+
+    def warp(self, frame, out):
+        if self.delay:
+            time.sleep(self.delay)
+        out[...] = frame[::-1, ::-1]
+        return out
+
+
+def test_frames_arrive_in_order_through_worker_pool():
+    sink = _Recorder()
+    source = _Numbered(40)
+    stats = PlaybackPipeline(source, sink, _FlipWarp(), workers=3, realtime=False).run()
+    assert sink.seen == list(range(40))
+    assert stats.frames_read == stats.frames_shown == 40
+    assert stats.dropped == 0 and stats.workers == 3
+    assert set(stats.latency_ms) == {"mean", "p50", "p95", "max"}
+    assert source.closed
+
+
+def test_sink_and_max_frames_stop_playback():
+    sink = _Recorder(stop_after=5)
+    stats = PlaybackPipeline(
+        _Numbered(1000), sink, _FlipWarp(), workers=2, realtime=False
+    ).run()
+    assert stats.frames_shown == 5 and sink.seen == list(range(5))
+    null = NullSink()
+    stats = PlaybackPipeline(
+        SyntheticSource(CONTENT, 100), null, workers=2, realtime=False, max_frames=7
+    ).run()
+    assert null.frames == stats.frames_shown == 7
+
+
+def test_realtime_drops_frames_it_cannot_show_in_time():
+    # 每帧处理 30 ms、显示周期 10 ms：必须丢帧，且显示的帧仍保持顺序
+    sink = _Recorder()
+    stats = PlaybackPipeline(
+        _Numbered(30), sink, _FlipWarp(delay=0.03), workers=1, fps=100.0
+    ).run()
+    assert stats.dropped > 0
+    assert stats.frames_shown + stats.dropped == stats.frames_read == 30
+    assert sink.seen == sorted(sink.seen)
+
+
+def test_source_errors_and_mismatched_tables_are_reported():
+    with pytest.raises(RuntimeError, match="decode failed"):
+        PlaybackPipeline(
+            _Numbered(10, fail_at=3), NullSink(), workers=2, realtime=False
+        ).run()
+    compensation = SimpleNamespace(proj_shape=(10, 10))
+    with pytest.raises(ValueError):
+        PlaybackPipeline(_Numbered(1), NullSink(), _FlipWarp(), compensation)
@@ -0,0 +1,85 @@
+# [Test] 单元测试文件：结构光三角化重建（使用完可删除）
+import numpy as np
+
+from src.modules.projector_calibration.services.reconstruction import (
+    grid_normals,
+    reconstruct,
+    to_y_up,
+    triangulate_rays,
+)
+
+K_CAM = np.array([[1000.0, 0, 640.0], [0, 1000.0, 360.0], [0, 0, 1]])
+K_PROJ = np.array([[1100.0, 0, 400.0], [0, 1100.0, 300.0], [0, 0, 1]])
+ANGLE = np.radians(10)
+# 相机 -> 投影仪：绕 Y 轴旋转 10° 并平移
+R = np.array(
+    [
+        [np.cos(ANGLE), 0, np.sin(ANGLE)],
+        [0, 1, 0],
+        [-np.sin(ANGLE), 0, np.cos(ANGLE)],
+    ]
+)
+T = np.array([[-150.0], [5.0], [20.0]])
+
+
+def _project(points, k, rotation=np.eye(3), translation=np.zeros((3, 1))):
+    cam = points @ rotation.T + translation.reshape(1, 3)
+    return (cam[:, :2] / cam[:, 2:]) * [k[0, 0], k[1, 1]] + [k[0, 2], k[1, 2]]
+
+
+def _plane_grid(step=4):
+    # 距相机 900mm、略微倾斜的平面，按相机像素网格采样
+    v, u = np.mgrid[100:600:step, 300:1000:step]
+    pixels = np.stack([u.ravel(), v.ravel()], axis=1).astype(float)
+    rays = np.c_[(pixels - [640.0, 360.0]) / 1000.0, np.ones(len(pixels))]
+    normal = np.array([0.1, 0.0, 1.0])
+    depth = 900.0 / (rays @ normal)
+    return pixels, rays * depth[:, None], normal / np.linalg.norm(normal)
+
+
+def test_triangulate_rays_recovers_points():
+    pixels, points, _ = _plane_grid()
+    cam_rays = np.c_[(pixels - [640.0, 360.0]) / 1000.0, np.ones(len(pixels))]
+    proj_px = _project(points, K_PROJ, R, T)
+    proj_rays = np.c_[(proj_px - [400.0, 300.0]) / 1100.0, np.ones(len(proj_px))]
+    out, gap, ok = triangulate_rays(cam_rays, proj_rays, R, T)
+    assert ok.all()
+    assert np.allclose(out, points, atol=1e-6)
+    assert np.all(gap < 1e-6)
+
+
+def test_reconstruct_confidence_and_rejection():
+    pixels, points, _ = _plane_grid()
+    proj_px = _project(points, K_PROJ, R, T)
+    # 一半像素的投影仪坐标偏移 3 像素：射线不再相交，置信度下降
+    proj_px[::2, 1] += 3.0
+    contrast = np.full(len(pixels), 200)
+    contrast[1::4] = 32
+    cloud = reconstruct(pixels, proj_px, K_CAM, None, K_PROJ, None, R, T, contrast)
+    assert len(cloud) == len(pixels)
+    assert np.all(cloud.gap_px[1::2] < 1e-3)
+    assert np.all(cloud.gap_px[::2] > 1.0)
+    assert np.allclose(cloud.confidence[3::4], 1.0, atol=1e-4)
+    assert np.allclose(cloud.confidence[1::4], 0.25, atol=1e-4)
+    assert np.all(cloud.confidence[::2] < 0.7)
+    assert np.allclose(cloud.points[1::2], points[1::2], atol=1e-2)
+
+
+def test_rays_meeting_behind_the_devices_are_rejected():
+    # 投影仪在相机右侧 100mm 且射线向右发散：两射线只在两设备后方相交
+    cam_rays = np.array([[0.0, 0.0, 1.0], [0.0, 0.0, 1.0]])
+    proj_rays = np.array([[1.0, 0.0, 1.0], [-0.1, 0.0, 1.0]])
+    _, _, ok = triangulate_rays(cam_rays, proj_rays, np.eye(3), [[-100.0], [0], [0]])
+    assert ok.tolist() == [False, True]
+
+
+def test_grid_normals_face_the_camera():
+    pixels, points, normal = _plane_grid(step=1)
+    normals = grid_normals(points.astype(np.float32), pixels, (720, 1280), step=2)
+    # 平面法向 (0.1, 0, 1) 朝向相机时取反
+    assert np.allclose(normals, -normal, atol=1e-3)
+
+
+def test_to_y_up_matches_spatial_mapping_frame():
+    out = to_y_up(np.array([[10.0, 20.0, 900.0]]), "CENTIMETER")
+    assert np.allclose(out, [[1.0, -2.0, -90.0]])
@@ -0,0 +1,54 @@
+# [Test] 单元测试文件：标定结果端点（使用完可删除）
+import numpy as np
+from fastapi.testclient import TestClient
+
+from src.modules.projector_calibration.config import ProjectorCalibrationSettings
+from src.modules.projector_calibration.services.calibration_bundle import (
+    CalibrationBundle,
+    ProjectorCalibration,
+)
+from src.server.main import create_app
+
+
+def _client_with_bundle(path):
+    app = create_app()
+    app.state.registry.get("projector_calibration").configure(
+        ProjectorCalibrationSettings(result_bundle=str(path))
+    )
+    return TestClient(app)
+
+
+def test_result_reports_missing_bundle(tmp_path):
+    resp = _client_with_bundle(tmp_path / "none.calib").get("/calibration/result")
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["available"] is False
+    assert body["error_code"] == "NO_RESULT"
+
+
+def test_result_returns_bundle_contents(tmp_path):
+    path = tmp_path / "r.calib"
+    CalibrationBundle(
+        img_shape=(720, 1280),
+        rms=0.8,
+        cam_int=np.eye(3),
+        cam_dist=np.zeros((5, 1)),
+        successful_captures=5,
+        projectors=[
+            ProjectorCalibration(
+                0,
+                (1080, 1920),
+                0.8,
+                np.eye(3),
+                np.zeros((1, 5)),
+                np.eye(3),
+                np.array([[-200.0], [0.0], [0.0]]),
+                5,
+            )
+        ],
+    ).save(path)
+    body = _client_with_bundle(path).get("/calibration/result").json()
+    assert body["available"] is True
+    result = body["result"]
+    assert result["img_shape"] == [720, 1280]
+    assert result["projectors"][0]["unreal_location"] == [0.0, -20.0, 0.0]